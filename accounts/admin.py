@@ -62,6 +62,8 @@ class UserRoleAssignmentAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'role__role_name')
     readonly_fields = ('assigned_at',)
     autocomplete_fields = ['user', 'assigned_by']
+    # assigned_by is nullable, which the default select_related() skips
+    list_select_related = ('user', 'role', 'assigned_by')
     
     def save_model(self, request, obj, form, change):
         """Automatically set assigned_by to current user"""
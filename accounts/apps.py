@@ -4,3 +4,20 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from auth_transactions.signals import transaction_status_changed
+        from . import counters
+
+        post_save.connect(counters.user_saved, sender='accounts.User',
+                          dispatch_uid='accounts.counters.user_saved')
+        post_delete.connect(counters.user_deleted, sender='accounts.User',
+                            dispatch_uid='accounts.counters.user_deleted')
+        post_save.connect(counters.service_provider_changed, sender='services.ServiceProvider',
+                          dispatch_uid='accounts.counters.sp_saved')
+        post_delete.connect(counters.service_provider_changed, sender='services.ServiceProvider',
+                            dispatch_uid='accounts.counters.sp_deleted')
+        transaction_status_changed.connect(counters.transaction_status_changed,
+                                           dispatch_uid='accounts.counters.transaction_status_changed')
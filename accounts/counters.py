@@ -0,0 +1,111 @@
+"""
+Global counters for the public landing page
+
+HomeView used to run three full-table COUNT(*) queries on every anonymous
+hit. The figures now live in the Django cache: signal receivers adjust them
+incrementally (user created/deleted, transaction created/completed,
+ServiceProvider changed) and they are recomputed from the database at most
+once every GLOBAL_COUNTERS_RECONCILE_SECONDS to correct drift from bulk
+writes or other processes. Use a shared cache backend with several processes.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+
+COUNTER_NAMES = ('total_users', 'total_transactions', 'completed_transactions', 'active_services')
+KEY_PREFIX = 'global_counters'
+FRESH_KEY = f'{KEY_PREFIX}:fresh'
+RECONCILE_LOCK_KEY = f'{KEY_PREFIX}:reconciling'
+
+
+def _setting(name, default):
+    return getattr(settings, 'IDP_SETTINGS', {}).get(name, default)
+
+
+def _cache():
+    return caches[_setting('GLOBAL_COUNTERS_CACHE_ALIAS', 'default')]
+
+
+def _key(name):
+    return f'{KEY_PREFIX}:{name}'
+
+
+def count_from_database():
+    """The expensive path: one COUNT per figure (and table)"""
+    from auth_transactions.models import ArchivedAuthTransaction, AuthTransaction
+    from services.models import ServiceProvider
+    from .models import User
+
+    return {
+        'total_users': User.objects.count(),
+        'total_transactions': AuthTransaction.objects.count() + ArchivedAuthTransaction.objects.count(),
+        'completed_transactions': (
+            AuthTransaction.objects.filter(status='COMPLETED').count()
+            + ArchivedAuthTransaction.objects.filter(status='COMPLETED').count()
+        ),
+        'active_services': ServiceProvider.objects.filter(is_active=True).count(),
+    }
+
+
+def reconcile():
+    """Recompute every counter from the database and store it"""
+    counters = count_from_database()
+    cache = _cache()
+    cache.set_many({_key(name): value for name, value in counters.items()}, None)
+    cache.set(FRESH_KEY, True, _setting('GLOBAL_COUNTERS_RECONCILE_SECONDS', 300))
+    return counters
+
+
+def get_counters():
+    """
+    Landing page figures, including success_rate (%)
+    Reconciles when the counters are missing or the reconcile window has
+    passed; cache.add() lets a single caller do it while others keep
+    serving the cached values.
+    """
+    cache = _cache()
+    values = cache.get_many([_key(name) for name in COUNTER_NAMES] + [FRESH_KEY])
+    counters = {name: values.get(_key(name)) for name in COUNTER_NAMES}
+
+    if None in counters.values():
+        counters = reconcile()
+    elif FRESH_KEY not in values and cache.add(RECONCILE_LOCK_KEY, True, 30):
+        try:
+            counters = reconcile()
+        finally:
+            cache.delete(RECONCILE_LOCK_KEY)
+
+    total = counters['total_transactions']
+    counters['success_rate'] = round(counters['completed_transactions'] / total * 100, 1) if total else 0
+    return counters
+
+
+def _adjust(name, delta):
+    """Apply delta if the counter is cached; a missing counter is rebuilt on next read"""
+    try:
+        _cache().incr(_key(name), delta)
+    except ValueError:
+        pass
+
+
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _adjust('total_users', 1)
+
+
+def user_deleted(sender, instance, **kwargs):
+    _adjust('total_users', -1)
+
+
+def transaction_status_changed(sender, old_status, new_status, **kwargs):
+    if old_status is None:
+        _adjust('total_transactions', 1)
+    if new_status == 'COMPLETED' and old_status != 'COMPLETED':
+        _adjust('completed_transactions', 1)
+    elif old_status == 'COMPLETED' and new_status != 'COMPLETED':
+        _adjust('completed_transactions', -1)
+
+
+def service_provider_changed(sender, **kwargs):
+    """SP table is small; drop the counter and let the next read recount"""
+    _cache().delete(_key('active_services'))
@@ -0,0 +1,185 @@
+"""
+Failed-PIN counter and temporary account lockout
+
+Every AUTH_FAILED (wrong PIN in auth_confirm / ConfirmTransactionView)
+is counted with the sliding window counter used by
+auth_transactions/ratelimit.py: failures in the current
+LOGIN_FAILURE_WINDOW_MINUTES window plus the previous window's failures
+weighted by how much of it still overlaps. Reaching MAX_LOGIN_ATTEMPTS
+locks PIN confirmation for ACCOUNT_LOCKOUT_MINUTES.
+
+The counters and the lock live in the Django cache
+(LOGIN_FAILURE_CACHE_ALIAS), so a check is one cache read instead of the
+AuditLog scan done by sp_detect_and_lock_suspicious_accounts and
+v_suspicious_activity. Writes are cache.add / cache.incr only, which are
+atomic on Redis and Memcached, so workers sharing the cache never lose a
+failure, and exactly one of them sets the lock (and audits it). An empty
+cache (process start, cache flush) is rebuilt by replaying the recent
+AUTH_FAILED audit rows once. Use a shared cache backend with several
+processes.
+"""
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+
+KEY_PREFIX = 'login_failures'
+RECONCILED_KEY = f'{KEY_PREFIX}:reconciled'
+
+_reconcile_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, 'IDP_SETTINGS', {}).get(name, default)
+
+
+def _cache():
+    return caches[_setting('LOGIN_FAILURE_CACHE_ALIAS', 'default')]
+
+
+def _window_key(user_id, index):
+    return f'{KEY_PREFIX}:{user_id}:{int(index)}'
+
+
+def _lock_key(user_id):
+    return f'{KEY_PREFIX}:{user_id}:locked'
+
+
+def _policy():
+    """(max_attempts, window seconds, lockout seconds)"""
+    return (
+        _setting('MAX_LOGIN_ATTEMPTS', 5),
+        _setting('LOGIN_FAILURE_WINDOW_MINUTES', 10) * 60,
+        _setting('ACCOUNT_LOCKOUT_MINUTES', 10) * 60,
+    )
+
+
+def _estimate(current, previous, elapsed, window):
+    return current + previous * (1 - elapsed / window)
+
+
+def reconcile():
+    """
+    Rebuild the counters and locks from AuditLog
+    Replays AUTH_FAILED rows young enough to still matter (one range scan
+    on the timestamp index). Keys are written with cache.add, so counts
+    another worker recorded meanwhile are kept. Returns the number of users
+    with state.
+    """
+    from audit_logs.models import AuditLog
+
+    max_attempts, window, lockout_seconds = _policy()
+    now = time.time()
+    since = timezone.now() - timedelta(seconds=2 * window + lockout_seconds)
+    rows = (
+        AuditLog.objects.filter(action='AUTH_FAILED', timestamp__gte=since, user__isnull=False)
+        .order_by('timestamp')
+        .values_list('user_id', 'timestamp')
+    )
+    windows = {}   # user_id -> {window index: failures}
+    locks = {}     # user_id -> locked_until
+    for user_id, timestamp in rows.iterator():
+        at = timestamp.timestamp()
+        if locks.get(user_id, 0.0) > at:
+            continue
+        counts = windows.setdefault(user_id, {})
+        index, elapsed = divmod(at, window)
+        counts[index] = counts.get(index, 0) + 1
+        if _estimate(counts[index], counts.get(index - 1, 0), elapsed, window) >= max_attempts:
+            locks[user_id] = at + lockout_seconds
+            counts.clear()
+
+    cache = _cache()
+    current_index = now // window
+    for user_id, counts in windows.items():
+        for index, count in counts.items():
+            if index >= current_index - 1:
+                cache.add(_window_key(user_id, index), count, math.ceil(2 * window))
+    for user_id, locked_until in locks.items():
+        if locked_until > now:
+            cache.add(_lock_key(user_id), locked_until, math.ceil(locked_until - now))
+    cache.set(RECONCILED_KEY, True, None)
+    return len(windows.keys() | locks.keys())
+
+
+def _ensure_reconciled(values=None):
+    values = _cache().get_many([RECONCILED_KEY]) if values is None else values
+    if RECONCILED_KEY not in values:
+        with _reconcile_lock:
+            if RECONCILED_KEY not in _cache().get_many([RECONCILED_KEY]):
+                reconcile()
+
+
+def locked_for(user_id, now=None):
+    """Seconds until user_id may try a PIN again; 0.0 when not locked"""
+    now = time.time() if now is None else now
+    values = _cache().get_many([_lock_key(user_id), RECONCILED_KEY])
+    if RECONCILED_KEY not in values:
+        _ensure_reconciled(values)
+        values = _cache().get_many([_lock_key(user_id)])
+    locked_until = values.get(_lock_key(user_id))
+    if locked_until is None:
+        return 0.0
+    return max(locked_until - now, 0.0)
+
+
+def _incr(cache, key, timeout):
+    """Atomic +1 on a counter that may not exist yet"""
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.add(key, 1, timeout)
+        return 1
+
+
+def register_failure(user_id, ip_address='0.0.0.0', now=None, audit_records=None):
+    """
+    Count one failed PIN for user_id
+    Returns the lockout seconds if this failure locked the account, else 0.0.
+    The lock's ADMIN_ACTION audit row is appended to audit_records when
+    given, so the caller writes it in the same INSERT as its own AUTH_FAILED
+    row; otherwise it is recorded here.
+    """
+    now = time.time() if now is None else now
+    max_attempts, window, lockout_seconds = _policy()
+    if locked_for(user_id, now) > 0:
+        return 0.0
+
+    cache = _cache()
+    index, elapsed = divmod(now, window)
+    current = _incr(cache, _window_key(user_id, index), math.ceil(2 * window))
+    previous = cache.get(_window_key(user_id, index - 1), 0)
+    if _estimate(current, previous, elapsed, window) < max_attempts:
+        return 0.0
+
+    # Only the worker whose add() wins locks the account and audits it
+    lock_key = _lock_key(user_id)
+    locked_until = now + lockout_seconds
+    if not cache.add(lock_key, locked_until, math.ceil(lockout_seconds)):
+        existing = cache.get(lock_key)
+        if existing is not None and existing > now:
+            return 0.0
+        # A lock value left over from an earlier (expired) lockout
+        cache.set(lock_key, locked_until, math.ceil(lockout_seconds))
+    # Start counting afresh once the lock runs out
+    cache.delete_many([_window_key(user_id, index), _window_key(user_id, index - 1)])
+
+    fields = {
+        'user_id': user_id,
+        'action': 'ADMIN_ACTION',
+        'details': f'Account locked for {int(lockout_seconds // 60)} minutes after {max_attempts} failed PIN attempts',
+        'ip_address': ip_address,
+    }
+    if audit_records is not None:
+        audit_records.append(fields)
+    else:
+        from audit_logs.sink import record_audit
+        record_audit(**fields)
+    return float(lockout_seconds)
@@ -6,6 +6,7 @@ from django.core.validators import RegexValidator
 from django.db import models
 from cryptography.fernet import Fernet
 from django.conf import settings
+from idp_backend.metrics import PIN_CHECK_SECONDS
 import bcrypt
 
 
@@ -68,13 +69,23 @@ class User(AbstractUser):
         hashed = bcrypt.hashpw(raw_pin.encode('utf-8'), bcrypt.gensalt())
         self.pin_code = hashed.decode('utf-8')
     
+    @PIN_CHECK_SECONDS.time(method='check_pin')
     def check_pin(self, raw_pin):
         """Verify PIN code"""
         return bcrypt.checkpw(
             raw_pin.encode('utf-8'),
             self.pin_code.encode('utf-8')
         )
-    
+
+    @PIN_CHECK_SECONDS.time(method='verify_pin')
+    def verify_pin(self, raw_pin):
+        """
+        Verify PIN code on the dedicated bcrypt pool
+        Raises PinVerifierBusy when the verification queue is full
+        """
+        from .pin_verifier import pin_verifier
+        return pin_verifier.verify(raw_pin, self.pin_code)
+
     def __str__(self):
         return f"{self.username} ({self.phone_number})"
 
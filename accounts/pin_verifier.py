@@ -0,0 +1,107 @@
+"""
+Dedicated bcrypt PIN verification pool
+
+bcrypt.checkpw is deliberately CPU-expensive, so PIN checks are pushed onto
+a process pool sized to the number of cores instead of running inline in a
+request thread (and never while a row lock is held). The number of checks
+in flight is capped; callers that cannot get a slot in time receive
+PinVerifierBusy and should answer 503 rather than pile up behind the pool.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import threading
+
+import bcrypt
+from django.conf import settings
+
+
+class PinVerifierBusy(Exception):
+    """Raised when the verification queue is full (backpressure)"""
+
+
+def _checkpw(raw_pin, pin_hash):
+    """Worker entry point - must stay importable without Django setup"""
+    return bcrypt.checkpw(raw_pin.encode('utf-8'), pin_hash.encode('utf-8'))
+
+
+class PinVerifier:
+    """
+    Bounded bcrypt verification executor
+    - max_workers: pool size (0 runs checks inline in the calling thread)
+    - max_pending: checks allowed in flight (running + queued)
+    - acquire_timeout: seconds to wait for a free slot before PinVerifierBusy
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, acquire_timeout=None):
+        idp_settings = getattr(settings, 'IDP_SETTINGS', {})
+        if max_workers is None:
+            max_workers = idp_settings.get('PIN_VERIFIER_WORKERS')
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_pending is None:
+            max_pending = idp_settings.get('PIN_VERIFIER_MAX_PENDING') or max(max_workers, 1) * 4
+        if acquire_timeout is None:
+            acquire_timeout = idp_settings.get('PIN_VERIFIER_ACQUIRE_TIMEOUT_SECONDS', 0.5)
+
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.acquire_timeout = acquire_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        """Create the process pool on first use"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # spawn: forking a multi-threaded server process is unsafe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                    )
+        return self._executor
+
+    def _reset_executor(self, broken):
+        with self._executor_lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def verify(self, raw_pin, pin_hash):
+        """
+        Check raw_pin against a bcrypt hash
+        Blocks until the result is available; raises PinVerifierBusy when
+        no slot frees up within acquire_timeout.
+        """
+        if not raw_pin or not pin_hash:
+            return False
+
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise PinVerifierBusy('PIN verification queue is full')
+
+        try:
+            if self.max_workers == 0:
+                return _checkpw(raw_pin, pin_hash)
+
+            executor = self._get_executor()
+            try:
+                return executor.submit(_checkpw, raw_pin, pin_hash).result()
+            except BrokenProcessPool:
+                # A worker died; rebuild the pool and retry once
+                self._reset_executor(executor)
+                return self._get_executor().submit(_checkpw, raw_pin, pin_hash).result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+pin_verifier = PinVerifier()
@@ -1,3 +1,302 @@
-from django.test import TestCase
+"""
+Tests for accounts app
+"""
+from datetime import timedelta
+import threading
+from unittest import mock
 
-# Create your tests here.
+import base64
+
+import bcrypt
+from cryptography.fernet import Fernet
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from accounts import counters, lockout
+from accounts.models import User
+from accounts.pin_verifier import PinVerifier, PinVerifierBusy
+from accounts.utils import EncryptionUtil, keyring
+from audit_logs.models import AuditLog
+from auth_transactions.models import AuthTransaction
+from services.models import ServiceProvider
+
+
+class PinVerifierTestCase(SimpleTestCase):
+    """
+    bcrypt PIN 검증 풀 테스트
+    - 프로세스 풀 / 인라인 모드 검증 결과
+    - 대기열 한도 초과 시 backpressure
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pin_hash = bcrypt.hashpw(b'123456', bcrypt.gensalt(rounds=4)).decode()
+
+    def test_process_pool_verification(self):
+        verifier = PinVerifier(max_workers=1, max_pending=2)
+        try:
+            self.assertTrue(verifier.verify('123456', self.pin_hash))
+            self.assertFalse(verifier.verify('654321', self.pin_hash))
+        finally:
+            verifier.shutdown()
+
+    def test_inline_verification(self):
+        verifier = PinVerifier(max_workers=0, max_pending=1)
+
+        self.assertTrue(verifier.verify('123456', self.pin_hash))
+        self.assertFalse(verifier.verify('', self.pin_hash))
+
+    def test_backpressure_when_queue_full(self):
+        verifier = PinVerifier(max_workers=0, max_pending=1, acquire_timeout=0.01)
+        verifier._slots.acquire()  # 슬롯 하나를 점유한 상태를 흉내
+        try:
+            with self.assertRaises(PinVerifierBusy):
+                verifier.verify('123456', self.pin_hash)
+        finally:
+            verifier._slots.release()
+
+        self.assertTrue(verifier.verify('123456', self.pin_hash))
+
+    def test_concurrent_callers_share_bounded_pool(self):
+        verifier = PinVerifier(max_workers=2, max_pending=8, acquire_timeout=30)
+        results = []
+
+        def worker():
+            results.append(verifier.verify('123456', self.pin_hash))
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            verifier.shutdown()
+
+        self.assertEqual(results, [True] * 6)
+
+
+class GlobalCountersTestCase(TestCase):
+    """
+    랜딩 페이지 전역 카운터 테스트
+    - 이벤트마다 증분 갱신, 홈페이지는 큰 테이블을 조회하지 않음
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='counter_user', phone_number='010-7777-0000',
+                                             ci='ci-counter-0', di='di-counter-0')
+        self.sp = ServiceProvider.objects.create(
+            service_name='Counter Service',
+            client_id='counter_client',
+            client_secret=ServiceProvider.hash_secret('counter_secret'),
+            callback_url='https://example.com/callback',
+        )
+
+    def test_counters_follow_events(self):
+        counters.get_counters()
+
+        User.objects.create_user(username='counter_user2', phone_number='010-7777-0001',
+                                 ci='ci-counter-1', di='di-counter-1')
+        with self.captureOnCommitCallbacks(execute=True):
+            auth_tx = AuthTransaction.objects.create(
+                user=self.user,
+                service_provider=self.sp,
+                expires_at=timezone.now() + timedelta(minutes=3)
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            auth_tx.transition_to('COMPLETED', confirmed_at=timezone.now())
+
+        with self.assertNumQueries(0):
+            stats = counters.get_counters()
+
+        self.assertEqual(stats['total_users'], 2)
+        self.assertEqual(stats['total_transactions'], 1)
+        self.assertEqual(stats['success_rate'], 100.0)
+        self.assertEqual(stats['active_services'], 1)
+        expected = counters.count_from_database()
+        self.assertEqual({name: stats[name] for name in expected}, expected)
+
+    def test_home_page_served_from_cache(self):
+        self.client.get('/')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats']['total_users'], 1)
+
+    def test_reconcile_after_window(self):
+        counters.get_counters()
+        # Rows written behind the signals' back (bulk_create) are picked up once the window passes
+        User.objects.bulk_create([User(username='bulk_user', phone_number='010-7777-0002',
+                                       ci='ci-counter-2', di='di-counter-2')])
+        cache.delete(counters.FRESH_KEY)
+
+        self.assertEqual(counters.get_counters()['total_users'], 2)
+
+
+class AccountLockoutTestCase(TestCase):
+    """
+    PIN 연속 실패 카운터 / 계정 잠금 테스트
+    - 감쇠(leak) 후 MAX_LOGIN_ATTEMPTS 도달 시 잠금
+    - 잠금 확인은 AuditLog 조회 없이 캐시 1회
+    - 캐시가 비면 AuditLog에서 재구성
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='lockout_user', password='lockoutpass',
+                                             phone_number='010-6666-0000',
+                                             ci='ci-lockout', di='di-lockout')
+        self.user.set_pin('123456')
+        self.user.save()
+        self.sp = ServiceProvider.objects.create(
+            service_name='Lockout Service',
+            client_id='lockout_client',
+            client_secret=ServiceProvider.hash_secret('lockout_secret'),
+            callback_url='https://example.com/callback',
+        )
+
+    def _create_tx(self):
+        return AuthTransaction.objects.create(
+            user=self.user,
+            service_provider=self.sp,
+            expires_at=timezone.now() + timedelta(minutes=3)
+        )
+
+    def _confirm(self, auth_tx, pin):
+        return self.client.post(
+            '/api/v1/auth/api/confirm/',
+            data={'transaction_id': str(auth_tx.transaction_id), 'pin_code': pin},
+            content_type='application/json'
+        )
+
+    def test_counter_decays_and_locks(self):
+        # 기본값: 10분 창에 5회, 10분 잠금 (이전 창은 겹치는 비율만큼 반영)
+        start = 1_200_000.0  # 창 경계
+        for i in range(4):
+            self.assertEqual(lockout.register_failure(self.user.pk, now=start + i), 0.0)
+        # 다음 창의 절반 지점: 이전 4회는 2회로 반영
+        self.assertEqual(lockout.register_failure(self.user.pk, now=start + 900), 0.0)
+        self.assertEqual(lockout.register_failure(self.user.pk, now=start + 900), 0.0)
+        self.assertEqual(lockout.locked_for(self.user.pk, now=start + 900), 0.0)
+
+        self.assertEqual(lockout.register_failure(self.user.pk, now=start + 900), 600.0)
+        self.assertEqual(lockout.locked_for(self.user.pk, now=start + 1200), 300.0)
+        self.assertEqual(lockout.locked_for(self.user.pk, now=start + 1500), 0.0)
+
+    def test_concurrent_failures_lock_once(self):
+        barrier = threading.Barrier(8)
+        results = []
+
+        def fail():
+            barrier.wait()
+            results.append(lockout.register_failure(self.user.pk, now=1_200_000.0))
+
+        lockout.locked_for(self.user.pk)  # reconcile before the race
+        threads = [threading.Thread(target=fail) for _ in range(8)]
+        with mock.patch('audit_logs.sink.record_audit') as record_audit:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(results), [0.0] * 7 + [600.0])
+        record_audit.assert_called_once()
+
+    def test_confirm_locked_after_max_attempts(self):
+        for _ in range(5):
+            self.assertEqual(self._confirm(self._create_tx(), '000000').status_code, 401)
+        self.assertEqual(
+            AuditLog.objects.filter(user=self.user, action='ADMIN_ACTION').count(), 1
+        )
+
+        auth_tx = self._create_tx()
+        with self.assertNumQueries(1):  # the transaction lookup only
+            response = self._confirm(auth_tx, '123456')
+
+        self.assertEqual(response.status_code, 423)
+        self.assertGreater(int(response['Retry-After']), 0)
+        auth_tx.refresh_from_db()
+        self.assertEqual(auth_tx.status, 'PENDING')
+
+    def test_lock_after_cache_cleared(self):
+        # 재시작/축출로 캐시가 빈 뒤의 5번째 실패: 재구성과 잠금이 한 요청에서 발생
+        for _ in range(4):
+            self.assertEqual(self._confirm(self._create_tx(), '000000').status_code, 401)
+        cache.clear()
+        auth_tx = self._create_tx()
+
+        # 잘못된 PIN 처리 쿼리 7개 + 재구성 스캔 1개; 잠금 감사 로그는 AUTH_FAILED와 같은 INSERT
+        with self.assertNumQueries(8):
+            response = self._confirm(auth_tx, '000000')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(
+            AuditLog.objects.filter(user=self.user, action='ADMIN_ACTION').count(), 1
+        )
+        self.assertEqual(self._confirm(self._create_tx(), '123456').status_code, 423)
+
+    @override_settings(IDP_SETTINGS={**settings.IDP_SETTINGS, 'MAX_LOGIN_ATTEMPTS': 2})
+    def test_web_confirm_counts_failures(self):
+        self.client.login(username='lockout_user', password='lockoutpass')
+        auth_tx = self._create_tx()
+        url = f'/auth/confirm/{auth_tx.transaction_id}/'
+
+        self.client.post(url, {'action': 'approve', 'pin': '000000'})
+        self.client.post(url, {'action': 'approve', 'pin': '000000'})
+        self.client.post(url, {'action': 'approve', 'pin': '123456'})
+
+        auth_tx.refresh_from_db()
+        self.assertEqual(auth_tx.status, 'PENDING')
+        self.assertEqual(AuditLog.objects.filter(user=self.user, action='AUTH_FAILED').count(), 2)
+        self.assertGreater(lockout.locked_for(self.user.pk), 0)
+
+    def test_reconcile_from_audit_log(self):
+        AuditLog.objects.bulk_create([
+            AuditLog(user=self.user, action='AUTH_FAILED', details='Invalid PIN', ip_address='127.0.0.1')
+            for _ in range(5)
+        ] + [
+            AuditLog(user=self.user, action='AUTH_FAILED', details='Invalid PIN', ip_address='127.0.0.1',
+                     timestamp=timezone.now() - timedelta(days=1))
+        ])
+
+        with self.assertNumQueries(1):
+            self.assertGreater(lockout.locked_for(self.user.pk), 0)
+        with self.assertNumQueries(0):
+            self.assertGreater(lockout.locked_for(self.user.pk), 0)
+
+
+class KeyRingTestCase(SimpleTestCase):
+    """
+    KeyRing 테스트 - 암호 객체 재사용, 키 로테이션, 기존 암호문 호환
+    """
+
+    def test_cipher_instances_are_memoized(self):
+        self.assertIs(keyring.field_cipher(), keyring.field_cipher())
+        self.assertIs(keyring.aesgcm('sp-secret' * 4), keyring.aesgcm('sp-secret' * 4))
+
+    def test_legacy_tokens_still_decrypt(self):
+        legacy_key = base64.urlsafe_b64encode(settings.SECRET_KEY.encode()[:32])
+        token = Fernet(legacy_key).encrypt(b'CI-legacy').decode()
+
+        self.assertEqual(EncryptionUtil.decrypt_field(token), 'CI-legacy')
+
+    def test_rotation_with_multiple_active_keys(self):
+        old_token = EncryptionUtil.encrypt_field('CI-rotate')
+        new_key = Fernet.generate_key().decode()
+        idp_settings = {
+            **settings.IDP_SETTINGS,
+            'FIELD_ENCRYPTION_KEYS': {'2026-10': new_key, 'legacy': None},
+        }
+
+        with override_settings(IDP_SETTINGS=idp_settings):
+            self.assertEqual(keyring.primary_key_id(), '2026-10')
+            self.assertEqual(EncryptionUtil.decrypt_field(old_token), 'CI-rotate')
+            rotated = EncryptionUtil.rotate_field(old_token)
+            # New primary key alone can read the rotated value
+            self.assertEqual(Fernet(new_key).decrypt(rotated.encode()), b'CI-rotate')
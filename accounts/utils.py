@@ -1,11 +1,94 @@
 """
 Utility functions for cryptography operations
 """
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from idp_backend.metrics import ENCRYPTION_SECONDS
+import functools
 import os
 import base64
+import threading
+
+
+def legacy_field_key():
+    """Fernet key derived from SECRET_KEY[:32] (the original CI/DI key)"""
+    return base64.urlsafe_b64encode(settings.SECRET_KEY.encode()[:32])
+
+
+def _raw_aes_key(key):
+    if isinstance(key, str):
+        key = key.encode()[:32]  # Ensure 256-bit key
+    return key
+
+
+class KeyRing:
+    """
+    Process-wide cache of cipher objects
+    - Field keys come from IDP_SETTINGS['FIELD_ENCRYPTION_KEYS'], an ordered
+      {key_id: fernet_key} mapping; the first entry encrypts, all of them
+      decrypt. A None value stands for the legacy SECRET_KEY-derived key.
+      Unset means {'legacy': None}.
+    - Fernet and AESGCM instances are memoized per key for the life of the
+      process; they are stateless and safe to share between threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._field_keys = None
+        self._field_cipher = None
+
+    def field_keys(self):
+        """{key_id: fernet_key} with the primary key first"""
+        if self._field_keys is None:
+            with self._lock:
+                if self._field_keys is None:
+                    configured = getattr(settings, 'IDP_SETTINGS', {}).get('FIELD_ENCRYPTION_KEYS') or {'legacy': None}
+                    self._field_keys = {
+                        key_id: (key.encode() if isinstance(key, str) else key) or legacy_field_key()
+                        for key_id, key in configured.items()
+                    }
+        return self._field_keys
+
+    def primary_key_id(self):
+        return next(iter(self.field_keys()))
+
+    def field_cipher(self):
+        """MultiFernet over every configured field key"""
+        if self._field_cipher is None:
+            cipher = MultiFernet([self.fernet(key) for key in self.field_keys().values()])
+            with self._lock:
+                if self._field_cipher is None:
+                    self._field_cipher = cipher
+        return self._field_cipher
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def fernet(key):
+        return Fernet(key)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def aesgcm(key):
+        return AESGCM(_raw_aes_key(key))
+
+    def clear(self):
+        with self._lock:
+            self._field_keys = None
+            self._field_cipher = None
+        KeyRing.fernet.cache_clear()
+        KeyRing.aesgcm.cache_clear()
+
+
+keyring = KeyRing()
+
+
+@receiver(setting_changed)
+def _reset_keyring(setting, **kwargs):
+    if setting in ('SECRET_KEY', 'IDP_SETTINGS'):
+        keyring.clear()
 
 
 class EncryptionUtil:
@@ -17,41 +100,38 @@ class EncryptionUtil:
         return Fernet.generate_key()
     
     @staticmethod
+    @ENCRYPTION_SECONDS.time(operation='encrypt_field')
     def encrypt_field(plaintext, key=None):
         """
         Encrypt a field value (CI/DI)
-        For demo purposes, we use Fernet (symmetric encryption)
-        In production, use proper key management service
+        Fernet (symmetric encryption) with the keyring's primary key unless
+        an explicit key is given
         """
-        if key is None:
-            # Use a default key for demo (should be in environment variable)
-            key = settings.SECRET_KEY.encode()[:32]
-            key = base64.urlsafe_b64encode(key)
-        
-        f = Fernet(key)
+        f = keyring.field_cipher() if key is None else keyring.fernet(key)
         encrypted = f.encrypt(plaintext.encode())
         return encrypted.decode()
     
     @staticmethod
+    @ENCRYPTION_SECONDS.time(operation='decrypt_field')
     def decrypt_field(encrypted_text, key=None):
-        """Decrypt a field value (CI/DI)"""
-        if key is None:
-            key = settings.SECRET_KEY.encode()[:32]
-            key = base64.urlsafe_b64encode(key)
-        
-        f = Fernet(key)
+        """Decrypt a field value (CI/DI) with any configured field key"""
+        f = keyring.field_cipher() if key is None else keyring.fernet(key)
         decrypted = f.decrypt(encrypted_text.encode())
         return decrypted.decode()
     
     @staticmethod
+    @ENCRYPTION_SECONDS.time(operation='rotate_field')
+    def rotate_field(encrypted_text):
+        """Re-encrypt a field value under the primary key"""
+        return keyring.field_cipher().rotate(encrypted_text.encode()).decode()
+    
+    @staticmethod
+    @ENCRYPTION_SECONDS.time(operation='encrypt_with_aes_gcm')
     def encrypt_with_aes_gcm(plaintext, key):
         """
         Encrypt using AES-256-GCM for service provider callback
         """
-        if isinstance(key, str):
-            key = key.encode()[:32]  # Ensure 256-bit key
-        
-        aesgcm = AESGCM(key)
+        aesgcm = keyring.aesgcm(key)
         nonce = os.urandom(12)  # 96-bit nonce for GCM
         ciphertext = aesgcm.encrypt(nonce, plaintext.encode(), None)
         
@@ -60,16 +140,14 @@ class EncryptionUtil:
         return base64.b64encode(combined).decode()
     
     @staticmethod
+    @ENCRYPTION_SECONDS.time(operation='decrypt_with_aes_gcm')
     def decrypt_with_aes_gcm(encrypted_text, key):
         """Decrypt using AES-256-GCM"""
-        if isinstance(key, str):
-            key = key.encode()[:32]
-        
         combined = base64.b64decode(encrypted_text.encode())
         nonce = combined[:12]
         ciphertext = combined[12:]
         
-        aesgcm = AESGCM(key)
+        aesgcm = keyring.aesgcm(key)
         plaintext = aesgcm.decrypt(nonce, ciphertext, None)
         return plaintext.decode()
 
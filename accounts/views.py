@@ -12,6 +12,7 @@ from django.urls import reverse_lazy
 from django.db.models import Count, Q
 
 from .models import User, UserRoleAssignment
+from .counters import get_counters
 from .forms import (
     UserRegistrationForm, 
     CustomLoginForm, 
@@ -19,7 +20,10 @@ from .forms import (
     PasswordChangeForm,
     PINChangeForm
 )
-from auth_transactions.models import AuthTransaction
+from auth_transactions.archive import user_history
+from auth_transactions.stats import get_user_stats
+from idp_backend.profiling import query_budget
+from idp_backend.routers import ReplicaReadMixin
 
 
 class HomeView(TemplateView):
@@ -32,28 +36,19 @@ class HomeView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # 전체 통계 (공개 정보)
-        context['total_users'] = User.objects.count()
-        context['total_transactions'] = AuthTransaction.objects.count()
-        context['success_rate'] = self._calculate_success_rate()
+        # 전체 통계 (공개 정보) - 캐시된 카운터, 큰 테이블은 조회하지 않음
+        context['stats'] = get_counters()
         
         return context
-    
-    def _calculate_success_rate(self):
-        """인증 성공률 계산"""
-        total = AuthTransaction.objects.count()
-        if total == 0:
-            return 0
-        
-        completed = AuthTransaction.objects.filter(status='COMPLETED').count()
-        return round((completed / total) * 100, 1)
 
 
-class DashboardView(LoginRequiredMixin, TemplateView):
+@query_budget(8)  # worst path 6: recent list mixing hot and archived rows
+class DashboardView(ReplicaReadMixin, LoginRequiredMixin, TemplateView):
     """
     사용자 대시보드
     - 로그인 필요
     - 개인 인증 통계 표시
+    - 읽기 전용 복제본에서 조회 (쓰기 직후에는 primary)
     """
     template_name = 'dashboard.html'
     login_url = reverse_lazy('accounts:login')
@@ -62,13 +57,11 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         
-        # 사용자별 통계
-        context['auth_stats'] = self._get_user_auth_stats(user)
+        # 사용자별 통계 (단일 집계 쿼리 또는 캐시)
+        context['auth_stats'] = get_user_stats(user)
         
         # 최근 트랜잭션 (최근 5개)
-        context['recent_transactions'] = AuthTransaction.objects.filter(
-            user=user
-        ).select_related('service_provider').order_by('-created_at')[:5]
+        context['recent_transactions'] = user_history(user)[:5]
         
         # 사용자 역할
         context['user_roles'] = UserRoleAssignment.objects.filter(
@@ -76,17 +69,6 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         ).select_related('role')
         
         return context
-    
-    def _get_user_auth_stats(self, user):
-        """사용자 인증 통계"""
-        transactions = AuthTransaction.objects.filter(user=user)
-        
-        return {
-            'total': transactions.count(),
-            'completed': transactions.filter(status='COMPLETED').count(),
-            'failed': transactions.filter(status='FAILED').count(),
-            'pending': transactions.filter(status='PENDING').count(),
-        }
 
 
 class UserLoginView(LoginView):
@@ -170,11 +152,7 @@ class ProfileView(LoginRequiredMixin, TemplateView):
         ).select_related('role')
         
         # 인증 통계
-        context['auth_stats'] = {
-            'total': AuthTransaction.objects.filter(user=user).count(),
-            'completed': AuthTransaction.objects.filter(user=user, status='COMPLETED').count(),
-            'failed': AuthTransaction.objects.filter(user=user, status='FAILED').count(),
-        }
+        context['auth_stats'] = get_user_stats(user)
         
         return context
 
@@ -2,6 +2,9 @@
 Admin configuration for audit_logs app
 """
 from django.contrib import admin
+from django.utils.decorators import method_decorator
+
+from idp_backend.routers import read_from_replica
 from .models import AuditLog
 
 
@@ -57,6 +60,19 @@ class AuditLogAdmin(admin.ModelAdmin):
         }),
     )
     
+    @method_decorator(read_from_replica)
+    def changelist_view(self, request, extra_context=None):
+        """List pages are served from the read replica when one is configured"""
+        return super().changelist_view(request, extra_context)
+    
+    def get_queryset(self, request):
+        """
+        user is nullable, so the changelist's default select_related() skips
+        it and the user column would fetch one user per row; change/delete
+        pages render __str__, which reads user as well
+        """
+        return super().get_queryset(request).select_related('user')
+    
     def has_add_permission(self, request):
         """Audit logs are created automatically"""
         return False
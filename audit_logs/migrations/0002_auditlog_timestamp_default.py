@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit_logs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, help_text='When the action occurred'),
+        ),
+    ]
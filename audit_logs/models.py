@@ -2,6 +2,7 @@
 AuditLog model - Security and compliance logging
 """
 from django.db import models
+from django.utils import timezone
 
 
 class AuditLog(models.Model):
@@ -67,7 +68,8 @@ class AuditLog(models.Model):
         help_text="HTTP status code of the response"
     )
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         db_index=True,
         help_text="When the action occurred"
     )
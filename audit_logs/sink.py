@@ -0,0 +1,403 @@
+"""
+Audit sink - decouples AuditLog writes from the request path
+
+Modes (IDP_SETTINGS['AUDIT_SINK']['MODE']):
+- 'sync': every record is an immediate INSERT (previous behaviour)
+- 'buffered': records are kept in memory, optionally mirrored to an
+  append-only spool file, and written with bulk_create once BATCH_SIZE
+  records are waiting or FLUSH_INTERVAL_SECONDS has passed
+
+record(..., strict=True) always writes synchronously inside the caller's
+transaction; use it for compliance-critical actions.
+"""
+from datetime import datetime
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import AuditLog
+
+
+logger = logging.getLogger(__name__)
+
+AUDIT_FIELDS = (
+    'user_id', 'action', 'details', 'ip_address', 'user_agent',
+    'request_path', 'request_method', 'status_code', 'timestamp',
+)
+
+
+def _normalize(fields):
+    """Accept user=<User> as well as user_id=<pk>"""
+    fields = dict(fields)
+    user = fields.pop('user', None)
+    if user is not None:
+        fields['user_id'] = user.pk
+    return fields
+
+
+def _to_spool_line(fields):
+    data = {key: fields.get(key) for key in AUDIT_FIELDS if key in fields}
+    data['timestamp'] = fields['timestamp'].isoformat()
+    return json.dumps(data) + '\n'
+
+
+def _from_spool_line(line):
+    data = json.loads(line)
+    data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+    return data
+
+
+class SyncAuditSink:
+    """One INSERT per record"""
+
+    def record(self, **fields):
+        return AuditLog.objects.create(**_normalize(fields))
+
+    def record_many(self, records):
+        return AuditLog.objects.bulk_create([AuditLog(**_normalize(fields)) for fields in records])
+
+    def flush(self):
+        return 0
+
+    def close(self):
+        pass
+
+
+class BufferedAuditSink:
+    """
+    Collects records and writes them with bulk_create
+    - batch_size: flush as soon as this many records are waiting
+    - flush_interval: max age (seconds) of the oldest waiting record;
+      a daemon thread enforces it while the process is idle and also takes
+      over full batches, so the request that fills the buffer never waits
+      for the bulk_create (without the thread, that request flushes)
+    - spool_dir: if set, every record is also appended to a per-process
+      JSONL file first, so a crash loses nothing (see replay_spool)
+    """
+
+    def __init__(self, batch_size=100, flush_interval=1.0, spool_dir=None, start_thread=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_dir = spool_dir
+        self._buffer = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._spool_file = None
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+            self._spool_path = os.path.join(
+                spool_dir, f'audit-{_process_tag()}-{uuid.uuid4().hex[:8]}.jsonl'
+            )
+            self._spool_file = open(self._spool_path, 'a', encoding='utf-8')
+
+        if start_thread and flush_interval:
+            self._thread = threading.Thread(
+                target=self._flush_loop, name='audit-sink-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def record(self, **fields):
+        fields = _normalize(fields)
+        fields.setdefault('timestamp', timezone.now())
+        # Only buffer once the caller's transaction has committed
+        transaction.on_commit(lambda: self._append(fields))
+
+    def record_many(self, records):
+        now = timezone.now()
+        records = [_normalize(fields) for fields in records]
+        for fields in records:
+            fields.setdefault('timestamp', now)
+        transaction.on_commit(lambda: self._append(*records))
+
+    def _append(self, *records):
+        with self._lock:
+            if self._spool_file is not None:
+                self._spool_file.write(''.join(_to_spool_line(fields) for fields in records))
+                self._spool_file.flush()
+            self._buffer.extend(records)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = self._is_due()
+        if not due:
+            return
+        if self._thread is not None:
+            self._wakeup.set()
+        else:
+            self.flush()
+
+    def _is_due(self):
+        return len(self._buffer) >= self.batch_size or self._is_stale()
+
+    def _is_stale(self):
+        return (
+            self.flush_interval is not None
+            and self._oldest is not None
+            and time.monotonic() - self._oldest >= self.flush_interval
+        )
+
+    def _swap(self):
+        """Take the buffer (and rotate the spool file) under the lock"""
+        with self._lock:
+            records, self._buffer, self._oldest = self._buffer, [], None
+            rotated = None
+            if self._spool_file is not None and records:
+                self._spool_file.close()
+                rotated = f'{self._spool_path}.{uuid.uuid4().hex[:8]}.flushing'
+                os.replace(self._spool_path, rotated)
+                self._spool_file = open(self._spool_path, 'a', encoding='utf-8')
+            return records, rotated
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of rows inserted"""
+        with self._flush_lock:
+            records, rotated = self._swap()
+            if not records:
+                return 0
+            try:
+                AuditLog.objects.bulk_create(
+                    [AuditLog(**fields) for fields in records],
+                    batch_size=self.batch_size
+                )
+            except Exception:
+                # Re-queue the records and fold the rotated spool back into the live one
+                logger.exception('Audit flush failed; %d records re-queued', len(records))
+                with self._lock:
+                    self._buffer[:0] = records
+                    self._oldest = self._oldest or time.monotonic()
+                    if rotated:
+                        with open(rotated, encoding='utf-8') as f:
+                            self._spool_file.write(f.read())
+                        self._spool_file.flush()
+                        os.remove(rotated)
+                return 0
+            if rotated:
+                os.remove(rotated)
+            return len(records)
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                return
+            with self._lock:
+                due = self._is_due()
+            if due:
+                self.flush()
+                close_old_connections()
+
+    def close(self):
+        """Stop the flusher thread and write what is left"""
+        self._stopped.set()
+        self._wakeup.set()
+        self.flush()
+        if self._spool_file is not None:
+            self._spool_file.close()
+            self._spool_file = None
+            if os.path.exists(self._spool_path) and os.path.getsize(self._spool_path) == 0:
+                os.remove(self._spool_path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_start(pid):
+    """
+    Start time of pid in clock ticks since boot (/proc/<pid>/stat field 22)
+    Returns None where /proc is not available. PIDs are reused (a restarted
+    container hands out the same ones), the (pid, start) pair is not.
+    """
+    try:
+        with open(f'/proc/{pid}/stat', encoding='utf-8', errors='replace') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # comm may contain spaces and parentheses; fields resume after the last ')'
+    return stat.rsplit(')', 1)[1].split()[19]
+
+
+def _process_tag():
+    """'<pid>-<start>' of this process, used in spool and claim file names"""
+    return f'{os.getpid()}-{_process_start(os.getpid()) or 0}'
+
+
+def _owner_alive(name):
+    """
+    Whether the process named in a spool or claim file name still runs
+    Names are audit-<pid>-<start>-<hex>.jsonl[.<hex>.flushing] or
+    replay-<pid>-<start>-<hex>-<original name>; files written before the
+    start time was recorded (audit-<pid>-<hex>.jsonl) fall back to the pid.
+    """
+    parts = name.split('-')
+    pid = int(parts[1])
+    if not _pid_alive(pid):
+        return False
+    if len(parts) < 4 or parts[3] == 'audit' or parts[2] == '0':
+        return True
+    current = _process_start(pid)
+    return current is None or current == parts[2]
+
+
+def _original_name(name):
+    """Strip any replay-<pid>-<start>-<hex>- prefixes from a claimed file name"""
+    while name.startswith('replay-'):
+        name = name[name.index('-audit-') + 1:]
+    return name
+
+
+def _claim_spool_file(spool_dir, path):
+    """
+    Rename a spool file to a name only this process uses
+    Returns the new path, or None when another process claimed it first.
+    """
+    name = _original_name(os.path.basename(path))
+    claimed = os.path.join(spool_dir, f'replay-{_process_tag()}-{uuid.uuid4().hex[:8]}-{name}')
+    try:
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        return None
+    return claimed
+
+
+def _read_spool_file(path):
+    """
+    Records in a spool file
+    A last line cut off without its newline is what a crash mid-write
+    leaves behind; it is logged and dropped. Any other unreadable line
+    raises ValueError.
+    """
+    with open(path, encoding='utf-8') as f:
+        lines = f.read().split('\n')
+    records = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            records.append(_from_spool_line(line))
+        except (ValueError, KeyError, TypeError) as e:
+            if number == len(lines):
+                logger.warning('Dropping torn last line of audit spool %s: %r', path, line[:200])
+                continue
+            raise ValueError(f'line {number}: {e!r}') from e
+    return records
+
+
+def replay_spool(spool_dir, only_dead=True):
+    """
+    Insert records left in spool files by processes that did not flush
+    Files still owned by a live process are skipped unless only_dead=False.
+    Each file is claimed with an atomic rename before it is read, so workers
+    starting together never replay the same file twice; a replayer that
+    dies mid-way leaves its replay-* file for the next one. A file with an
+    unreadable record is moved aside as <name>.bad, and a file whose insert
+    fails is handed back for a later run; either way the remaining files
+    are still replayed. Returns the number of rows inserted.
+    """
+    inserted = 0
+    paths = glob.glob(os.path.join(spool_dir, 'audit-*.jsonl*'))
+    paths += glob.glob(os.path.join(spool_dir, 'replay-*'))
+    for path in sorted(paths):
+        name = os.path.basename(path)
+        if name.endswith('.bad'):
+            continue
+        try:
+            if only_dead and _owner_alive(name):
+                continue
+        except (ValueError, IndexError):
+            logger.warning('Skipping audit spool file with an unexpected name: %s', path)
+            continue
+        claimed = _claim_spool_file(spool_dir, path)
+        if claimed is None:
+            continue
+        try:
+            logs = [AuditLog(**fields) for fields in _read_spool_file(claimed)]
+        except (ValueError, TypeError):
+            bad = os.path.join(spool_dir, _original_name(name) + '.bad')
+            logger.exception('Audit spool %s has an unreadable record; moved to %s', path, bad)
+            os.rename(claimed, bad)
+            continue
+        try:
+            with transaction.atomic():
+                AuditLog.objects.bulk_create(logs)
+        except Exception:
+            # Hand the file back under its original name for a later replay
+            logger.exception('Audit spool %s could not be replayed; kept for a later run', path)
+            os.rename(claimed, path)
+            continue
+        inserted += len(logs)
+        os.remove(claimed)
+    return inserted
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def build_sink():
+    """Create the sink described by IDP_SETTINGS['AUDIT_SINK']"""
+    config = settings.IDP_SETTINGS.get('AUDIT_SINK', {})
+    if config.get('MODE', 'sync') != 'buffered':
+        return SyncAuditSink()
+    spool_dir = config.get('SPOOL_DIR')
+    if spool_dir:
+        try:
+            replay_spool(spool_dir)
+        except Exception:
+            # Leftovers stay on disk for the next start; never fail the request
+            logger.exception('Audit spool replay failed')
+    return BufferedAuditSink(
+        batch_size=config.get('BATCH_SIZE', 100),
+        flush_interval=config.get('FLUSH_INTERVAL_SECONDS', 1.0),
+        spool_dir=spool_dir,
+    )
+
+
+def get_sink():
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = build_sink()
+                atexit.register(_sink.close)
+    return _sink
+
+
+def record_audit(strict=False, **fields):
+    """
+    Record an AuditLog entry through the configured sink
+    strict=True forces an immediate INSERT in the current transaction
+    """
+    if strict:
+        return AuditLog.objects.create(**_normalize(fields))
+    return get_sink().record(**fields)
+
+
+def record_audit_many(records, strict=False):
+    """
+    Record several AuditLog entries (list of field dicts) in one go
+    Sync mode and strict=True write them with a single bulk_create
+    """
+    if strict:
+        return SyncAuditSink().record_many(records)
+    return get_sink().record_many(records)
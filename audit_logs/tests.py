@@ -1,3 +1,229 @@
+"""
+Tests for audit_logs app
+"""
+import json
+import os
+import tempfile
+import threading
+
+from datetime import timedelta
+from unittest import mock
+
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from audit_logs.models import AuditLog
+from audit_logs.sink import BufferedAuditSink, build_sink, record_audit, replay_spool
+from auth_transactions.models import AuthTransaction
+from idp_backend.testing import QueryBudgetMixin
+from services.models import ServiceProvider
+
+
+def _fields(n):
+    return {
+        'action': 'AUTH_REQUEST',
+        'details': f'buffered record {n}',
+        'ip_address': '127.0.0.1',
+    }
+
+
+class BufferedAuditSinkTestCase(TestCase):
+    """
+    버퍼링 감사 로그 싱크 테스트
+    - 건수 임계치 도달 시 bulk_create
+    - spool 파일을 통한 장애 복구
+    """
+
+    def test_flush_on_batch_size(self):
+        sink = BufferedAuditSink(batch_size=3, flush_interval=None, start_thread=False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sink.record(**_fields(1))
+            sink.record(**_fields(2))
+        self.assertEqual(AuditLog.objects.count(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sink.record(**_fields(3))
+        self.assertEqual(AuditLog.objects.count(), 3)
+
+    def test_explicit_flush_keeps_event_timestamp(self):
+        sink = BufferedAuditSink(batch_size=100, flush_interval=None, start_thread=False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sink.record(**_fields(1))
+        recorded_at = sink._buffer[0]['timestamp']
+
+        self.assertEqual(sink.flush(), 1)
+        self.assertEqual(AuditLog.objects.get().timestamp, recorded_at)
+
+    def test_rolled_back_records_are_not_buffered(self):
+        sink = BufferedAuditSink(batch_size=100, flush_interval=None, start_thread=False)
+
+        with self.captureOnCommitCallbacks(execute=False):
+            sink.record(**_fields(1))
+
+        self.assertEqual(sink.flush(), 0)
+
+    def test_spool_replay_after_crash(self):
+        with tempfile.TemporaryDirectory() as spool_dir:
+            sink = BufferedAuditSink(
+                batch_size=100, flush_interval=None, spool_dir=spool_dir, start_thread=False
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                sink.record(**_fields(1))
+                sink.record(**_fields(2))
+            sink._spool_file.close()  # 프로세스 비정상 종료 흉내 (flush 없음)
+
+            self.assertEqual(replay_spool(spool_dir, only_dead=False), 2)
+            self.assertEqual(AuditLog.objects.count(), 2)
+            self.assertEqual(os.listdir(spool_dir), [])
+
+    def test_spool_file_is_replayed_once(self):
+        with tempfile.TemporaryDirectory() as spool_dir:
+            sink = BufferedAuditSink(
+                batch_size=100, flush_interval=None, spool_dir=spool_dir, start_thread=False
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                sink.record(**_fields(1))
+            sink._spool_file.close()
+            path = sink._spool_path
+            real_rename = os.rename
+
+            def rename_after_other_worker(src, dst):
+                # 다른 워커가 같은 파일을 먼저 가져간 상황
+                if src == path and os.path.exists(path):
+                    real_rename(src, os.path.join(spool_dir, 'taken'))
+                return real_rename(src, dst)
+
+            with mock.patch('audit_logs.sink.os.rename', side_effect=rename_after_other_worker):
+                self.assertEqual(replay_spool(spool_dir, only_dead=False), 0)
+            self.assertEqual(AuditLog.objects.count(), 0)
+
+    def test_replay_failure_does_not_break_sink(self):
+        with tempfile.TemporaryDirectory() as spool_dir:
+            with open(os.path.join(spool_dir, 'audit-999999999-dead.jsonl'), 'w') as f:
+                f.write('{"action": "AUTH_REQUEST", "timestamp": "not a date"}\n')
+            config = {'MODE': 'buffered', 'FLUSH_INTERVAL_SECONDS': None, 'SPOOL_DIR': spool_dir}
+
+            with self.settings(IDP_SETTINGS={'AUDIT_SINK': config}), \
+                    self.assertLogs('audit_logs.sink', 'ERROR'):
+                sink = build_sink()
+            sink.close()
+
+            self.assertEqual(os.listdir(spool_dir), ['audit-999999999-dead.jsonl.bad'])
+
+    def _write_spool(self, spool_dir, name, count, torn=False):
+        timestamp = timezone.now().isoformat()
+        with open(os.path.join(spool_dir, name), 'w') as f:
+            for n in range(count):
+                f.write(json.dumps({**_fields(n), 'timestamp': timestamp}) + '\n')
+            if torn:
+                f.write('{"action": "AUTH_REQ')  # 쓰는 도중 프로세스 종료
+
+    def test_torn_last_line_is_dropped(self):
+        with tempfile.TemporaryDirectory() as spool_dir:
+            self._write_spool(spool_dir, 'audit-999999998-0-aaaa.jsonl', 2, torn=True)
+            self._write_spool(spool_dir, 'audit-999999999-0-bbbb.jsonl', 3)
+
+            with self.assertLogs('audit_logs.sink', 'WARNING'):
+                self.assertEqual(replay_spool(spool_dir), 5)
+
+            self.assertEqual(AuditLog.objects.count(), 5)
+            self.assertEqual(os.listdir(spool_dir), [])
+
+    def test_corrupt_file_is_quarantined_and_others_replayed(self):
+        with tempfile.TemporaryDirectory() as spool_dir:
+            self._write_spool(spool_dir, 'audit-999999998-0-aaaa.jsonl', 1)
+            with open(os.path.join(spool_dir, 'audit-999999998-0-aaaa.jsonl'), 'a') as f:
+                f.write('garbage\n')
+            self._write_spool(spool_dir, 'audit-999999999-0-bbbb.jsonl', 3)
+
+            with self.assertLogs('audit_logs.sink', 'ERROR'):
+                self.assertEqual(replay_spool(spool_dir), 3)
+
+            self.assertEqual(os.listdir(spool_dir), ['audit-999999998-0-aaaa.jsonl.bad'])
+            # 격리된 파일은 다음 실행에서 다시 읽지 않음
+            self.assertEqual(replay_spool(spool_dir), 0)
+
+    def test_reused_pid_does_not_keep_spool_alive(self):
+        with tempfile.TemporaryDirectory() as spool_dir:
+            # 이전 컨테이너에서 같은 PID를 쓰던 프로세스가 남긴 파일
+            self._write_spool(spool_dir, f'audit-{os.getpid()}-1-aaaa.jsonl', 2)
+            sink = BufferedAuditSink(
+                batch_size=100, flush_interval=None, spool_dir=spool_dir, start_thread=False
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                sink.record(**_fields(1))
+
+            self.assertEqual(replay_spool(spool_dir), 2)
+            self.assertEqual(os.listdir(spool_dir), [os.path.basename(sink._spool_path)])
+            sink.close()
+
+    def test_full_batch_is_flushed_by_flusher_thread(self):
+        flushed = threading.Event()
+        flushing_threads = []
+
+        def fake_flush(sink):
+            flushing_threads.append(threading.current_thread().name)
+            flushed.set()
+            return 0
+
+        with mock.patch.object(BufferedAuditSink, 'flush', fake_flush):
+            sink = BufferedAuditSink(batch_size=2, flush_interval=60)
+            with self.captureOnCommitCallbacks(execute=True):
+                sink.record(**_fields(1))
+                sink.record(**_fields(2))
+
+            self.assertTrue(flushed.wait(5))
+            sink.close()
+        self.assertEqual(flushing_threads[0], 'audit-sink-flusher')
+
+    def test_strict_record_is_written_immediately(self):
+        log = record_audit(strict=True, **_fields(1))
+
+        self.assertIsNotNone(log.pk)
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+
+class AdminQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """
+    관리자 목록/자동완성의 N+1 회귀 테스트
+    - __str__이 user를 읽어도 행 수만큼 쿼리가 늘지 않음
+    """
+
+    def setUp(self):
+        admin_user = User.objects.create_superuser(
+            username='auditadmin', password='auditpass', phone_number='010-9090-0000',
+            ci='ci-auditadmin', di='di-auditadmin'
+        )
+        sp = ServiceProvider.objects.create(
+            service_name='Audit Admin Service',
+            client_id='audit_admin_client',
+            client_secret=ServiceProvider.hash_secret('audit_admin_secret'),
+            callback_url='https://example.com/callback'
+        )
+        for i in range(20):
+            user = User.objects.create_user(
+                username=f'audited{i}', phone_number=f'010-9090-{i + 1:04d}',
+                ci=f'ci-audited-{i}', di=f'di-audited-{i}'
+            )
+            AuditLog.objects.create(user=user, **_fields(i))
+            AuthTransaction.objects.create(
+                user=user, service_provider=sp, expires_at=timezone.now() + timedelta(minutes=3)
+            )
+        self.client.login(username='auditadmin', password='auditpass')
+
+    def test_changelists(self):
+        for path in ('/admin/audit_logs/auditlog/', '/admin/auth_transactions/authtransaction/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.assertQueryBudget('GET', path, budget=10).status_code, 200)
+
+    def test_transaction_autocomplete(self):
+        response = self.assertQueryBudget(
+            'GET', '/admin/autocomplete/',
+            {'app_label': 'auth_transactions', 'model_name': 'notificationlog', 'field_name': 'transaction'},
+            budget=5
+        )
 
-# Create your tests here.
+        self.assertEqual(len(response.json()['results']), 20)
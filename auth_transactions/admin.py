@@ -2,7 +2,10 @@
 Admin configuration for auth_transactions app
 """
 from django.contrib import admin
-from .models import AuthTransaction, NotificationLog
+from django.utils.decorators import method_decorator
+
+from idp_backend.routers import read_from_replica
+from .models import ArchivedAuthTransaction, AuthTransaction, NotificationLog, CallbackDelivery
 
 
 @admin.register(AuthTransaction)
@@ -46,6 +49,19 @@ class AuthTransactionAdmin(admin.ModelAdmin):
         }),
     )
     
+    @method_decorator(read_from_replica)
+    def changelist_view(self, request, extra_context=None):
+        """List pages are served from the read replica when one is configured"""
+        return super().changelist_view(request, extra_context)
+    
+    def get_queryset(self, request):
+        """
+        __str__ reads user; also serves the NotificationLog transaction autocomplete
+        The changelist skips list_select_related once this queryset has a
+        select_related(), so the service_provider column is joined here too.
+        """
+        return super().get_queryset(request).select_related('user', 'service_provider')
+    
     def has_add_permission(self, request):
         """Transactions are created via API, not manually"""
         return False
@@ -55,6 +71,40 @@ class AuthTransactionAdmin(admin.ModelAdmin):
         return request.user.is_superuser
 
 
+@admin.register(ArchivedAuthTransaction)
+class ArchivedAuthTransactionAdmin(admin.ModelAdmin):
+    """ArchivedAuthTransaction admin configuration (Read-only)"""
+    
+    list_display = (
+        'transaction_id',
+        'user',
+        'service_provider',
+        'status',
+        'created_at',
+        'archived_at'
+    )
+    list_filter = ('status', 'service_provider')
+    search_fields = ('transaction_id', 'user__username', 'service_provider__service_name')
+    list_select_related = ('user', 'service_provider')
+    date_hierarchy = 'created_at'
+    
+    @method_decorator(read_from_replica)
+    def changelist_view(self, request, extra_context=None):
+        """List pages are served from the read replica when one is configured"""
+        return super().changelist_view(request, extra_context)
+    
+    def has_add_permission(self, request):
+        """Rows are moved here by archive_transactions"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        """Preserve transaction history"""
+        return request.user.is_superuser
+
+
 @admin.register(NotificationLog)
 class NotificationLogAdmin(admin.ModelAdmin):
     """NotificationLog admin configuration"""
@@ -68,7 +118,7 @@ class NotificationLogAdmin(admin.ModelAdmin):
     )
     list_filter = ('notification_type', 'status', 'created_at')
     search_fields = ('user__username', 'user__phone_number', 'message')
-    readonly_fields = ('created_at', 'sent_at')
+    readonly_fields = ('created_at', 'sent_at', 'attempts', 'next_attempt_at', 'last_error')
     autocomplete_fields = ['user', 'transaction']
     date_hierarchy = 'created_at'
     
@@ -77,7 +127,7 @@ class NotificationLogAdmin(admin.ModelAdmin):
             'fields': ('user', 'transaction', 'notification_type', 'message')
         }),
         ('Status', {
-            'fields': ('status', 'sent_at', 'created_at')
+            'fields': ('status', 'sent_at', 'created_at', 'attempts', 'next_attempt_at', 'last_error')
         }),
     )
     
@@ -85,3 +135,37 @@ class NotificationLogAdmin(admin.ModelAdmin):
         """Notifications are created automatically"""
         return False
 
+
+@admin.register(CallbackDelivery)
+class CallbackDeliveryAdmin(admin.ModelAdmin):
+    """CallbackDelivery admin configuration (outbox monitoring)"""
+    
+    list_display = (
+        'transaction',
+        'service_provider',
+        'event',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'response_status'
+    )
+    list_filter = ('status', 'event', 'service_provider')
+    search_fields = ('transaction__transaction_id', 'service_provider__service_name')
+    list_select_related = ('service_provider', 'transaction__user')
+    readonly_fields = (
+        'transaction',
+        'service_provider',
+        'event',
+        'payload',
+        'attempts',
+        'lease_token',
+        'last_error',
+        'response_status',
+        'created_at',
+        'updated_at',
+        'delivered_at'
+    )
+    
+    def has_add_permission(self, request):
+        """Deliveries are queued by status transitions"""
+        return False
@@ -4,3 +4,29 @@ from django.apps import AppConfig
 class AuthTransactionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'auth_transactions'
+
+    def ready(self):
+        from django.db.models.signals import post_save
+
+        from .signals import announce_creation, transaction_status_changed
+        from .stats import update_user_stats
+        from .status_cache import forget_completed_status
+        from .status_hub import wake_status_waiters
+
+        post_save.connect(
+            announce_creation,
+            sender='auth_transactions.AuthTransaction',
+            dispatch_uid='auth_transactions.announce_creation'
+        )
+        transaction_status_changed.connect(
+            wake_status_waiters,
+            dispatch_uid='auth_transactions.wake_status_waiters'
+        )
+        transaction_status_changed.connect(
+            update_user_stats,
+            dispatch_uid='auth_transactions.update_user_stats'
+        )
+        transaction_status_changed.connect(
+            forget_completed_status,
+            dispatch_uid='auth_transactions.forget_completed_status'
+        )
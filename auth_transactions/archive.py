@@ -0,0 +1,140 @@
+"""
+Hot/cold split of AuthTransaction
+
+archive_batch() moves terminal transactions (COMPLETED/FAILED/EXPIRED)
+created before the retention cutoff into ArchivedAuthTransaction, in
+bounded batches walked through idx_tx_created_at: the archive rows are
+inserted and the hot rows deleted in one DB transaction. PENDING rows and
+rows whose callback is still queued are never moved, so the hot table
+only holds recent and in-flight transactions.
+
+TransactionHistory reads one user's hot and archived transactions as a
+single newest-first sequence for the history pages.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, Value
+from django.utils import timezone
+
+from .models import ArchivedAuthTransaction, AuthTransaction, CallbackDelivery
+
+
+TERMINAL_STATUSES = ('COMPLETED', 'FAILED', 'EXPIRED')
+
+
+def _setting(name, default):
+    return getattr(settings, 'IDP_SETTINGS', {}).get(name, default)
+
+
+def retention_cutoff(days=None, now=None):
+    days = _setting('TRANSACTION_ARCHIVE_AFTER_DAYS', 90) if days is None else days
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def archive_batch(cutoff, batch_size=1000):
+    """
+    Move at most batch_size terminal transactions created before cutoff
+    Returns the number of rows archived.
+    """
+    with transaction.atomic():
+        batch = list(
+            AuthTransaction.objects.select_for_update(skip_locked=True)
+            .filter(status__in=TERMINAL_STATUSES, created_at__lt=cutoff)
+            .exclude(callbacks__status='PENDING')
+            .order_by('created_at')[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        ids = [auth_tx.pk for auth_tx in batch]
+        ArchivedAuthTransaction.objects.bulk_create(
+            [ArchivedAuthTransaction.from_transaction(auth_tx) for auth_tx in batch],
+            ignore_conflicts=True
+        )
+        # Delivered / dead-lettered outbox rows go with the hot row
+        CallbackDelivery.objects.filter(transaction_id__in=ids).delete()
+        AuthTransaction.objects.filter(pk__in=ids).delete()
+        return len(ids)
+
+
+def archive(days=None, batch_size=None, max_batches=None, now=None, on_batch=None):
+    """
+    Run archive_batch until nothing is left past the cutoff (or max_batches)
+    on_batch(rows, seconds) is called after each non-empty batch.
+    Returns (total_rows, elapsed_seconds).
+    """
+    cutoff = retention_cutoff(days, now)
+    batch_size = batch_size or _setting('TRANSACTION_ARCHIVE_BATCH_SIZE', 1000)
+    total = 0
+    batches = 0
+    started = time.perf_counter()
+    while max_batches is None or batches < max_batches:
+        batch_started = time.perf_counter()
+        rows = archive_batch(cutoff, batch_size)
+        if rows == 0:
+            break
+        batches += 1
+        total += rows
+        if on_batch is not None:
+            on_batch(rows, time.perf_counter() - batch_started)
+        if rows < batch_size:
+            break
+    return total, time.perf_counter() - started
+
+
+class TransactionHistory:
+    """
+    Hot and archived transactions as one sequence, newest first
+    Takes two equally filtered querysets (AuthTransaction and
+    ArchivedAuthTransaction) and supports what Paginator and templates use:
+    count(), len() and slicing. A slice reads (pk, created_at) from a
+    UNION ALL of both tables, then loads just those rows from each table
+    with the querysets' select_related.
+    """
+    ordered = True
+
+    def __init__(self, hot, archived):
+        self.hot = hot
+        self.archived = archived
+
+    def count(self):
+        return self.hot.count() + self.archived.count()
+
+    __len__ = count
+
+    def _keys(self, queryset, archived):
+        return queryset.order_by().annotate(
+            is_archived=Value(archived, output_field=BooleanField())
+        ).values_list('pk', 'created_at', 'is_archived')
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self[key:key + 1][0]
+
+        keys = list(
+            self._keys(self.hot, False)
+            .union(self._keys(self.archived, True), all=True)
+            .order_by('-created_at')[key]
+        )
+        hot_ids = [pk for pk, _, archived in keys if not archived]
+        archived_ids = [pk for pk, _, archived in keys if archived]
+        rows = {}
+        if hot_ids:
+            rows.update((tx.pk, tx) for tx in self.hot.filter(pk__in=hot_ids))
+        if archived_ids:
+            rows.update((tx.pk, tx) for tx in self.archived.filter(pk__in=archived_ids))
+        return [rows[pk] for pk, _, _ in keys if pk in rows]
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+def user_history(user):
+    """All of user's transactions, hot and archived"""
+    return TransactionHistory(
+        AuthTransaction.objects.filter(user=user).select_related('service_provider'),
+        ArchivedAuthTransaction.objects.filter(user=user).select_related('service_provider'),
+    )
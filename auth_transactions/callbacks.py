@@ -0,0 +1,209 @@
+"""
+Signed webhook delivery for CallbackDelivery outbox rows
+
+Each claimed row is POSTed to its ServiceProvider.callback_url with an
+HMAC-SHA256 signature (keyed by the SP's client_secret) over
+"<timestamp>.<body>". Failures are retried with exponential backoff until
+CALLBACK_MAX_ATTEMPTS, after which the row is parked in the DEAD state.
+"""
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import hashlib
+import hmac
+import json
+import logging
+import queue
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CallbackDelivery
+
+
+logger = logging.getLogger(__name__)
+
+
+def sign_payload(secret, timestamp, body):
+    """Return the X-IdP-Signature value for a callback body"""
+    message = f'{timestamp}.'.encode() + body
+    digest = hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+    return f'sha256={digest}'
+
+
+class CallbackDispatcher:
+    """
+    Drains the callback outbox
+    - max_workers: total concurrent HTTP requests (also the connection pool size)
+    - per_sp_concurrency: concurrent requests to a single ServiceProvider from
+      this dispatcher; N dispatcher processes may send up to N times as many
+    
+    A batch never holds more of one SP's rows than its lanes can send
+    sequentially within the lease (lease_seconds // timeout per lane), and
+    each outcome is recorded as soon as its request finishes, so a lease is
+    not re-claimed by another dispatcher while its row is still in flight.
+    """
+
+    def __init__(self, max_workers=None, per_sp_concurrency=None, batch_size=None,
+                 max_attempts=None, backoff_base=None, backoff_max=None,
+                 timeout=None, lease_seconds=None, session=None):
+        idp_settings = getattr(settings, 'IDP_SETTINGS', {})
+        self.max_workers = max_workers or idp_settings.get('CALLBACK_MAX_WORKERS', 8)
+        self.per_sp_concurrency = per_sp_concurrency or idp_settings.get('CALLBACK_PER_SP_CONCURRENCY', 2)
+        self.batch_size = batch_size or idp_settings.get('CALLBACK_BATCH_SIZE', 100)
+        self.max_attempts = max_attempts or idp_settings.get('CALLBACK_MAX_ATTEMPTS', 8)
+        self.backoff_base = backoff_base if backoff_base is not None else idp_settings.get('CALLBACK_BACKOFF_BASE_SECONDS', 5)
+        self.backoff_max = backoff_max or idp_settings.get('CALLBACK_BACKOFF_MAX_SECONDS', 3600)
+        self.timeout = timeout or idp_settings.get('CALLBACK_TIMEOUT_SECONDS', 5)
+        self.lease_seconds = lease_seconds or idp_settings.get('CALLBACK_LEASE_SECONDS', 60)
+        self.session = session or self._build_session()
+        # Worst case every request runs into the timeout
+        self.lane_capacity = max(1, int(self.lease_seconds // self.timeout))
+
+    def _build_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def claim(self):
+        """
+        Lease up to batch_size due rows with a single UPDATE
+        The lease is next_attempt_at pushed into the future, so rows held by a
+        crashed dispatcher become due again once the lease runs out. Rows of
+        an SP beyond per_sp_concurrency * lane_capacity stay for the next batch.
+        """
+        now = timezone.now()
+        token = uuid.uuid4().hex
+        due = CallbackDelivery.objects.filter(
+            status='PENDING', next_attempt_at__lte=now
+        ).order_by('next_attempt_at').values_list('pk', 'service_provider_id')[:self.batch_size]
+        per_sp_limit = self.per_sp_concurrency * self.lane_capacity
+        taken = Counter()
+        due_ids = []
+        for pk, service_provider_id in due:
+            if taken[service_provider_id] < per_sp_limit:
+                taken[service_provider_id] += 1
+                due_ids.append(pk)
+        if not due_ids:
+            return []
+        # Repeating the due condition makes concurrent claimers skip rows already taken
+        CallbackDelivery.objects.filter(
+            pk__in=due_ids, status='PENDING', next_attempt_at__lte=now
+        ).update(
+            lease_token=token,
+            next_attempt_at=now + timedelta(seconds=self.lease_seconds),
+            updated_at=now
+        )
+        return list(
+            CallbackDelivery.objects.filter(lease_token=token, status='PENDING')
+            .select_related('service_provider')
+        )
+
+    def deliver(self, delivery):
+        """POST one delivery; returns (ok, response_status, error)"""
+        body = json.dumps(delivery.payload, separators=(',', ':')).encode()
+        timestamp = str(int(time.time()))
+        headers = {
+            'Content-Type': 'application/json',
+            'X-IdP-Event': delivery.event,
+            'X-IdP-Delivery': str(delivery.pk),
+            'X-IdP-Timestamp': timestamp,
+            'X-IdP-Signature': sign_payload(
+                delivery.service_provider.client_secret, timestamp, body
+            ),
+        }
+        try:
+            response = self.session.post(
+                delivery.service_provider.callback_url,
+                data=body,
+                headers=headers,
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            return False, None, str(e)
+        if 200 <= response.status_code < 300:
+            return True, response.status_code, ''
+        return False, response.status_code, f'HTTP {response.status_code}'
+
+    def _run_lane(self, deliveries, results):
+        """Deliver one SP's rows sequentially (one lane = one concurrent slot)"""
+        for delivery in deliveries:
+            try:
+                outcome = self.deliver(delivery)
+            except Exception as e:
+                outcome = (False, None, str(e))
+            results.put((delivery, *outcome))
+
+    def backoff(self, attempts):
+        """Delay before attempt number attempts + 1"""
+        return min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+
+    def _record(self, delivery, ok, response_status, error):
+        now = timezone.now()
+        attempts = delivery.attempts + 1
+        fields = {
+            'attempts': F('attempts') + 1,
+            'response_status': response_status,
+            'lease_token': '',
+            'updated_at': now,
+        }
+        if ok:
+            fields.update(status='DELIVERED', delivered_at=now, last_error='')
+            outcome = 'delivered'
+        elif attempts >= self.max_attempts:
+            fields.update(status='DEAD', last_error=error)
+            outcome = 'dead'
+            logger.warning('Callback %s dead-lettered after %s attempts: %s', delivery.pk, attempts, error)
+        else:
+            fields.update(
+                next_attempt_at=now + timedelta(seconds=self.backoff(attempts)),
+                last_error=error
+            )
+            outcome = 'retried'
+        updated = CallbackDelivery.objects.filter(
+            pk=delivery.pk, lease_token=delivery.lease_token
+        ).update(**fields)
+        if not updated:
+            logger.warning('Callback %s lease expired before its %s outcome was recorded', delivery.pk, outcome)
+        return outcome
+
+    def run_once(self):
+        """Claim and deliver one batch; returns outcome counts"""
+        deliveries = self.claim()
+        counts = {'claimed': len(deliveries), 'delivered': 0, 'retried': 0, 'dead': 0}
+        if not deliveries:
+            return counts
+
+        # Split each SP's rows into at most per_sp_concurrency lanes
+        by_sp = defaultdict(list)
+        for delivery in deliveries:
+            by_sp[delivery.service_provider_id].append(delivery)
+        lanes = []
+        for sp_deliveries in by_sp.values():
+            lane_count = min(self.per_sp_concurrency, len(sp_deliveries))
+            lanes.extend(sp_deliveries[i::lane_count] for i in range(lane_count))
+
+        # HTTP in worker threads; DB writes stay on this thread, one per
+        # finished request rather than one batch per finished lane
+        results = queue.Queue()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for lane in lanes:
+                pool.submit(self._run_lane, lane, results)
+            for _ in deliveries:
+                delivery, ok, response_status, error = results.get()
+                counts[self._record(delivery, ok, response_status, error)] += 1
+        return counts
+
+    def run_forever(self, interval=1.0, stop=None):
+        """Keep draining; sleeps for interval only when the outbox is idle"""
+        while stop is None or not stop():
+            counts = self.run_once()
+            if counts['claimed'] == 0:
+                time.sleep(interval)
@@ -0,0 +1,97 @@
+"""
+Bulk expiry of PENDING transactions past expires_at
+
+Python counterpart of sp_expire_pending_transactions (docs/sql_procedures.sql):
+rows are flipped in bounded batches walked through idx_tx_status_expires,
+and the matching AUTH_EXPIRED audit rows are written with bulk_create.
+"""
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from audit_logs.models import AuditLog
+from .models import AuthTransaction
+from .signals import announce_status_change
+
+
+def expire_batch(batch_size=1000, now=None):
+    """
+    Expire at most batch_size overdue PENDING transactions
+    Returns the number of rows moved to EXPIRED.
+    """
+    return _expire_batch(batch_size, now)[1]
+
+
+def _expire_batch(batch_size, now=None):
+    """(candidates selected, rows moved to EXPIRED)"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        candidates = list(
+            AuthTransaction.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', expires_at__lt=now)
+            .order_by('expires_at')
+            .values_list('transaction_id', 'user_id', 'service_provider_id')[:batch_size]
+        )
+        if not candidates:
+            return 0, 0
+        selected = len(candidates)
+
+        ids = [row[0] for row in candidates]
+        updated = AuthTransaction.objects.filter(
+            transaction_id__in=ids, status='PENDING'
+        ).update(status='EXPIRED', failure_reason='Expired (sweeper)', updated_at=now)
+
+        if updated != len(candidates):
+            # Someone else finished a few of these between SELECT and UPDATE
+            expired_ids = set(
+                AuthTransaction.objects.filter(
+                    transaction_id__in=ids, status='EXPIRED', updated_at=now
+                ).values_list('transaction_id', flat=True)
+            )
+            candidates = [row for row in candidates if row[0] in expired_ids]
+
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                user_id=user_id,
+                action='AUTH_EXPIRED',
+                details=f'Auto-expired transaction: {transaction_id}',
+                ip_address='0.0.0.0'
+            )
+            for transaction_id, user_id, _ in candidates
+        ])
+
+        for transaction_id, user_id, service_provider_id in candidates:
+            announce_status_change(
+                AuthTransaction(
+                    transaction_id=transaction_id,
+                    user_id=user_id,
+                    service_provider_id=service_provider_id,
+                    status='EXPIRED'
+                ),
+                'PENDING'
+            )
+        return selected, len(candidates)
+
+
+def sweep(batch_size=1000, max_batches=None, on_batch=None):
+    """
+    Run expire_batch until the backlog is drained (or max_batches is hit)
+    A batch cut short by concurrent confirmations or sweepers does not mean
+    the backlog is empty; only a batch that selects no candidate does.
+    on_batch(rows, seconds) is called after each non-empty batch.
+    Returns (total_rows, elapsed_seconds).
+    """
+    total = 0
+    batches = 0
+    started = time.perf_counter()
+    while max_batches is None or batches < max_batches:
+        batch_started = time.perf_counter()
+        selected, rows = _expire_batch(batch_size)
+        if selected == 0:
+            break
+        batches += 1
+        total += rows
+        if rows and on_batch is not None:
+            on_batch(rows, time.perf_counter() - batch_started)
+    return total, time.perf_counter() - started
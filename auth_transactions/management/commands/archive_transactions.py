@@ -0,0 +1,61 @@
+"""
+Move terminal transactions past the retention window to the archive table
+
+Usage:
+    python manage.py archive_transactions
+    python manage.py archive_transactions --days 30 --batch-size 5000
+    python manage.py archive_transactions --loop --interval 3600
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from auth_transactions.archive import archive, retention_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Move COMPLETED/FAILED/EXPIRED transactions older than the retention window to ArchivedAuthTransaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Retention window (default IDP_SETTINGS['TRANSACTION_ARCHIVE_AFTER_DAYS'])")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Rows per transaction (default IDP_SETTINGS['TRANSACTION_ARCHIVE_BATCH_SIZE'])")
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after N batches per run')
+        parser.add_argument('--loop', action='store_true', help='Run as a daemon loop')
+        parser.add_argument('--interval', type=float, default=3600.0, help='Sleep between runs in --loop mode (seconds)')
+        parser.add_argument('--verbose-batches', action='store_true', help='Print latency of every batch')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                self._archive_once(options)
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def _archive_once(self, options):
+        latencies = []
+
+        def on_batch(rows, seconds):
+            latencies.append(seconds)
+            if options['verbose_batches']:
+                self.stdout.write(f'  batch: {rows} rows in {seconds * 1000:.1f} ms')
+
+        total, elapsed = archive(
+            days=options['days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            on_batch=on_batch
+        )
+        if total == 0 and options['loop']:
+            return
+
+        rate = total / elapsed if elapsed > 0 else 0.0
+        max_ms = max(latencies) * 1000 if latencies else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {total} transactions created before {retention_cutoff(options["days"]):%Y-%m-%d %H:%M} '
+            f'in {len(latencies)} batches ({rate:.0f} rows/sec, max batch {max_ms:.1f} ms)'
+        ))
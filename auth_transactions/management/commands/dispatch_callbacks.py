@@ -0,0 +1,39 @@
+"""
+Drain the CallbackDelivery outbox
+
+Usage:
+    python manage.py dispatch_callbacks --once
+    python manage.py dispatch_callbacks --interval 1
+"""
+from django.core.management.base import BaseCommand
+
+from auth_transactions.callbacks import CallbackDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Deliver signed result callbacks to service providers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process one batch and exit')
+        parser.add_argument('--interval', type=float, default=1.0, help='Idle sleep between polls (seconds)')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--workers', type=int, default=None)
+
+    def handle(self, *args, **options):
+        dispatcher = CallbackDispatcher(
+            max_workers=options['workers'],
+            batch_size=options['batch_size']
+        )
+        if options['once']:
+            counts = dispatcher.run_once()
+            self.stdout.write(
+                f"claimed={counts['claimed']} delivered={counts['delivered']} "
+                f"retried={counts['retried']} dead={counts['dead']}"
+            )
+            return
+
+        self.stdout.write('Dispatching callbacks (Ctrl+C to stop)...')
+        try:
+            dispatcher.run_forever(interval=options['interval'])
+        except KeyboardInterrupt:
+            pass
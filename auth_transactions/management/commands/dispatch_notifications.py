@@ -0,0 +1,44 @@
+"""
+Drain the NotificationLog push outbox
+
+Usage:
+    python manage.py dispatch_notifications --once
+    python manage.py dispatch_notifications --interval 0.2
+"""
+from django.core.management.base import BaseCommand
+
+from auth_transactions.notifications import NotificationDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Send PENDING push notifications through the configured push provider'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process one batch and exit')
+        parser.add_argument('--interval', type=float, default=0.2, help='Idle sleep between polls (seconds)')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--workers', type=int, default=None)
+
+    def handle(self, *args, **options):
+        dispatcher = NotificationDispatcher(
+            max_workers=options['workers'],
+            batch_size=options['batch_size']
+        )
+        try:
+            if options['once']:
+                counts = dispatcher.run_once()
+                self.stdout.write(
+                    f"claimed={counts['claimed']} sent={counts['sent']} "
+                    f"retried={counts['retried']} failed={counts['failed']} skipped={counts['skipped']}"
+                )
+                return
+
+            self.stdout.write(
+                f'Dispatching notifications via {type(dispatcher.provider).__name__} (Ctrl+C to stop)...'
+            )
+            try:
+                dispatcher.run_forever(interval=options['interval'])
+            except KeyboardInterrupt:
+                pass
+        finally:
+            dispatcher.close()
@@ -0,0 +1,57 @@
+"""
+Expire overdue PENDING transactions in bounded batches
+
+Usage:
+    python manage.py expire_transactions
+    python manage.py expire_transactions --loop --interval 5
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from auth_transactions.expiry import sweep
+
+
+class Command(BaseCommand):
+    help = 'Move PENDING transactions past expires_at to EXPIRED and write AUTH_EXPIRED audit logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after N batches per sweep')
+        parser.add_argument('--loop', action='store_true', help='Run as a daemon loop')
+        parser.add_argument('--interval', type=float, default=5.0, help='Sleep between sweeps in --loop mode (seconds)')
+        parser.add_argument('--verbose-batches', action='store_true', help='Print latency of every batch')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                self._sweep_once(options)
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def _sweep_once(self, options):
+        latencies = []
+
+        def on_batch(rows, seconds):
+            latencies.append(seconds)
+            if options['verbose_batches']:
+                self.stdout.write(f'  batch: {rows} rows in {seconds * 1000:.1f} ms')
+
+        total, elapsed = sweep(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            on_batch=on_batch
+        )
+        if total == 0 and options['loop']:
+            return
+
+        rate = total / elapsed if elapsed > 0 else 0.0
+        avg_ms = sum(latencies) / len(latencies) * 1000 if latencies else 0.0
+        max_ms = max(latencies) * 1000 if latencies else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'Expired {total} transactions in {len(latencies)} batches '
+            f'({rate:.0f} rows/sec, batch latency avg {avg_ms:.1f} ms / max {max_ms:.1f} ms)'
+        ))
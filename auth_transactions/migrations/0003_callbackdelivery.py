@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_transactions', '0002_authtransaction_confirmed_at'),
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CallbackDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(help_text='Event name sent in X-IdP-Event (e.g. AUTH_COMPLETED)', max_length=50)),
+                ('payload', models.JSONField(help_text='JSON body POSTed to the callback URL')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('DELIVERED', 'Delivered'), ('DEAD', 'Dead Letter')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time of the next delivery attempt (also the claim lease)')),
+                ('lease_token', models.CharField(blank=True, help_text='Dispatcher run that currently holds this row', max_length=32)),
+                ('last_error', models.TextField(blank=True)),
+                ('response_status', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('service_provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='callback_deliveries', to='services.serviceprovider')),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='callbacks', to='auth_transactions.authtransaction')),
+            ],
+            options={
+                'verbose_name': 'Callback Delivery',
+                'verbose_name_plural': 'Callback Deliveries',
+                'db_table': 'auth_transactions_callbackdelivery',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='idx_cb_status_next'), models.Index(fields=['service_provider', 'status'], name='idx_cb_sp_status')],
+            },
+        ),
+    ]
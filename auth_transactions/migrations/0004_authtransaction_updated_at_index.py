@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_transactions', '0003_callbackdelivery'),
+        ('services', '0002_aggregationwatermark'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='authtransaction',
+            index=models.Index(fields=['updated_at'], name='idx_tx_updated_at'),
+        ),
+    ]
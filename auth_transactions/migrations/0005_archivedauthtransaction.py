@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_transactions', '0004_authtransaction_updated_at_index'),
+        ('services', '0002_aggregationwatermark'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='transaction',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='notifications', to='auth_transactions.authtransaction'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedAuthTransaction',
+            fields=[
+                ('transaction_id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed'), ('EXPIRED', 'Expired')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField()),
+                ('confirmed_at', models.DateTimeField(blank=True, null=True)),
+                ('auth_code', models.CharField(blank=True, max_length=64, null=True)),
+                ('failure_reason', models.TextField(blank=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('service_provider', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='archived_auth_transactions', to='services.serviceprovider')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='archived_auth_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Authentication Transaction',
+                'verbose_name_plural': 'Archived Authentication Transactions',
+                'db_table': 'auth_transactions_authtransaction_archive',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='idx_txarc_user_created'), models.Index(fields=['service_provider', '-created_at'], name='idx_txarc_sp_created'), models.Index(fields=['created_at'], name='idx_txarc_created_at')],
+            },
+        ),
+    ]
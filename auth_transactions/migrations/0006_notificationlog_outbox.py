@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:23
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_transactions', '0005_archivedauthtransaction'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationlog',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notificationlog',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='notificationlog',
+            name='lease_token',
+            field=models.CharField(blank=True, help_text='Dispatcher run that currently holds this row', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='notificationlog',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time of the next send attempt (also the claim lease)'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationlog',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='idx_notif_status_next'),
+        ),
+    ]
@@ -6,6 +6,8 @@ from django.utils import timezone
 import uuid
 import secrets
 
+from .signals import announce_status_change
+
 
 class AuthTransaction(models.Model):
     """
@@ -94,6 +96,10 @@ class AuthTransaction(models.Model):
                 fields=['created_at'],
                 name='idx_tx_created_at'
             ),
+            models.Index(
+                fields=['updated_at'],
+                name='idx_tx_updated_at'
+            ),
         ]
         constraints = [
             models.CheckConstraint(
@@ -121,13 +127,100 @@ class AuthTransaction(models.Model):
         """Check if this transaction can be confirmed"""
         return self.status == 'PENDING' and not self.is_expired
     
+    def transition_to(self, new_status, **fields):
+        """
+        Move to new_status, save, and announce the change on commit
+        Callers are expected to hold the row lock (select_for_update)
+        """
+        old_status = self.status
+        self.status = new_status
+        for field, value in fields.items():
+            setattr(self, field, value)
+        self.save()
+        if new_status in CallbackDelivery.CALLBACK_STATUSES:
+            # Outbox row commits (or rolls back) together with the transition
+            CallbackDelivery.enqueue(self)
+        announce_status_change(self, old_status)
+    
     def __str__(self):
         return f"{self.transaction_id} - {self.user.username} - {self.status}"
 
 
+class ArchivedAuthTransaction(models.Model):
+    """
+    Cold storage for terminal AuthTransactions past the retention window
+    Rows are moved here in batches by archive_transactions, which keeps
+    the hot table and its indexes small; history views read both tables.
+    """
+    STATUS_CHOICES = AuthTransaction.STATUS_CHOICES
+    
+    transaction_id = models.UUIDField(primary_key=True, editable=False)
+    user = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.RESTRICT,
+        related_name='archived_auth_transactions'
+    )
+    service_provider = models.ForeignKey(
+        'services.ServiceProvider',
+        on_delete=models.RESTRICT,
+        related_name='archived_auth_transactions'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+    confirmed_at = models.DateTimeField(null=True, blank=True)
+    auth_code = models.CharField(max_length=64, null=True, blank=True)
+    failure_reason = models.TextField(blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    # Copied verbatim from AuthTransaction when a row is archived
+    COPIED_FIELDS = (
+        'transaction_id', 'user_id', 'service_provider_id', 'status', 'created_at',
+        'updated_at', 'expires_at', 'confirmed_at', 'auth_code', 'failure_reason',
+    )
+    
+    class Meta:
+        db_table = 'auth_transactions_authtransaction_archive'
+        verbose_name = 'Archived Authentication Transaction'
+        verbose_name_plural = 'Archived Authentication Transactions'
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at'],
+                name='idx_txarc_user_created'
+            ),
+            models.Index(
+                fields=['service_provider', '-created_at'],
+                name='idx_txarc_sp_created'
+            ),
+            models.Index(
+                fields=['created_at'],
+                name='idx_txarc_created_at'
+            ),
+        ]
+        ordering = ['-created_at']
+    
+    @classmethod
+    def from_transaction(cls, auth_tx):
+        return cls(**{field: getattr(auth_tx, field) for field in cls.COPIED_FIELDS})
+    
+    @property
+    def is_expired(self):
+        return timezone.now() > self.expires_at
+    
+    def can_be_confirmed(self):
+        """Archived transactions are always terminal"""
+        return False
+    
+    def __str__(self):
+        return f"{self.transaction_id} - {self.status} (archived)"
+
+
 class NotificationLog(models.Model):
     """
     Log of push notifications sent to users
+    Rows are written PENDING in the same DB transaction as the request that
+    triggers them (transactional outbox) and sent by dispatch_notifications.
     """
     NOTIFICATION_TYPE_CHOICES = [
         ('AUTH_REQUEST', 'Authentication Request'),
@@ -149,7 +242,10 @@ class NotificationLog(models.Model):
     )
     transaction = models.ForeignKey(
         AuthTransaction,
-        on_delete=models.CASCADE,
+        # Logs outlive archival (archive.py); the id then points at
+        # ArchivedAuthTransaction, so no FK constraint and no cascade
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name='notifications',
         null=True,
         blank=True
@@ -166,6 +262,18 @@ class NotificationLog(models.Model):
         default='PENDING'
     )
     sent_at = models.DateTimeField(null=True, blank=True)
+    # Push outbox columns, see notifications.NotificationDispatcher
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Earliest time of the next send attempt (also the claim lease)"
+    )
+    lease_token = models.CharField(
+        max_length=32,
+        blank=True,
+        help_text="Dispatcher run that currently holds this row"
+    )
+    last_error = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     
     class Meta:
@@ -173,6 +281,10 @@ class NotificationLog(models.Model):
         verbose_name = 'Notification Log'
         verbose_name_plural = 'Notification Logs'
         indexes = [
+            models.Index(
+                fields=['status', 'next_attempt_at'],
+                name='idx_notif_status_next'
+            ),
             models.Index(
                 fields=['user', '-created_at'],
                 name='idx_notif_user'
@@ -186,3 +298,96 @@ class NotificationLog(models.Model):
     
     def __str__(self):
         return f"{self.notification_type} to {self.user.username} at {self.created_at}"
+
+
+class CallbackDelivery(models.Model):
+    """
+    Outbox of signed result callbacks to ServiceProvider.callback_url
+    Rows are written in the same DB transaction as the COMPLETED/FAILED
+    transition and drained by the dispatch_callbacks command.
+    """
+    CALLBACK_STATUSES = ('COMPLETED', 'FAILED')
+    
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('DELIVERED', 'Delivered'),
+        ('DEAD', 'Dead Letter'),
+    ]
+    
+    transaction = models.ForeignKey(
+        AuthTransaction,
+        on_delete=models.CASCADE,
+        related_name='callbacks'
+    )
+    service_provider = models.ForeignKey(
+        'services.ServiceProvider',
+        on_delete=models.CASCADE,
+        related_name='callback_deliveries'
+    )
+    event = models.CharField(
+        max_length=50,
+        help_text="Event name sent in X-IdP-Event (e.g. AUTH_COMPLETED)"
+    )
+    payload = models.JSONField(
+        help_text="JSON body POSTed to the callback URL"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='PENDING'
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Earliest time of the next delivery attempt (also the claim lease)"
+    )
+    lease_token = models.CharField(
+        max_length=32,
+        blank=True,
+        help_text="Dispatcher run that currently holds this row"
+    )
+    last_error = models.TextField(blank=True)
+    response_status = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'auth_transactions_callbackdelivery'
+        verbose_name = 'Callback Delivery'
+        verbose_name_plural = 'Callback Deliveries'
+        indexes = [
+            models.Index(
+                fields=['status', 'next_attempt_at'],
+                name='idx_cb_status_next'
+            ),
+            models.Index(
+                fields=['service_provider', 'status'],
+                name='idx_cb_sp_status'
+            ),
+        ]
+        ordering = ['-created_at']
+    
+    @classmethod
+    def enqueue(cls, auth_tx):
+        """Create the outbox row for a terminal transition of auth_tx"""
+        payload = {
+            'event': f'AUTH_{auth_tx.status}',
+            'transaction_id': str(auth_tx.transaction_id),
+            'status': auth_tx.status,
+            'occurred_at': timezone.now().isoformat(),
+        }
+        if auth_tx.status == 'COMPLETED':
+            payload['auth_code'] = auth_tx.auth_code
+        else:
+            payload['failure_reason'] = auth_tx.failure_reason
+        
+        return cls.objects.create(
+            transaction=auth_tx,
+            service_provider_id=auth_tx.service_provider_id,
+            event=payload['event'],
+            payload=payload
+        )
+    
+    def __str__(self):
+        return f"{self.event} -> SP {self.service_provider_id} ({self.status})"
@@ -0,0 +1,231 @@
+"""
+Push notification delivery for NotificationLog outbox rows
+
+auth_request / auth_request_batch only write PENDING NotificationLog rows,
+inside their DB transaction. NotificationDispatcher claims due rows in
+batches, sends them concurrently through the configured PushProvider
+(IDP_SETTINGS['PUSH_PROVIDER']) and records SENT / FAILED. Failed sends are
+retried with exponential backoff until NOTIFICATION_MAX_ATTEMPTS.
+AUTH_REQUEST prompts whose transaction is no longer PENDING (completed,
+failed, expired or archived while the row waited) are marked FAILED
+without being sent.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import NotificationLog
+
+
+logger = logging.getLogger(__name__)
+
+
+class PushError(Exception):
+    """
+    A provider could not deliver a notification
+    permanent=True (e.g. unregistered device) skips the remaining retries.
+    """
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class PushProvider:
+    """
+    Interface of push backends (FCM, APNs, SMS gateways...)
+    send() is called from dispatcher worker threads and must be thread-safe;
+    it returns on success and raises PushError on failure.
+    """
+
+    def send(self, notification):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FakePushProvider(PushProvider):
+    """
+    Local provider for development, tests and throughput benchmarks
+    - latency: seconds each send takes (simulates the provider round trip)
+    - failure_rate: fraction of sends that raise PushError
+    - record: keep the ids of sent notifications in self.sent
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, record=False, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.record = record
+        self.sent = []
+        self.sent_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send(self, notification):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                raise PushError('fake provider failure')
+            self.sent_count += 1
+            if self.record:
+                self.sent.append(notification.pk)
+
+
+def get_provider():
+    """Instantiate IDP_SETTINGS['PUSH_PROVIDER'] with PUSH_PROVIDER_OPTIONS"""
+    idp_settings = getattr(settings, 'IDP_SETTINGS', {})
+    provider_class = import_string(
+        idp_settings.get('PUSH_PROVIDER', 'auth_transactions.notifications.FakePushProvider')
+    )
+    return provider_class(**idp_settings.get('PUSH_PROVIDER_OPTIONS', {}))
+
+
+class NotificationDispatcher:
+    """
+    Drains the notification outbox
+    - max_workers: concurrent provider calls
+    - batch_size: rows leased per claim
+    """
+
+    def __init__(self, provider=None, max_workers=None, batch_size=None, max_attempts=None,
+                 backoff_base=None, backoff_max=None, lease_seconds=None):
+        idp_settings = getattr(settings, 'IDP_SETTINGS', {})
+        self.provider = provider or get_provider()
+        self.max_workers = max_workers or idp_settings.get('NOTIFICATION_MAX_WORKERS', 16)
+        self.batch_size = batch_size or idp_settings.get('NOTIFICATION_BATCH_SIZE', 200)
+        self.max_attempts = max_attempts or idp_settings.get('NOTIFICATION_MAX_ATTEMPTS', 3)
+        self.backoff_base = backoff_base if backoff_base is not None else idp_settings.get('NOTIFICATION_BACKOFF_BASE_SECONDS', 2)
+        self.backoff_max = backoff_max or idp_settings.get('NOTIFICATION_BACKOFF_MAX_SECONDS', 60)
+        self.lease_seconds = lease_seconds or idp_settings.get('NOTIFICATION_LEASE_SECONDS', 30)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='push')
+
+    def claim(self):
+        """
+        Lease up to batch_size due rows
+        On PostgreSQL the candidates are locked with FOR UPDATE SKIP LOCKED so
+        concurrent dispatchers split the backlog without waiting on each
+        other; SQLite has no row locks and relies on the conditional UPDATE.
+        Either way the lease is next_attempt_at pushed into the future, so rows
+        held by a crashed dispatcher become due again once it runs out.
+        """
+        now = timezone.now()
+        token = uuid.uuid4().hex
+        with transaction.atomic():
+            due = NotificationLog.objects.filter(
+                status='PENDING', next_attempt_at__lte=now
+            ).order_by('next_attempt_at')
+            if connection.features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+            due_ids = list(due.values_list('pk', flat=True)[:self.batch_size])
+            if not due_ids:
+                return []
+            NotificationLog.objects.filter(
+                pk__in=due_ids, status='PENDING', next_attempt_at__lte=now
+            ).update(
+                lease_token=token,
+                next_attempt_at=now + timedelta(seconds=self.lease_seconds)
+            )
+        return list(
+            NotificationLog.objects.filter(lease_token=token, status='PENDING')
+            .select_related('user', 'transaction')
+        )
+
+    def _is_stale(self, notification, now):
+        """AUTH_REQUEST prompt for a transaction the user can no longer confirm"""
+        if notification.notification_type != 'AUTH_REQUEST' or notification.transaction_id is None:
+            return False
+        auth_tx = notification.transaction  # None once archived
+        return auth_tx is None or auth_tx.status != 'PENDING' or auth_tx.expires_at <= now
+
+    def _skip_stale(self, notifications):
+        """Mark stale prompts FAILED (one UPDATE); returns the ones still worth sending"""
+        now = timezone.now()
+        stale_ids = [n.pk for n in notifications if self._is_stale(n, now)]
+        if not stale_ids:
+            return notifications
+        NotificationLog.objects.filter(
+            pk__in=stale_ids, lease_token=notifications[0].lease_token
+        ).update(status='FAILED', lease_token='', last_error='Transaction no longer pending')
+        stale_ids = set(stale_ids)
+        return [n for n in notifications if n.pk not in stale_ids]
+
+    def send(self, notification):
+        """Send one notification; returns (notification, ok, error, permanent)"""
+        try:
+            self.provider.send(notification)
+        except PushError as e:
+            return notification, False, str(e), e.permanent
+        except Exception as e:
+            logger.exception('Push provider crashed on notification %s', notification.pk)
+            return notification, False, f'{type(e).__name__}: {e}', False
+        return notification, True, '', False
+
+    def backoff(self, attempts):
+        """Delay before attempt number attempts + 1"""
+        return min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+
+    def _record(self, results):
+        now = timezone.now()
+        counts = {'sent': 0, 'retried': 0, 'failed': 0}
+        # One claim = one lease token, so every success is a single UPDATE
+        sent_ids = [notification.pk for notification, ok, _, _ in results if ok]
+        if sent_ids:
+            NotificationLog.objects.filter(
+                pk__in=sent_ids, lease_token=results[0][0].lease_token
+            ).update(
+                status='SENT', sent_at=now, attempts=F('attempts') + 1, lease_token='', last_error=''
+            )
+        counts['sent'] = len(sent_ids)
+
+        for notification, ok, error, permanent in results:
+            if ok:
+                continue
+            attempts = notification.attempts + 1
+            fields = {'attempts': F('attempts') + 1, 'lease_token': '', 'last_error': error}
+            if permanent or attempts >= self.max_attempts:
+                fields['status'] = 'FAILED'
+                counts['failed'] += 1
+                logger.warning('Notification %s failed after %s attempts: %s', notification.pk, attempts, error)
+            else:
+                fields['next_attempt_at'] = now + timedelta(seconds=self.backoff(attempts))
+                counts['retried'] += 1
+            NotificationLog.objects.filter(
+                pk=notification.pk, lease_token=notification.lease_token
+            ).update(**fields)
+        return counts
+
+    def run_once(self):
+        """Claim and send one batch; returns outcome counts"""
+        notifications = self.claim()
+        counts = {'claimed': len(notifications), 'sent': 0, 'retried': 0, 'failed': 0, 'skipped': 0}
+        notifications = self._skip_stale(notifications)
+        counts['skipped'] = counts['claimed'] - len(notifications)
+        if not notifications:
+            return counts
+        # Provider calls on the worker threads; DB writes stay on this thread
+        results = list(self.pool.map(self.send, notifications))
+        counts.update(self._record(results))
+        return counts
+
+    def run_forever(self, interval=0.2, stop=None):
+        """Keep draining; sleeps for interval only when the outbox is idle"""
+        while stop is None or not stop():
+            counts = self.run_once()
+            if counts['claimed'] == 0:
+                time.sleep(interval)
+
+    def close(self):
+        self.pool.shutdown()
+        self.provider.close()
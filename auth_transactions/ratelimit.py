@@ -0,0 +1,157 @@
+"""
+Sliding-window rate limits for the auth API
+
+Each scope in IDP_SETTINGS['RATE_LIMITS'] (e.g. 'auth_request:phone') maps
+to (limit, window_seconds). A key's rate is estimated with the sliding
+window counter: hits in the current fixed window plus the previous window's
+hits weighted by how much of it still overlaps the sliding window. That is
+three numbers per key, so a check is a dict lookup under a lock, and each
+scope keeps at most RATE_LIMIT_MAX_KEYS keys (least recently used go first).
+
+With RATE_LIMIT_CACHE_ALIAS set, the per-window counts live in that Django
+cache instead, so several processes share one budget (one get_many and one
+incr per hit).
+
+Rejected hits are not counted, so a client that backs off recovers on time.
+"""
+from collections import OrderedDict
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+def _retry_after(limit, window, elapsed, current, previous, cost):
+    """Seconds until current + previous * overlap + cost fits in limit"""
+    if cost > limit:
+        return float(window)
+    if current + cost <= limit:
+        # Wait for the previous window's weight to decay far enough
+        needed = window * (1 - (limit - current - cost) / previous)
+        return max(needed - elapsed, 0.0)
+    # Only the next window can fit it; then `current` becomes the decaying one
+    needed = window * (1 - (limit - cost) / current) if current else 0.0
+    return (window - elapsed) + max(needed, 0.0)
+
+
+class SlidingWindowLimiter:
+    """In-process limiter for one scope; thread-safe, bounded to max_keys"""
+
+    def __init__(self, limit, window, max_keys=100_000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._counters = OrderedDict()  # key -> [window_index, current, previous]
+        self._lock = threading.Lock()
+
+    def hit(self, key, cost=1, now=None):
+        """Count cost hits for key; returns 0.0 if allowed, else seconds to wait"""
+        now = time.monotonic() if now is None else now
+        index, elapsed = divmod(now, self.window)
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = [index, 0, 0]
+                if len(self._counters) > self.max_keys:
+                    self._counters.popitem(last=False)
+            else:
+                self._counters.move_to_end(key)
+                if counter[0] != index:
+                    counter[2] = counter[1] if counter[0] == index - 1 else 0
+                    counter[1] = 0
+                    counter[0] = index
+
+            _, current, previous = counter
+            estimate = current + previous * (1 - elapsed / self.window)
+            if estimate + cost > self.limit:
+                return _retry_after(self.limit, self.window, elapsed, current, previous, cost)
+            counter[1] += cost
+            return 0.0
+
+    def __len__(self):
+        return len(self._counters)
+
+
+class CacheSlidingWindowLimiter:
+    """Same algorithm with the per-window counts kept in a shared Django cache"""
+
+    def __init__(self, scope, limit, window, cache):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+        self.cache = cache
+
+    def _key(self, key, index):
+        digest = hashlib.sha256(str(key).encode()).hexdigest()[:24]
+        return f'ratelimit:{self.scope}:{digest}:{index}'
+
+    def hit(self, key, cost=1, now=None):
+        now = time.time() if now is None else now
+        index, elapsed = divmod(now, self.window)
+        index = int(index)
+        current_key, previous_key = self._key(key, index), self._key(key, index - 1)
+        counts = self.cache.get_many([current_key, previous_key])
+        current, previous = counts.get(current_key, 0), counts.get(previous_key, 0)
+
+        estimate = current + previous * (1 - elapsed / self.window)
+        if estimate + cost > self.limit:
+            return _retry_after(self.limit, self.window, elapsed, current, previous, cost)
+        # Two windows of history are all the estimate ever reads
+        self.cache.add(current_key, 0, math.ceil(self.window * 2))
+        try:
+            self.cache.incr(current_key, cost)
+        except ValueError:
+            # Evicted between add() and incr()
+            self.cache.set(current_key, cost, math.ceil(self.window * 2))
+        return 0.0
+
+
+class RateLimiter:
+    """Scopes configured in IDP_SETTINGS['RATE_LIMITS']; unknown scopes are unlimited"""
+
+    def __init__(self):
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def _limiter(self, scope):
+        limiter = self._limiters.get(scope)
+        if limiter is None and scope not in self._limiters:
+            idp_settings = getattr(settings, 'IDP_SETTINGS', {})
+            rule = (idp_settings.get('RATE_LIMITS') or {}).get(scope)
+            if rule is not None:
+                limit, window = rule
+                alias = idp_settings.get('RATE_LIMIT_CACHE_ALIAS')
+                if alias:
+                    limiter = CacheSlidingWindowLimiter(scope, limit, window, caches[alias])
+                else:
+                    limiter = SlidingWindowLimiter(
+                        limit, window, idp_settings.get('RATE_LIMIT_MAX_KEYS', 100_000)
+                    )
+            with self._lock:
+                limiter = self._limiters.setdefault(scope, limiter)
+        return limiter
+
+    def hit(self, scope, key, cost=1):
+        """0.0 if allowed (and counted), else seconds until the caller may retry"""
+        limiter = self._limiter(scope)
+        if limiter is None:
+            return 0.0
+        return limiter.hit(key, cost)
+
+    def reset(self):
+        with self._lock:
+            self._limiters = {}
+
+
+rate_limiter = RateLimiter()
+
+
+@receiver(setting_changed)
+def reset_rate_limiter(setting, **kwargs):
+    if setting == 'IDP_SETTINGS':
+        rate_limiter.reset()
@@ -0,0 +1,31 @@
+"""
+Signals for auth_transactions app
+"""
+from django.db import transaction
+from django.dispatch import Signal
+
+
+# Sent after commit whenever an AuthTransaction changes status
+# kwargs: transaction_id, old_status, new_status, user_id, service_provider_id
+# old_status is None when the transaction has just been created
+transaction_status_changed = Signal()
+
+
+def announce_status_change(auth_tx, old_status):
+    """Send transaction_status_changed once the surrounding DB transaction commits"""
+    payload = {
+        'transaction_id': auth_tx.transaction_id,
+        'old_status': old_status,
+        'new_status': auth_tx.status,
+        'user_id': auth_tx.user_id,
+        'service_provider_id': auth_tx.service_provider_id,
+    }
+    transaction.on_commit(
+        lambda: transaction_status_changed.send(sender=type(auth_tx), **payload)
+    )
+
+
+def announce_creation(sender, instance, created, raw=False, **kwargs):
+    """post_save receiver: announce new transactions as old_status=None"""
+    if created and not raw:
+        announce_status_change(instance, None)
@@ -0,0 +1,95 @@
+"""
+Per-user AuthTransaction status counts
+
+aggregate_user_stats() computes every count with one query (a per-status
+GROUP BY over the hot and archive tables). When IDP_SETTINGS['USER_STATS_CACHE_SECONDS'] is set, get_user_stats()
+keeps the counts in the Django cache and transaction_status_changed keeps
+them current with incr/decr, so a page view costs a single cache round trip.
+Use a shared cache backend (Redis/Memcached) when running several processes;
+the default per-process LocMemCache only sees transitions made locally.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+
+from .models import ArchivedAuthTransaction, AuthTransaction
+
+
+STAT_NAMES = ('total', 'pending', 'completed', 'failed', 'expired')
+
+
+def _cache_timeout():
+    return getattr(settings, 'IDP_SETTINGS', {}).get('USER_STATS_CACHE_SECONDS')
+
+
+def _cache():
+    alias = getattr(settings, 'IDP_SETTINGS', {}).get('USER_STATS_CACHE_ALIAS', 'default')
+    return caches[alias]
+
+
+def _key(user_id, name):
+    return f'user_tx_stats:{user_id}:{name}'
+
+
+def _counts_by_status(queryset):
+    return queryset.order_by().values_list('status').annotate(n=Count('pk'))
+
+
+def aggregate_user_stats(user_id):
+    """
+    All status counts for one user in a single query
+    GROUP BY status on the hot and archive tables, combined with UNION ALL.
+    """
+    rows = _counts_by_status(AuthTransaction.objects.filter(user_id=user_id)).union(
+        _counts_by_status(ArchivedAuthTransaction.objects.filter(user_id=user_id)),
+        all=True
+    )
+    stats = dict.fromkeys(STAT_NAMES, 0)
+    for status, count in rows:
+        stats[status.lower()] += count
+        stats['total'] += count
+    return stats
+
+
+def get_user_stats(user):
+    """
+    {'total', 'pending', 'completed', 'failed', 'expired'} for user
+    Served from the cache when enabled, otherwise one aggregate query.
+    """
+    timeout = _cache_timeout()
+    if not timeout:
+        return aggregate_user_stats(user.pk)
+
+    cache = _cache()
+    keys = {name: _key(user.pk, name) for name in STAT_NAMES}
+    cached = cache.get_many(keys.values())
+    if len(cached) == len(keys):
+        return {name: cached[key] for name, key in keys.items()}
+
+    stats = aggregate_user_stats(user.pk)
+    cache.set_many({keys[name]: stats[name] for name in STAT_NAMES}, timeout)
+    return stats
+
+
+def invalidate_user_stats(user_id):
+    _cache().delete_many([_key(user_id, name) for name in STAT_NAMES])
+
+
+def update_user_stats(sender, user_id, old_status, new_status, **kwargs):
+    """
+    transaction_status_changed receiver
+    old_status is None for a newly created transaction. Counters that are
+    not cached are left alone; a partially evicted set is dropped so the
+    next read recomputes it.
+    """
+    if not _cache_timeout():
+        return
+    cache = _cache()
+    try:
+        if old_status is None:
+            cache.incr(_key(user_id, 'total'))
+        else:
+            cache.decr(_key(user_id, old_status.lower()))
+        cache.incr(_key(user_id, new_status.lower()))
+    except ValueError:
+        invalidate_user_stats(user_id)
@@ -0,0 +1,49 @@
+"""
+In-process memo of rendered COMPLETED auth_status responses
+
+SPs keep polling after completion; each poll used to join user and
+service_provider and decrypt CI/DI again. The rendered body (plaintext
+CI/DI included) is kept only in this process's memory - never in a shared
+cache backend - for a short TTL, bounded by size.
+"""
+from django.conf import settings
+
+from services.cache import TTLCache
+
+
+class CompletedStatusCache:
+    """Rendered COMPLETED payloads keyed by transaction_id"""
+
+    def __init__(self, max_size=None, ttl=None):
+        idp_settings = getattr(settings, 'IDP_SETTINGS', {})
+        self._cache = TTLCache(
+            max_size=max_size or idp_settings.get('STATUS_RESULT_CACHE_SIZE', 1024),
+            ttl=ttl or idp_settings.get('STATUS_RESULT_CACHE_TTL_SECONDS', 30),
+        )
+
+    def get(self, transaction_id):
+        """(payload, etag), or None on a miss"""
+        entry = self._cache.get(str(transaction_id))
+        if entry is None:
+            return None
+        payload, etag = entry
+        # Callers may add to the response body; hand out a copy
+        return dict(payload), etag
+
+    def set(self, transaction_id, payload, etag=None):
+        if payload.get('status') == 'COMPLETED':
+            self._cache.set(str(transaction_id), (dict(payload), etag))
+
+    def invalidate(self, transaction_id):
+        self._cache.delete(str(transaction_id))
+
+    def clear(self):
+        self._cache.clear()
+
+
+completed_status_cache = CompletedStatusCache()
+
+
+def forget_completed_status(sender, transaction_id, **kwargs):
+    """transaction_status_changed receiver"""
+    completed_status_cache.invalidate(transaction_id)
@@ -0,0 +1,59 @@
+"""
+In-process wake-up hub for long-poll / SSE status waiters
+
+Waiters are asyncio events living on the ASGI event loop, so a waiting
+client costs one coroutine, not one thread. transaction_status_changed is
+usually sent from a sync view running in a worker thread, hence the
+call_soon_threadsafe hand-off. Changes made by other processes are not
+seen here; waiters fall back to re-reading the row periodically.
+"""
+from collections import defaultdict
+import asyncio
+import threading
+
+
+class StatusChangeHub:
+    """Maps transaction_id -> asyncio events waiting for a status change"""
+
+    def __init__(self):
+        self._waiters = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, transaction_id):
+        """Register a waiter on the running loop and return its event"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters[str(transaction_id)].add(waiter)
+        return waiter
+
+    def unsubscribe(self, transaction_id, waiter):
+        key = str(transaction_id)
+        with self._lock:
+            waiters = self._waiters.get(key)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[key]
+
+    def publish(self, transaction_id):
+        """Wake every waiter on transaction_id (safe from any thread)"""
+        with self._lock:
+            waiters = list(self._waiters.get(str(transaction_id), ()))
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Loop already closed; the waiter is gone
+                pass
+
+    def waiter_count(self):
+        with self._lock:
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+
+status_hub = StatusChangeHub()
+
+
+def wake_status_waiters(sender, transaction_id, **kwargs):
+    """transaction_status_changed receiver"""
+    status_hub.publish(transaction_id)
@@ -2,16 +2,27 @@
 Test scenarios for IdP Backend System
 과제 요구사항: 동시성 테스트, 성능 테스트 시나리오
 """
+import json
 import threading
 import time
 import requests
-from django.test import TestCase, TransactionTestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from datetime import timedelta
+from accounts import lockout
 from accounts.models import User
+from services.cache import credential_cache, key_cache
 from services.models import ServiceProvider
-from auth_transactions.models import AuthTransaction
+from auth_transactions.models import AuthTransaction, NotificationLog
+from audit_logs.models import AuditLog
+from auth_transactions.stats import aggregate_user_stats, get_user_stats
+from auth_transactions.status_cache import completed_status_cache
 from accounts.utils import EncryptionUtil
+from idp_backend.testing import QueryBudgetMixin
 import uuid
 
 
@@ -126,6 +137,1192 @@ class ConcurrencyTestCase(TransactionTestCase):
         self.assertEqual(auth_tx.status, 'EXPIRED')
 
 
+class WebConfirmTestCase(TestCase):
+    """
+    웹 승인/거부 테스트 - PIN 검증은 잠금 밖에서, 상태 전이만 잠금 하에서
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='webuser',
+            password='webpass123',
+            phone_number='010-2222-3333',
+            ci='ci-web',
+            di='di-web'
+        )
+        self.user.set_pin('123456')
+        self.user.save()
+        self.service_provider = ServiceProvider.objects.create(
+            service_name='Web Service',
+            client_id='web_client',
+            client_secret=ServiceProvider.hash_secret('web_secret'),
+            callback_url='https://example.com/callback'
+        )
+        self.client.login(username='webuser', password='webpass123')
+    
+    def _create_tx(self, **kwargs):
+        return AuthTransaction.objects.create(
+            user=self.user,
+            service_provider=self.service_provider,
+            expires_at=timezone.now() + timedelta(minutes=3),
+            **kwargs
+        )
+    
+    def test_approve_with_valid_pin(self):
+        auth_tx = self._create_tx()
+        
+        self.client.post(
+            f'/auth/confirm/{auth_tx.transaction_id}/',
+            {'action': 'approve', 'pin': '123456'}
+        )
+        
+        auth_tx.refresh_from_db()
+        self.assertEqual(auth_tx.status, 'COMPLETED')
+        self.assertIsNotNone(auth_tx.confirmed_at)
+    
+    def test_invalid_pin_keeps_pending(self):
+        auth_tx = self._create_tx()
+        
+        self.client.post(
+            f'/auth/confirm/{auth_tx.transaction_id}/',
+            {'action': 'approve', 'pin': '000000'}
+        )
+        
+        auth_tx.refresh_from_db()
+        self.assertEqual(auth_tx.status, 'PENDING')
+    
+    def test_reject(self):
+        auth_tx = self._create_tx()
+        
+        self.client.post(
+            f'/auth/confirm/{auth_tx.transaction_id}/',
+            {'action': 'reject'}
+        )
+        
+        auth_tx.refresh_from_db()
+        self.assertEqual(auth_tx.status, 'FAILED')
+
+
+class UserStatsTestCase(TestCase):
+    """
+    사용자별 인증 통계 테스트
+    - 상태별 카운트를 단일 집계 쿼리로 계산
+    - 캐시 사용 시 상태 전이마다 카운터 갱신
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='statsuser',
+            password='statspass123',
+            phone_number='010-4444-5555'
+        )
+        self.service_provider = ServiceProvider.objects.create(
+            service_name='Stats Service',
+            client_id='stats_web_client',
+            client_secret=ServiceProvider.hash_secret('stats_secret'),
+            callback_url='https://example.com/callback'
+        )
+    
+    def _create_tx(self, status='PENDING'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return AuthTransaction.objects.create(
+                user=self.user,
+                service_provider=self.service_provider,
+                status=status,
+                expires_at=timezone.now() + timedelta(minutes=3)
+            )
+    
+    def test_single_aggregate_query(self):
+        for status in ('PENDING', 'COMPLETED', 'COMPLETED', 'FAILED', 'EXPIRED'):
+            self._create_tx(status)
+        
+        with self.assertNumQueries(1):
+            stats = aggregate_user_stats(self.user.pk)
+        
+        self.assertEqual(
+            stats,
+            {'total': 5, 'pending': 1, 'completed': 2, 'failed': 1, 'expired': 1}
+        )
+    
+    def test_cached_counters_follow_transitions(self):
+        idp_settings = {**settings.IDP_SETTINGS, 'USER_STATS_CACHE_SECONDS': 60}
+        with override_settings(IDP_SETTINGS=idp_settings):
+            self._create_tx('COMPLETED')
+            get_user_stats(self.user)
+            
+            auth_tx = self._create_tx()
+            with self.captureOnCommitCallbacks(execute=True):
+                auth_tx.transition_to('FAILED', failure_reason='Invalid PIN')
+            
+            with self.assertNumQueries(0):
+                stats = get_user_stats(self.user)
+        
+        self.assertEqual(stats, aggregate_user_stats(self.user.pk))
+        self.assertEqual(stats['total'], 2)
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['pending'], 0)
+    
+    def test_history_page_stats(self):
+        self._create_tx('COMPLETED')
+        self._create_tx()
+        self.client.login(username='statsuser', password='statspass123')
+        
+        response = self.client.get('/auth/history/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats']['completed'], 1)
+        self.assertEqual(response.context['stats']['pending'], 1)
+
+
+class BatchAuthRequestTestCase(TestCase):
+    """
+    배치 인증 요청 API 테스트
+    - SP 인증 1회, 사용자 조회 1회, bulk_create로 행 생성
+    """
+    
+    url = '/api/v1/auth/api/request/batch/'
+    
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                username=f'batchuser{i}',
+                phone_number=f'010-9000-{i:04d}',
+                ci=f'ci-batch-{i}',
+                di=f'di-batch-{i}'
+            )
+            for i in range(20)
+        ]
+        self.service_provider = ServiceProvider.objects.create(
+            service_name='Batch Service',
+            client_id='batch_client',
+            client_secret=ServiceProvider.hash_secret('batch_secret'),
+            callback_url='https://example.com/callback'
+        )
+        self.headers = {
+            'HTTP_X_CLIENT_ID': 'batch_client',
+            'HTTP_X_CLIENT_SECRET': self.service_provider.client_secret,
+        }
+    
+    def _post(self, numbers, **headers):
+        return self.client.post(
+            self.url,
+            data=json.dumps({'user_phone_numbers': numbers}),
+            content_type='application/json',
+            **(headers or self.headers)
+        )
+    
+    def test_per_item_results(self):
+        numbers = ['010-9000-0000', '010-0000-0000', '010-9000-0001', '010-9000-0000']
+        
+        response = self._post(numbers)
+        
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['created'], 2)
+        self.assertEqual(body['not_found'], 1)
+        self.assertEqual(
+            [result['status'] for result in body['results']],
+            ['created', 'not_found', 'created', 'duplicate']
+        )
+        self.assertEqual(AuthTransaction.objects.filter(service_provider=self.service_provider).count(), 2)
+        self.assertEqual(NotificationLog.objects.filter(status='PENDING').count(), 2)
+        self.assertEqual(AuditLog.objects.filter(action='AUTH_REQUEST').count(), 2)
+    
+    def test_query_count_independent_of_batch_size(self):
+        self._post(['010-9000-0000'])  # warm the credential cache
+        
+        with CaptureQueriesContext(connection) as small:
+            self._post([f'010-9000-{i:04d}' for i in range(1, 3)])
+        with CaptureQueriesContext(connection) as large:
+            self._post([f'010-9000-{i:04d}' for i in range(3, 20)])
+        
+        self.assertEqual(len(small), len(large))
+    
+    def test_invalid_credentials_and_limits(self):
+        response = self._post(['010-9000-0000'], HTTP_X_CLIENT_ID='batch_client', HTTP_X_CLIENT_SECRET='wrong')
+        self.assertEqual(response.status_code, 401)
+        
+        idp_settings = {**settings.IDP_SETTINGS, 'AUTH_REQUEST_BATCH_MAX_SIZE': 2}
+        with override_settings(IDP_SETTINGS=idp_settings):
+            response = self._post(['010-9000-0000', '010-9000-0001', '010-9000-0002'])
+        self.assertEqual(response.status_code, 400)
+
+
+class RateLimitTestCase(TestCase):
+    """
+    슬라이딩 윈도우 rate limit 테스트
+    - 카운터 추정/재시도 시간, 키 수 상한, 공유 캐시 백엔드
+    - 초과 요청은 DB 조회 없이 429
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='ratelimituser',
+            phone_number='010-3333-4444',
+            ci='ci-ratelimit',
+            di='di-ratelimit'
+        )
+        self.service_provider = ServiceProvider.objects.create(
+            service_name='Rate Limit Service',
+            client_id='rl_client',
+            client_secret=ServiceProvider.hash_secret('rl_secret'),
+            callback_url='https://example.com/callback'
+        )
+        self.headers = {
+            'HTTP_X_CLIENT_ID': 'rl_client',
+            'HTTP_X_CLIENT_SECRET': self.service_provider.client_secret,
+        }
+    
+    def _request(self):
+        return self.client.post(
+            '/api/v1/auth/api/request/',
+            data=json.dumps({'user_phone_number': '010-3333-4444'}),
+            content_type='application/json',
+            **self.headers
+        )
+    
+    def test_sliding_window_estimate(self):
+        from auth_transactions.ratelimit import SlidingWindowLimiter
+        
+        limiter = SlidingWindowLimiter(limit=3, window=10)
+        
+        self.assertEqual([limiter.hit('k', now=1000.0) for _ in range(3)], [0.0, 0.0, 0.0])
+        retry_after = limiter.hit('k', now=1000.0)
+        self.assertAlmostEqual(retry_after, 10 + 10 / 3)
+        # 다음 윈도우 시작: 이전 윈도우 3회가 그대로 반영
+        self.assertGreater(limiter.hit('k', now=1010.0), 0)
+        # 겹치는 비율만큼 감소하면 허용
+        self.assertEqual(limiter.hit('k', now=1000.0 + retry_after), 0.0)
+        self.assertEqual(limiter.hit('other', now=1000.0), 0.0)
+    
+    def test_memory_is_bounded(self):
+        from auth_transactions.ratelimit import SlidingWindowLimiter
+        
+        limiter = SlidingWindowLimiter(limit=1, window=60, max_keys=100)
+        for i in range(1000):
+            limiter.hit(f'10.0.{i // 256}.{i % 256}')
+        
+        self.assertEqual(len(limiter), 100)
+    
+    def test_shared_cache_backend(self):
+        from auth_transactions.ratelimit import CacheSlidingWindowLimiter
+        
+        cache.clear()
+        limiter = CacheSlidingWindowLimiter('test', limit=2, window=60, cache=cache)
+        
+        self.assertEqual(limiter.hit('k', now=600.0), 0.0)
+        self.assertEqual(limiter.hit('k', now=601.0), 0.0)
+        self.assertGreater(limiter.hit('k', now=602.0), 0)
+        self.assertEqual(limiter.hit('k', now=690.0), 0.0)
+    
+    def test_auth_request_per_phone_limit(self):
+        with self.settings(IDP_SETTINGS={
+            **settings.IDP_SETTINGS, 'RATE_LIMITS': {'auth_request:phone': (2, 60)}
+        }):
+            self.assertEqual(self._request().status_code, 200)
+            self.assertEqual(self._request().status_code, 200)
+            
+            with self.assertNumQueries(0):
+                response = self._request()
+        
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(AuthTransaction.objects.filter(user=self.user).count(), 2)
+    
+    def test_auth_confirm_per_transaction_limit(self):
+        transaction_id = str(uuid.uuid4())
+        with self.settings(IDP_SETTINGS={
+            **settings.IDP_SETTINGS, 'RATE_LIMITS': {'auth_confirm:transaction_id': (1, 60)}
+        }):
+            body = json.dumps({'transaction_id': transaction_id, 'pin_code': '000000'})
+            first = self.client.post('/api/v1/auth/api/confirm/', data=body, content_type='application/json')
+            
+            with self.assertNumQueries(0):
+                second = self.client.post('/api/v1/auth/api/confirm/', data=body, content_type='application/json')
+        
+        self.assertEqual(first.status_code, 404)
+        self.assertEqual(second.status_code, 429)
+    
+    def test_forwarded_for_needs_trusted_proxy(self):
+        from django.test import RequestFactory
+        from auth_transactions.views import get_client_ip
+        
+        # 클라이언트가 위조한 첫 hop은 신뢰하지 않음
+        request = RequestFactory().get(
+            '/', REMOTE_ADDR='10.0.0.2', HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7'
+        )
+        
+        self.assertEqual(get_client_ip(request), '10.0.0.2')
+        with self.settings(IDP_SETTINGS={**settings.IDP_SETTINGS, 'TRUSTED_PROXY_COUNT': 1}):
+            self.assertEqual(get_client_ip(request), '203.0.113.7')
+        with self.settings(IDP_SETTINGS={**settings.IDP_SETTINGS, 'TRUSTED_PROXY_COUNT': 3}):
+            self.assertEqual(get_client_ip(request), '10.0.0.2')
+
+
+class BatchStatusTestCase(TestCase):
+    """
+    배치 상태 조회 API 테스트
+    - 호출한 SP의 트랜잭션만, 커서 이후 변경분만 반환
+    """
+    
+    url = '/api/v1/auth/api/status/batch/'
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='batchstatususer',
+            phone_number='010-9100-0000',
+            ci='ci-batch-status',
+            di='di-batch-status'
+        )
+        self.service_provider = ServiceProvider.objects.create(
+            service_name='Batch Status Service',
+            client_id='batch_status_client',
+            client_secret=ServiceProvider.hash_secret('batch_status_secret'),
+            callback_url='https://example.com/callback'
+        )
+        other_sp = ServiceProvider.objects.create(
+            service_name='Other Service',
+            client_id='other_client',
+            client_secret=ServiceProvider.hash_secret('other_secret'),
+            callback_url='https://example.com/callback'
+        )
+        self.own = [self._create_tx(self.service_provider) for _ in range(3)]
+        self.foreign = self._create_tx(other_sp)
+        self.headers = {
+            'HTTP_X_CLIENT_ID': 'batch_status_client',
+            'HTTP_X_CLIENT_SECRET': self.service_provider.client_secret,
+        }
+    
+    def _create_tx(self, service_provider):
+        return AuthTransaction.objects.create(
+            user=self.user,
+            service_provider=service_provider,
+            expires_at=timezone.now() + timedelta(minutes=3)
+        )
+    
+    def _post(self, ids, since=None):
+        body = {'transaction_ids': [str(value) for value in ids]}
+        if since:
+            body['since'] = since
+        return self.client.post(
+            self.url, data=json.dumps(body), content_type='application/json', **self.headers
+        ).json()
+    
+    def test_scoped_to_calling_sp(self):
+        ids = [tx.transaction_id for tx in self.own] + [self.foreign.transaction_id]
+        
+        body = self._post(ids)
+        
+        self.assertEqual(len(body['changes']), 3)
+        self.assertEqual(body['unknown'], [str(self.foreign.transaction_id)])
+    
+    def test_only_changes_since_cursor(self):
+        ids = [tx.transaction_id for tx in self.own]
+        # Pretend the rows were last touched well before the first poll
+        AuthTransaction.objects.filter(pk__in=ids).update(
+            updated_at=timezone.now() - timedelta(minutes=1)
+        )
+        cursor = self._post(ids)['cursor']
+        
+        self.assertEqual(self._post(ids, since=cursor)['changes'], [])
+        
+        self.own[0].transition_to('FAILED', failure_reason='test')
+        changes = self._post(ids, since=cursor)['changes']
+        
+        self.assertEqual([item['transaction_id'] for item in changes], [str(self.own[0].transaction_id)])
+        self.assertEqual(changes[0]['status'], 'FAILED')
+    
+    def test_invalid_cursor(self):
+        response = self.client.post(
+            self.url,
+            data=json.dumps({'transaction_ids': [str(self.own[0].transaction_id)], 'since': 'yesterday'}),
+            content_type='application/json',
+            **self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalStatusTestCase(TestCase):
+    """
+    auth_status 조건부 GET 테스트 (ETag / If-None-Match → 304)
+    """
+    
+    def setUp(self):
+        completed_status_cache.clear()
+        self.user = User.objects.create_user(
+            username='etaguser',
+            phone_number='010-9200-0000',
+            ci='ci-etag',
+            di='di-etag'
+        )
+        self.service_provider = ServiceProvider.objects.create(
+            service_name='ETag Service',
+            client_id='etag_client',
+            client_secret=ServiceProvider.hash_secret('etag_secret'),
+            callback_url='https://example.com/callback'
+        )
+        self.auth_tx = AuthTransaction.objects.create(
+            user=self.user,
+            service_provider=self.service_provider,
+            expires_at=timezone.now() + timedelta(minutes=3)
+        )
+        self.url = f'/api/v1/auth/api/status/{self.auth_tx.transaction_id}/'
+    
+    def test_unchanged_status_returns_304_without_join(self):
+        etag = self.client.get(self.url)['ETag']
+        
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('accounts_user', ctx.captured_queries[0]['sql'])
+    
+    def test_status_change_returns_new_body(self):
+        etag = self.client.get(self.url)['ETag']
+        self.auth_tx.transition_to('FAILED', failure_reason='test')
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'FAILED')
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_completed_memo_answers_304_without_queries(self):
+        AuthTransaction.objects.filter(pk=self.auth_tx.pk).update(status='COMPLETED', auth_code='etag-code')
+        etag = self.client.get(self.url)['ETag']
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'W/{etag}')
+        
+        self.assertEqual(response.status_code, 304)
+
+
+class CompletedStatusCacheTestCase(TestCase):
+    """
+    COMPLETED 상태 응답 메모이제이션 테스트
+    - 반복 조회 시 조인/복호화 없이 응답
+    """
+    
+    def setUp(self):
+        completed_status_cache.clear()
+        self.user = User.objects.create_user(
+            username='memouser',
+            phone_number='010-6666-7777',
+            ci=EncryptionUtil.encrypt_field('CI-memo'),
+            di=EncryptionUtil.encrypt_field('DI-memo')
+        )
+        self.service_provider = ServiceProvider.objects.create(
+            service_name='Memo Service',
+            client_id='memo_client',
+            client_secret=ServiceProvider.hash_secret('memo_secret'),
+            callback_url='https://example.com/callback'
+        )
+        self.auth_tx = AuthTransaction.objects.create(
+            user=self.user,
+            service_provider=self.service_provider,
+            status='COMPLETED',
+            auth_code='memo-code',
+            expires_at=timezone.now() + timedelta(minutes=3)
+        )
+        self.url = f'/api/v1/auth/api/status/{self.auth_tx.transaction_id}/'
+    
+    def test_repeat_poll_served_from_memory(self):
+        first = self.client.get(self.url).json()
+        
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url).json()
+        
+        self.assertEqual(first, second)
+        self.assertEqual(second['ci'], 'CI-memo')
+    
+    def test_pending_is_not_memoized(self):
+        AuthTransaction.objects.filter(pk=self.auth_tx.pk).update(status='PENDING')
+        self.client.get(self.url)
+        
+        self.assertIsNone(completed_status_cache.get(self.auth_tx.transaction_id))
+    
+    def test_status_change_invalidates(self):
+        self.client.get(self.url)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.auth_tx.transition_to('EXPIRED')
+        
+        self.assertEqual(self.client.get(self.url).json()['status'], 'EXPIRED')
+
+
+class StatusLongPollTestCase(TestCase):
+    """
+    auth_status long-poll / SSE 테스트
+    - 상태 변경 시그널로 대기 중인 요청이 즉시 깨어나야 함
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='polluser',
+            phone_number='010-3333-4444',
+            ci='ci-poll',
+            di='di-poll'
+        )
+        self.service_provider = ServiceProvider.objects.create(
+            service_name='Poll Service',
+            client_id='poll_client',
+            client_secret=ServiceProvider.hash_secret('poll_secret'),
+            callback_url='https://example.com/callback'
+        )
+        self.auth_tx = AuthTransaction.objects.create(
+            user=self.user,
+            service_provider=self.service_provider,
+            expires_at=timezone.now() + timedelta(minutes=3)
+        )
+        self.url = f'/api/v1/auth/api/status/{self.auth_tx.transaction_id}'
+    
+    def _fail_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            auth_tx = AuthTransaction.objects.get(pk=self.auth_tx.pk)
+            auth_tx.transition_to('FAILED', failure_reason='test')
+    
+    def test_long_poll_times_out_with_unchanged_status(self):
+        start = time.monotonic()
+        response = self.client.get(f'{self.url}/wait/?timeout=0.2')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'PENDING')
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+    
+    def test_long_poll_returns_immediately_when_status_differs(self):
+        response = self.client.get(f'{self.url}/wait/?status=COMPLETED&timeout=5')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'PENDING')
+    
+    def test_long_poll_rejects_invalid_timeout(self):
+        for value in ('nan', 'inf', '-inf', 'abc'):
+            with self.subTest(timeout=value):
+                response = self.client.get(f'{self.url}/wait/?timeout={value}')
+                
+                self.assertEqual(response.status_code, 400)
+    
+    def test_long_poll_unknown_transaction(self):
+        response = self.client.get(f'/api/v1/auth/api/status/{uuid.uuid4()}/wait/?timeout=0')
+        
+        self.assertEqual(response.status_code, 404)
+    
+    async def test_long_poll_wakes_on_status_change(self):
+        from asgiref.sync import sync_to_async
+        import asyncio
+        
+        start = time.monotonic()
+        with self.settings(IDP_SETTINGS={'STATUS_WAIT_RECHECK_SECONDS': 30}):
+            request = asyncio.ensure_future(
+                self.async_client.get(f'{self.url}/wait/?timeout=10')
+            )
+            await asyncio.sleep(0.2)
+            await sync_to_async(self._fail_transaction)()
+            response = await asyncio.wait_for(request, timeout=5)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'FAILED')
+        self.assertLess(time.monotonic() - start, 5)
+    
+    async def test_sse_stream_closes_on_terminal_status(self):
+        from asgiref.sync import sync_to_async
+        
+        await sync_to_async(self._fail_transaction)()
+        
+        response = await self.async_client.get(f'{self.url}/stream/')
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('event: status', body)
+        self.assertIn('"status": "FAILED"', body)
+
+
+class CallbackDispatcherTestCase(TestCase):
+    """
+    콜백 outbox 테스트 - 로컬 스텁 HTTP 서버로 서명/재시도/dead-letter 검증
+    """
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        received = cls.received = []
+        cls.response_code = 200
+        
+        class StubHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                received.append((dict(self.headers), body))
+                self.send_response(cls.response_code)
+                self.end_headers()
+            
+            def log_message(self, *args):
+                pass
+        
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+    
+    def setUp(self):
+        self.received.clear()
+        type(self).response_code = 200
+        self.user = User.objects.create_user(
+            username='cbuser',
+            phone_number='010-4444-5555',
+            ci='ci-cb',
+            di='di-cb'
+        )
+        self.service_provider = ServiceProvider.objects.create(
+            service_name='Callback Service',
+            client_id='cb_client',
+            client_secret=ServiceProvider.hash_secret('cb_secret'),
+            callback_url=f'http://127.0.0.1:{self.server.server_port}/callback'
+        )
+        self.auth_tx = AuthTransaction.objects.create(
+            user=self.user,
+            service_provider=self.service_provider,
+            expires_at=timezone.now() + timedelta(minutes=3)
+        )
+    
+    def test_transition_writes_outbox_row(self):
+        from auth_transactions.models import CallbackDelivery
+        
+        self.auth_tx.transition_to('COMPLETED', auth_code='code-1')
+        
+        delivery = CallbackDelivery.objects.get(transaction=self.auth_tx)
+        self.assertEqual(delivery.event, 'AUTH_COMPLETED')
+        self.assertEqual(delivery.payload['auth_code'], 'code-1')
+    
+    def test_signed_delivery(self):
+        from auth_transactions.callbacks import CallbackDispatcher, sign_payload
+        from auth_transactions.models import CallbackDelivery
+        
+        self.auth_tx.transition_to('COMPLETED', auth_code='code-2')
+        counts = CallbackDispatcher().run_once()
+        
+        self.assertEqual(counts['delivered'], 1)
+        headers, body = self.received[0]
+        expected = sign_payload(
+            self.service_provider.client_secret, headers['X-IdP-Timestamp'], body
+        )
+        self.assertEqual(headers['X-IdP-Signature'], expected)
+        self.assertEqual(json.loads(body)['transaction_id'], str(self.auth_tx.transaction_id))
+        self.assertEqual(CallbackDelivery.objects.get().status, 'DELIVERED')
+    
+    def test_retry_then_dead_letter(self):
+        from auth_transactions.callbacks import CallbackDispatcher
+        from auth_transactions.models import CallbackDelivery
+        
+        type(self).response_code = 500
+        self.auth_tx.transition_to('FAILED', failure_reason='Invalid PIN')
+        dispatcher = CallbackDispatcher(max_attempts=2, backoff_base=60)
+        
+        self.assertEqual(dispatcher.run_once()['retried'], 1)
+        delivery = CallbackDelivery.objects.get()
+        self.assertEqual(delivery.attempts, 1)
+        self.assertGreater(delivery.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        
+        # 재시도 시점 도래 → 두 번째 실패 시 DEAD
+        CallbackDelivery.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(dispatcher.run_once()['dead'], 1)
+        self.assertEqual(CallbackDelivery.objects.get().status, 'DEAD')
+        self.assertEqual(dispatcher.run_once()['claimed'], 0)
+    
+    def test_claim_fits_lanes_into_lease(self):
+        from auth_transactions.callbacks import CallbackDispatcher
+        from auth_transactions.models import CallbackDelivery
+        
+        for i in range(5):
+            CallbackDelivery.objects.create(
+                transaction=self.auth_tx, service_provider=self.service_provider,
+                event='AUTH_COMPLETED', payload={'n': i}
+            )
+        # 1 lane x (10s lease // 5s timeout) = 2 rows per batch
+        dispatcher = CallbackDispatcher(per_sp_concurrency=1, timeout=5, lease_seconds=10)
+        
+        self.assertEqual(len(dispatcher.claim()), 2)
+        self.assertEqual(CallbackDelivery.objects.filter(lease_token='').count(), 3)
+    
+    def test_outcome_after_lost_lease_is_logged(self):
+        from auth_transactions.callbacks import CallbackDispatcher
+        from auth_transactions.models import CallbackDelivery
+        
+        self.auth_tx.transition_to('COMPLETED', auth_code='code-3')
+        dispatcher = CallbackDispatcher()
+        delivery, = dispatcher.claim()
+        # Lease ran out and another dispatcher re-claimed the row
+        CallbackDelivery.objects.update(lease_token='other')
+        
+        with self.assertLogs('auth_transactions.callbacks', 'WARNING'):
+            dispatcher._record(delivery, True, 200, '')
+        self.assertEqual(CallbackDelivery.objects.get().status, 'PENDING')
+
+
+class NotificationDispatcherTestCase(TestCase):
+    """
+    푸시 알림 outbox 테스트 - 배치 claim(lease), 동시 발송, SENT/FAILED 기록
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='pushuser',
+            phone_number='010-4444-6666',
+            ci='ci-push',
+            di='di-push'
+        )
+    
+    def _queue(self, count):
+        return NotificationLog.objects.bulk_create([
+            NotificationLog(user=self.user, notification_type='AUTH_REQUEST', message=f'push {i}')
+            for i in range(count)
+        ])
+    
+    def _dispatcher(self, **kwargs):
+        from auth_transactions.notifications import NotificationDispatcher
+        
+        dispatcher = NotificationDispatcher(**kwargs)
+        self.addCleanup(dispatcher.close)
+        return dispatcher
+    
+    def test_sends_batch_and_records_sent(self):
+        from auth_transactions.notifications import FakePushProvider
+        
+        queued = self._queue(5)
+        provider = FakePushProvider(record=True)
+        
+        counts = self._dispatcher(provider=provider, max_workers=4, batch_size=3).run_once()
+        
+        self.assertEqual(counts, {'claimed': 3, 'sent': 3, 'retried': 0, 'failed': 0, 'skipped': 0})
+        self.assertEqual(sorted(provider.sent), [n.pk for n in queued[:3]])
+        sent = NotificationLog.objects.filter(status='SENT')
+        self.assertEqual(sent.count(), 3)
+        self.assertFalse(sent.filter(sent_at__isnull=True).exists())
+        self.assertEqual(NotificationLog.objects.filter(status='PENDING').count(), 2)
+    
+    def test_claimed_rows_are_leased(self):
+        from auth_transactions.notifications import FakePushProvider
+        
+        self._queue(2)
+        dispatcher = self._dispatcher(provider=FakePushProvider())
+        
+        self.assertEqual(len(dispatcher.claim()), 2)
+        self.assertEqual(dispatcher.claim(), [])
+        
+        # 리스가 만료되면 (dispatcher 중단 등) 다시 claim 가능
+        NotificationLog.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(len(dispatcher.claim()), 2)
+    
+    def test_retry_then_failed(self):
+        from auth_transactions.notifications import FakePushProvider
+        
+        self._queue(1)
+        dispatcher = self._dispatcher(
+            provider=FakePushProvider(failure_rate=1.0), max_attempts=2, backoff_base=60
+        )
+        
+        self.assertEqual(dispatcher.run_once()['retried'], 1)
+        notification = NotificationLog.objects.get()
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        
+        NotificationLog.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(dispatcher.run_once()['failed'], 1)
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'FAILED')
+        self.assertEqual(notification.last_error, 'fake provider failure')
+        self.assertEqual(dispatcher.run_once()['claimed'], 0)
+    
+    def test_permanent_error_skips_retries(self):
+        from auth_transactions.notifications import PushError, PushProvider
+        
+        class Unregistered(PushProvider):
+            def send(self, notification):
+                raise PushError('device not registered', permanent=True)
+        
+        self._queue(1)
+        
+        self.assertEqual(self._dispatcher(provider=Unregistered()).run_once()['failed'], 1)
+        self.assertEqual(NotificationLog.objects.get().attempts, 1)
+
+
+    def test_prompts_for_settled_transactions_are_not_sent(self):
+        from auth_transactions.notifications import FakePushProvider
+        
+        service_provider = ServiceProvider.objects.create(
+            service_name='Push Service',
+            client_id='push_client',
+            client_secret=ServiceProvider.hash_secret('push_secret'),
+            callback_url='https://example.com/callback'
+        )
+        
+        def prompt(status, expires_in):
+            auth_tx = AuthTransaction.objects.create(
+                user=self.user,
+                service_provider=service_provider,
+                status=status,
+                expires_at=timezone.now() + timedelta(minutes=3)
+            )
+            AuthTransaction.objects.filter(pk=auth_tx.pk).update(
+                expires_at=timezone.now() + expires_in,
+                created_at=timezone.now() + expires_in - timedelta(minutes=3)
+            )
+            return NotificationLog.objects.create(
+                user=self.user, transaction=auth_tx, notification_type='AUTH_REQUEST', message='prompt'
+            )
+        
+        live = prompt('PENDING', timedelta(minutes=3))
+        prompt('PENDING', timedelta(seconds=-1))   # 디스패처 적체 중 만료
+        prompt('COMPLETED', timedelta(minutes=3))
+        prompt('FAILED', timedelta(minutes=3))
+        provider = FakePushProvider(record=True)
+        
+        counts = self._dispatcher(provider=provider).run_once()
+        
+        self.assertEqual(counts, {'claimed': 4, 'sent': 1, 'retried': 0, 'failed': 0, 'skipped': 3})
+        self.assertEqual(provider.sent, [live.pk])
+        skipped = NotificationLog.objects.exclude(pk=live.pk)
+        self.assertEqual(set(skipped.values_list('status', flat=True)), {'FAILED'})
+        self.assertEqual(set(skipped.values_list('last_error', flat=True)), {'Transaction no longer pending'})
+
+
+class ExpirySweeperTestCase(TestCase):
+    """
+    만료 스위퍼 테스트 - 배치 단위 EXPIRED 전이 및 AUTH_EXPIRED 감사 로그
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='sweepuser',
+            phone_number='010-5555-6666',
+            ci='ci-sweep',
+            di='di-sweep'
+        )
+        self.service_provider = ServiceProvider.objects.create(
+            service_name='Sweep Service',
+            client_id='sweep_client',
+            client_secret=ServiceProvider.hash_secret('sweep_secret'),
+            callback_url='https://example.com/callback'
+        )
+    
+    def _create_tx(self, expires_in, status='PENDING'):
+        auth_tx = AuthTransaction.objects.create(
+            user=self.user,
+            service_provider=self.service_provider,
+            status=status,
+            expires_at=timezone.now() + timedelta(minutes=3)
+        )
+        AuthTransaction.objects.filter(pk=auth_tx.pk).update(
+            expires_at=timezone.now() + expires_in,
+            created_at=timezone.now() + expires_in - timedelta(minutes=3)
+        )
+        return auth_tx
+    
+    def test_sweep_expires_overdue_pending_in_batches(self):
+        from audit_logs.models import AuditLog
+        from auth_transactions.expiry import sweep
+        
+        overdue = [self._create_tx(timedelta(minutes=-1)) for _ in range(5)]
+        live = self._create_tx(timedelta(minutes=1))
+        done = self._create_tx(timedelta(minutes=-1), status='COMPLETED')
+        batches = []
+        
+        total, _ = sweep(batch_size=2, on_batch=lambda rows, seconds: batches.append(rows))
+        
+        self.assertEqual(total, 5)
+        self.assertEqual(batches, [2, 2, 1])
+        self.assertEqual(
+            AuthTransaction.objects.filter(pk__in=[t.pk for t in overdue], status='EXPIRED').count(), 5
+        )
+        live.refresh_from_db()
+        done.refresh_from_db()
+        self.assertEqual(live.status, 'PENDING')
+        self.assertEqual(done.status, 'COMPLETED')
+        self.assertEqual(AuditLog.objects.filter(action='AUTH_EXPIRED').count(), 5)
+    
+    def test_sweep_continues_after_batch_cut_short(self):
+        from django.db import connection
+        from auth_transactions.expiry import sweep
+        
+        overdue = [self._create_tx(timedelta(minutes=-4 + i)) for i in range(4)]
+        raced = []
+        
+        def confirm_first_candidate(execute, sql, params, many, context):
+            # 첫 UPDATE 직전에 다른 요청이 후보 하나를 먼저 완료
+            if not raced and sql.startswith('UPDATE "auth_transactions_authtransaction"'):
+                raced.append(True)
+                AuthTransaction.objects.filter(pk=overdue[0].pk).update(status='COMPLETED')
+            return execute(sql, params, many, context)
+        
+        with connection.execute_wrapper(confirm_first_candidate):
+            total, _ = sweep(batch_size=2)
+        
+        self.assertEqual(total, 3)
+        self.assertEqual(AuthTransaction.objects.filter(status='PENDING').count(), 0)
+    
+    def test_command_reports_throughput(self):
+        from io import StringIO
+        from django.core.management import call_command
+        
+        self._create_tx(timedelta(minutes=-1))
+        out = StringIO()
+        
+        call_command('expire_transactions', stdout=out)
+        
+        self.assertIn('Expired 1 transactions', out.getvalue())
+        self.assertIn('rows/sec', out.getvalue())
+
+
+class TransactionArchiveTestCase(TestCase):
+    """
+    보관(archive) 테스트 - 오래된 종료 트랜잭션을 보관 테이블로 이동,
+    이력/상세/통계는 두 테이블을 함께 조회
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='archiveuser',
+            password='testpass123',
+            phone_number='010-5555-7777',
+            ci='ci-archive',
+            di='di-archive'
+        )
+        self.service_provider = ServiceProvider.objects.create(
+            service_name='Archive Service',
+            client_id='archive_client',
+            client_secret=ServiceProvider.hash_secret('archive_secret'),
+            callback_url='https://example.com/callback'
+        )
+    
+    def _create_tx(self, age_days, status='COMPLETED'):
+        auth_tx = AuthTransaction.objects.create(
+            user=self.user,
+            service_provider=self.service_provider,
+            status=status,
+            expires_at=timezone.now() + timedelta(minutes=3)
+        )
+        created_at = timezone.now() - timedelta(days=age_days)
+        AuthTransaction.objects.filter(pk=auth_tx.pk).update(
+            created_at=created_at,
+            expires_at=created_at + timedelta(minutes=3)
+        )
+        return auth_tx
+    
+    def test_archive_moves_old_terminal_rows_in_batches(self):
+        from auth_transactions.archive import archive
+        from auth_transactions.models import ArchivedAuthTransaction, CallbackDelivery
+        
+        old = [self._create_tx(40 + i, status) for i, status in enumerate(['COMPLETED', 'FAILED', 'EXPIRED'])]
+        pending = self._create_tx(40, 'PENDING')
+        queued = self._create_tx(40, 'FAILED')
+        CallbackDelivery.enqueue(queued)
+        recent = self._create_tx(1)
+        NotificationLog.objects.create(
+            user=self.user, transaction=old[0], notification_type='AUTH_SUCCESS', message='ok'
+        )
+        created_at = AuthTransaction.objects.get(pk=old[0].pk).created_at
+        batches = []
+        
+        total, _ = archive(days=30, batch_size=2, on_batch=lambda rows, seconds: batches.append(rows))
+        
+        self.assertEqual(total, 3)
+        self.assertEqual(batches, [2, 1])
+        self.assertEqual(
+            set(ArchivedAuthTransaction.objects.values_list('pk', flat=True)), {tx.pk for tx in old}
+        )
+        self.assertEqual(
+            set(AuthTransaction.objects.values_list('pk', flat=True)), {pending.pk, queued.pk, recent.pk}
+        )
+        archived = ArchivedAuthTransaction.objects.get(pk=old[0].pk)
+        self.assertEqual(archived.created_at, created_at)
+        self.assertEqual(archived.status, 'COMPLETED')
+        self.assertEqual(NotificationLog.objects.filter(transaction_id=old[0].pk).count(), 1)
+    
+    def test_history_and_stats_span_both_tables(self):
+        from auth_transactions.archive import archive
+        
+        old = self._create_tx(60)
+        NotificationLog.objects.create(
+            user=self.user, transaction=old, notification_type='AUTH_SUCCESS', message='ok'
+        )
+        self._create_tx(50, 'FAILED')
+        newest = self._create_tx(0)
+        stats_before = aggregate_user_stats(self.user.pk)
+        
+        archive(days=30)
+        self.client.login(username='archiveuser', password='testpass123')
+        history = self.client.get('/auth/history/')
+        failed_only = self.client.get('/auth/history/', {'status': 'FAILED'})
+        detail = self.client.get(f'/auth/detail/{old.pk}/')
+        
+        self.assertEqual(AuthTransaction.objects.count(), 1)
+        self.assertEqual(history.context['paginator'].count, 3)
+        self.assertEqual([tx.pk for tx in history.context['object_list']][0], newest.pk)
+        self.assertEqual([tx.pk for tx in history.context['object_list']][-1], old.pk)
+        self.assertEqual(failed_only.context['paginator'].count, 1)
+        self.assertEqual(detail.status_code, 200)
+        self.assertEqual(len(detail.context['notifications']), 1)
+        self.assertEqual(aggregate_user_stats(self.user.pk), stats_before)
+    
+    def test_command_reports_throughput(self):
+        from io import StringIO
+        from django.core.management import call_command
+        
+        self._create_tx(120)
+        out = StringIO()
+        
+        call_command('archive_transactions', stdout=out)
+        
+        self.assertIn('Archived 1 transactions', out.getvalue())
+
+
+class QueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """
+    엔드포인트별 @query_budget 준수
+    - 인증 API: auth_request, auth_confirm, auth_status (정상 상태와 캐시가 빈 상태/실패 경로)
+    - 대시보드/이력/대기/상세 웹 페이지
+    """
+    
+    def setUp(self):
+        cache.clear()
+        credential_cache.clear()
+        completed_status_cache.clear()
+        self.user = User.objects.create_user(
+            username='budgetuser',
+            password='budgetpass',
+            phone_number='010-8888-0000',
+            ci='ci-budget',
+            di='di-budget'
+        )
+        self.user.set_pin('123456')
+        self.user.save()
+        self.service_provider = ServiceProvider.objects.create(
+            service_name='Budget Service',
+            client_id='budget_client',
+            client_secret=ServiceProvider.hash_secret('budget_secret'),
+            callback_url='https://example.com/callback'
+        )
+        self.headers = {
+            'HTTP_X_CLIENT_ID': 'budget_client',
+            'HTTP_X_CLIENT_SECRET': self.service_provider.client_secret,
+        }
+    
+    def _request_auth(self):
+        return self.assertQueryBudget(
+            'POST', '/api/v1/auth/api/request/',
+            data=json.dumps({'user_phone_number': '010-8888-0000'}),
+            content_type='application/json',
+            **self.headers
+        )
+    
+    def test_auth_api(self):
+        self.client.post(  # warms the credential cache
+            '/api/v1/auth/api/request/',
+            data=json.dumps({'user_phone_number': '010-8888-0000'}),
+            content_type='application/json',
+            **self.headers
+        )
+        transaction_id = self._request_auth().json()['transaction_id']
+        self.assertQueryBudget('GET', f'/api/v1/auth/api/status/{transaction_id}/')
+        
+        lockout.locked_for(self.user.pk)  # failure counters rebuilt once per process
+        response = self.assertQueryBudget(
+            'POST', '/api/v1/auth/api/confirm/',
+            data=json.dumps({'transaction_id': transaction_id, 'pin_code': '123456'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertQueryBudget('GET', f'/api/v1/auth/api/status/{transaction_id}/')
+    
+    def test_auth_api_cold_and_failure_paths(self):
+        from services.models import EncryptionKey
+        
+        # 빈 자격증명 캐시, 실패 카운터 재구성, 빈 SP 키 캐시에서도 예산 이내
+        key_cache.clear()
+        EncryptionKey.generate(self.service_provider, 'budget-key')
+        failed_id = self._request_auth().json()['transaction_id']
+        response = self.assertQueryBudget(
+            'POST', '/api/v1/auth/api/confirm/',
+            data=json.dumps({'transaction_id': failed_id, 'pin_code': '000000'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 401)
+        
+        completed_id = self._request_auth().json()['transaction_id']
+        stale_etag = self.client.get(f'/api/v1/auth/api/status/{completed_id}/')['ETag']
+        self.client.post(
+            '/api/v1/auth/api/confirm/',
+            data=json.dumps({'transaction_id': completed_id, 'pin_code': '123456'}),
+            content_type='application/json'
+        )
+        key_cache.clear()
+        completed_status_cache.clear()
+        response = self.assertQueryBudget(
+            'GET', f'/api/v1/auth/api/status/{completed_id}/', HTTP_IF_NONE_MATCH=stale_etag
+        )
+        self.assertIn('encrypted_data', response.json())
+    
+    def test_web_pages_do_not_grow_with_rows(self):
+        for _ in range(25):
+            auth_tx = AuthTransaction.objects.create(
+                user=self.user,
+                service_provider=self.service_provider,
+                expires_at=timezone.now() + timedelta(minutes=3)
+            )
+            NotificationLog.objects.create(
+                user=self.user, transaction=auth_tx, notification_type='AUTH_REQUEST', message='budget'
+            )
+        self.client.login(username='budgetuser', password='budgetpass')
+        
+        for path in ('/dashboard/', '/auth/history/', '/auth/pending/',
+                     f'/auth/detail/{auth_tx.transaction_id}/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.assertQueryBudget('GET', path).status_code, 200)
+    
+    def test_web_pages_mixing_hot_and_archived_rows(self):
+        from auth_transactions.archive import archive
+        
+        # 최악 경로: 최근 목록/이력 페이지가 두 테이블에 걸치고 상세는 보관 테이블에서 조회
+        created = []
+        for _ in range(12):
+            auth_tx = AuthTransaction.objects.create(
+                user=self.user,
+                service_provider=self.service_provider,
+                status='COMPLETED',
+                expires_at=timezone.now() + timedelta(minutes=3)
+            )
+            created.append(auth_tx)
+        old_at = timezone.now() - timedelta(days=400)
+        AuthTransaction.objects.filter(pk__in=[auth_tx.pk for auth_tx in created[:10]]).update(
+            created_at=old_at, expires_at=old_at + timedelta(minutes=3)
+        )
+        archive(days=30)
+        self.client.login(username='budgetuser', password='budgetpass')
+        
+        for path in ('/dashboard/', '/auth/history/', f'/auth/detail/{created[0].transaction_id}/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.assertQueryBudget('GET', path).status_code, 200)
+    
+    def test_budget_violation_fails_with_queries(self):
+        self.client.login(username='budgetuser', password='budgetpass')
+        
+        with self.assertRaises(AssertionError) as ctx:
+            self.assertQueryBudget('GET', '/dashboard/', budget=1)
+        
+        self.assertRegex(str(ctx.exception), r'^GET /dashboard/ ran \d+ queries, budget is 1')
+        self.assertIn('FROM "django_session"', str(ctx.exception))
+
+
 class PerformanceTestCase(TestCase):
     """
     성능 테스트 - 인덱스 효과 측정
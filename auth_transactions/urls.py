@@ -10,8 +10,12 @@ app_name = 'auth_transactions'
 urlpatterns = [
     # API Endpoints (Function-Based Views - RESTful API)
     path('api/request/', views.auth_request, name='api_auth_request'),
+    path('api/request/batch/', views.auth_request_batch, name='api_auth_request_batch'),
     path('api/confirm/', views.auth_confirm, name='api_auth_confirm'),
+    path('api/status/batch/', views.auth_status_batch, name='api_auth_status_batch'),
     path('api/status/<uuid:transaction_id>/', views.auth_status, name='api_auth_status'),
+    path('api/status/<uuid:transaction_id>/wait/', views.auth_status_wait, name='api_auth_status_wait'),
+    path('api/status/<uuid:transaction_id>/stream/', views.auth_status_stream, name='api_auth_status_stream'),
     
     # Web Views (Class-Based Views - MTV Pattern)
     path('pending/', web_views.PendingAuthListView.as_view(), name='auth_pending'),
@@ -5,26 +5,102 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db import transaction
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.http import parse_etags
 from django.views.decorators.csrf import csrf_exempt
-from datetime import timedelta
+from django.views.decorators.http import require_GET
+from datetime import datetime, timedelta
+from accounts import lockout
 from accounts.models import User
-from services.models import ServiceProvider
+from accounts.pin_verifier import PinVerifierBusy
+from services.cache import KeyUnavailable, credential_cache, key_cache
 from auth_transactions.models import AuthTransaction, NotificationLog
-from audit_logs.models import AuditLog
+from auth_transactions.ratelimit import rate_limiter
+from audit_logs.sink import record_audit, record_audit_many
+from idp_backend.profiling import query_budget
+from auth_transactions.signals import announce_status_change
+from auth_transactions.status_cache import completed_status_cache
+from auth_transactions.status_hub import status_hub
 from accounts.utils import EncryptionUtil
+import asyncio
+import hashlib
 import json
+import logging
+import math
+import uuid
+
+
+logger = logging.getLogger(__name__)
 
 
 def get_client_ip(request):
-    """Extract client IP address from request"""
+    """
+    Extract client IP address from request
+    X-Forwarded-For is only read behind IDP_SETTINGS['TRUSTED_PROXY_COUNT']
+    reverse proxies: the client is the hop the outermost trusted proxy saw.
+    Hops further left are client-supplied and would let anyone pick the IP
+    the rate limits and audit log see.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '0.0.0.0')
+    trusted_proxies = settings.IDP_SETTINGS.get('TRUSTED_PROXY_COUNT', 0)
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        return x_forwarded_for.split(',')[0]
-    return request.META.get('REMOTE_ADDR', '0.0.0.0')
+    if not trusted_proxies or not x_forwarded_for:
+        return remote_addr
+    hops = [hop.strip() for hop in x_forwarded_for.split(',')]
+    if len(hops) < trusted_proxies:
+        return remote_addr
+    return hops[-trusted_proxies]
+
+
+def _rate_limited(*checks):
+    """
+    Run (scope, key) checks against the in-process rate limiter
+    Returns a 429 Response for the first exceeded scope, else None.
+    """
+    for scope, key in checks:
+        retry_after = rate_limiter.hit(scope, key)
+        if retry_after:
+            retry_after = math.ceil(retry_after)
+            return Response(
+                {'error': 'Too many requests', 'retry_after': retry_after},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(retry_after)}
+            )
+    return None
+
+
+def _authenticate_service_provider(request, client_id, client_secret):
+    """
+    Check X-Client-ID / X-Client-Secret against the credential cache
+    Returns (credential, None) or (None, 401 Response); failures are audited.
+    """
+    credential = credential_cache.get(client_id)
+    if credential is None or not credential.is_active:
+        details = f'Invalid client_id: {client_id}'
+    elif not credential.check_secret(client_secret):
+        details = f'Invalid client_secret for {client_id}'
+    else:
+        return credential, None
+    
+    record_audit(
+        action='AUTH_REQUEST',
+        details=details,
+        ip_address=get_client_ip(request),
+        request_path=request.path,
+        request_method=request.method,
+        status_code=401
+    )
+    return None, Response(
+        {'error': 'Invalid client credentials'},
+        status=status.HTTP_401_UNAUTHORIZED
+    )
 
 
+@query_budget(9)  # worst path 7: cold credential cache
 @csrf_exempt
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -55,42 +131,26 @@ def auth_request(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    # Rate limits: per IP before anything else, per SP and per phone number
+    # (push spam) once the SP is known; all in memory, before any DB query
+    error_response = _rate_limited(('auth_request:ip', get_client_ip(request)))
+    if error_response is not None:
+        return error_response
+    
+    # 1. Authenticate Service Provider (served from the in-process credential cache)
+    credential, error_response = _authenticate_service_provider(request, client_id, client_secret)
+    if error_response is not None:
+        return error_response
+    
+    error_response = _rate_limited(
+        ('auth_request:client_id', client_id),
+        ('auth_request:phone', user_phone_number),
+    )
+    if error_response is not None:
+        return error_response
+    
     try:
         with transaction.atomic():
-            # 1. Authenticate Service Provider
-            try:
-                service_provider = ServiceProvider.objects.get(
-                    client_id=client_id,
-                    is_active=True
-                )
-            except ServiceProvider.DoesNotExist:
-                AuditLog.objects.create(
-                    action='AUTH_REQUEST',
-                    details=f'Invalid client_id: {client_id}',
-                    ip_address=get_client_ip(request),
-                    request_path=request.path,
-                    request_method=request.method,
-                    status_code=401
-                )
-                return Response(
-                    {'error': 'Invalid client credentials'},
-                    status=status.HTTP_401_UNAUTHORIZED
-                )
-            
-            if not service_provider.check_secret(client_secret):
-                AuditLog.objects.create(
-                    action='AUTH_REQUEST',
-                    details=f'Invalid client_secret for {client_id}',
-                    ip_address=get_client_ip(request),
-                    request_path=request.path,
-                    request_method=request.method,
-                    status_code=401
-                )
-                return Response(
-                    {'error': 'Invalid client credentials'},
-                    status=status.HTTP_401_UNAUTHORIZED
-                )
-            
             # 2. Find User
             try:
                 user = User.objects.get(phone_number=user_phone_number, is_active=True)
@@ -104,26 +164,24 @@ def auth_request(request):
             expires_at = timezone.now() + timedelta(minutes=10)
             auth_tx = AuthTransaction.objects.create(
                 user=user,
-                service_provider=service_provider,
+                service_provider_id=credential.pk,
                 status='PENDING',
                 expires_at=expires_at
             )
             
-            # 4. Create Notification (simulated)
+            # 4. Queue push notification (outbox row, sent by dispatch_notifications)
             NotificationLog.objects.create(
                 user=user,
                 transaction=auth_tx,
                 notification_type='AUTH_REQUEST',
-                message=f'Authentication requested by {service_provider.service_name}',
-                status='SENT',
-                sent_at=timezone.now()
+                message=f'Authentication requested by {credential.service_name}',
             )
             
             # 5. Audit Log
-            AuditLog.objects.create(
+            record_audit(
                 user=user,
                 action='AUTH_REQUEST',
-                details=f'Auth request from {service_provider.service_name}',
+                details=f'Auth request from {credential.service_name}',
                 ip_address=get_client_ip(request),
                 request_path=request.path,
                 request_method=request.method,
@@ -143,6 +201,148 @@ def auth_request(request):
         )
 
 
+@csrf_exempt
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def auth_request_batch(request):
+    """
+    API Endpoint: POST /api/v1/auth/request/batch/
+    
+    Request authentication for many users at once (bulk re-verification)
+    Called by Service Provider
+    
+    Request Body:
+    {
+        "user_phone_numbers": ["010-1234-5678", "010-2345-6789"]
+    }
+    
+    Headers:
+    - X-Client-ID: Service Provider client ID
+    - X-Client-Secret: Service Provider client secret
+    
+    Response: one result per input number, in order, with status
+    'created', 'not_found', 'duplicate' (number repeated in the batch) or
+    'rate_limited' (too many recent requests for that number)
+    """
+    client_id = request.headers.get('X-Client-ID')
+    client_secret = request.headers.get('X-Client-Secret')
+    phone_numbers = request.data.get('user_phone_numbers')
+    max_size = settings.IDP_SETTINGS.get('AUTH_REQUEST_BATCH_MAX_SIZE', 500)
+    
+    if not all([client_id, client_secret]) or not isinstance(phone_numbers, list) or not phone_numbers:
+        return Response(
+            {'error': 'Missing required fields'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(phone_numbers) > max_size:
+        return Response(
+            {'error': f'Too many phone numbers (max {max_size})'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not all(isinstance(number, str) and number for number in phone_numbers):
+        return Response(
+            {'error': 'user_phone_numbers must be a list of strings'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    error_response = _rate_limited(('auth_request:ip', get_client_ip(request)))
+    if error_response is not None:
+        return error_response
+    
+    # 1. Authenticate Service Provider once for the whole batch
+    credential, error_response = _authenticate_service_provider(request, client_id, client_secret)
+    if error_response is not None:
+        return error_response
+    
+    error_response = _rate_limited(('auth_request:client_id', client_id))
+    if error_response is not None:
+        return error_response
+    # Numbers over their per-phone budget are skipped, not the whole batch
+    rate_limited = {
+        number for number in dict.fromkeys(phone_numbers)
+        if rate_limiter.hit('auth_request:phone', number)
+    }
+    
+    try:
+        with transaction.atomic():
+            # 2. Resolve every user with one IN query
+            users = dict(
+                User.objects.filter(
+                    phone_number__in=set(phone_numbers) - rate_limited, is_active=True
+                ).values_list('phone_number', 'pk')
+            )
+            
+            # 3. Bulk-create transactions, notifications and audit logs
+            now = timezone.now()
+            expires_at = now + timedelta(minutes=10)
+            results = []
+            auth_txs = []
+            seen = set()
+            for number in phone_numbers:
+                if number in seen:
+                    results.append({'user_phone_number': number, 'status': 'duplicate'})
+                    continue
+                seen.add(number)
+                if number in rate_limited:
+                    results.append({'user_phone_number': number, 'status': 'rate_limited'})
+                    continue
+                if number not in users:
+                    results.append({'user_phone_number': number, 'status': 'not_found'})
+                    continue
+                auth_tx = AuthTransaction(
+                    user_id=users[number],
+                    service_provider_id=credential.pk,
+                    status='PENDING',
+                    expires_at=expires_at
+                )
+                auth_txs.append(auth_tx)
+                results.append({
+                    'user_phone_number': number,
+                    'status': 'created',
+                    'transaction_id': str(auth_tx.transaction_id),
+                    'expires_at': expires_at.isoformat(),
+                })
+            
+            AuthTransaction.objects.bulk_create(auth_txs)
+            NotificationLog.objects.bulk_create([
+                NotificationLog(
+                    user_id=auth_tx.user_id,
+                    transaction=auth_tx,
+                    notification_type='AUTH_REQUEST',
+                    message=f'Authentication requested by {credential.service_name}',
+                )
+                for auth_tx in auth_txs
+            ])
+            ip_address = get_client_ip(request)
+            record_audit_many([
+                {
+                    'user_id': auth_tx.user_id,
+                    'action': 'AUTH_REQUEST',
+                    'details': f'Batch auth request from {credential.service_name}',
+                    'ip_address': ip_address,
+                    'request_path': request.path,
+                    'request_method': request.method,
+                    'status_code': 200,
+                }
+                for auth_tx in auth_txs
+            ])
+            # bulk_create skips post_save; announce creations explicitly
+            for auth_tx in auth_txs:
+                announce_status_change(auth_tx, None)
+    except Exception as e:
+        return Response(
+            {'error': f'Internal server error: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    
+    return Response({
+        'created': len(auth_txs),
+        'not_found': sum(1 for result in results if result['status'] == 'not_found'),
+        'results': results,
+    }, status=status.HTTP_200_OK)
+
+
+@query_budget(10)  # worst path 8: wrong PIN locking the account on a cold lockout cache
 @csrf_exempt
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -167,20 +367,60 @@ def auth_confirm(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    # PIN guessing: rejected in memory before the DB lookup and bcrypt
+    error_response = _rate_limited(
+        ('auth_confirm:ip', get_client_ip(request)),
+        ('auth_confirm:transaction_id', str(transaction_id)),
+    )
+    if error_response is not None:
+        return error_response
+    
     try:
-        with transaction.atomic():
-            # Lock the transaction row for update
+        # 1. Pre-check without a lock; bcrypt must not run inside the transaction
+        try:
+            auth_tx = AuthTransaction.objects.select_related('user').get(
+                transaction_id=transaction_id
+            )
+        except AuthTransaction.DoesNotExist:
+            return Response(
+                {'error': 'Transaction not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        if auth_tx.status != 'PENDING':
+            return Response(
+                {'error': f'Transaction already {auth_tx.status.lower()}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Too many recent wrong PINs: one cache read, no AuditLog scan
+        locked_for = lockout.locked_for(auth_tx.user_id)
+        if locked_for:
+            retry_after = math.ceil(locked_for)
+            return Response(
+                {'error': 'Account temporarily locked', 'retry_after': retry_after},
+                status=status.HTTP_423_LOCKED,
+                headers={'Retry-After': str(retry_after)}
+            )
+        
+        # 2. Verify PIN on the bcrypt pool (no row lock held)
+        pin_valid = None
+        if not auth_tx.is_expired:
             try:
-                auth_tx = AuthTransaction.objects.select_for_update().get(
-                    transaction_id=transaction_id
-                )
-            except AuthTransaction.DoesNotExist:
+                pin_valid = auth_tx.user.verify_pin(pin_code)
+            except PinVerifierBusy:
                 return Response(
-                    {'error': 'Transaction not found'},
-                    status=status.HTTP_404_NOT_FOUND
+                    {'error': 'Server busy, please retry'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
                 )
+        
+        # 3. Lock the row only for the final state transition
+        with transaction.atomic():
+            auth_tx = AuthTransaction.objects.select_for_update().get(
+                transaction_id=transaction_id
+            )
             
-            # Check if already processed
+            # Re-check: another request may have won the race meanwhile
             if auth_tx.status != 'PENDING':
                 return Response(
                     {'error': f'Transaction already {auth_tx.status.lower()}'},
@@ -188,11 +428,10 @@ def auth_confirm(request):
                 )
             
             # Check expiration
-            if auth_tx.is_expired():
-                auth_tx.status = 'EXPIRED'
-                auth_tx.save()
-                AuditLog.objects.create(
-                    user=auth_tx.user,
+            if pin_valid is None or auth_tx.is_expired:
+                auth_tx.transition_to('EXPIRED')
+                record_audit(
+                    user_id=auth_tx.user_id,
                     action='AUTH_EXPIRED',
                     details=f'Transaction {transaction_id} expired',
                     ip_address=get_client_ip(request),
@@ -204,20 +443,24 @@ def auth_confirm(request):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Verify PIN
-            if not auth_tx.user.check_pin(pin_code):
-                auth_tx.status = 'FAILED'
-                auth_tx.failure_reason = 'Invalid PIN'
-                auth_tx.save()
-                
-                AuditLog.objects.create(
-                    user=auth_tx.user,
-                    action='AUTH_FAILED',
-                    details=f'Invalid PIN for transaction {transaction_id}',
-                    ip_address=get_client_ip(request),
-                    request_path=request.path,
-                    request_method=request.method
+            if not pin_valid:
+                auth_tx.transition_to('FAILED', failure_reason='Invalid PIN')
+                audit_records = [{
+                    'user_id': auth_tx.user_id,
+                    'action': 'AUTH_FAILED',
+                    'details': f'Invalid PIN for transaction {transaction_id}',
+                    'ip_address': get_client_ip(request),
+                    'request_path': request.path,
+                    'request_method': request.method,
+                }]
+                # Counted before the audit row exists, so a reconcile
+                # triggered here cannot replay this failure twice; a lock
+                # adds its ADMIN_ACTION row to the same INSERT
+                lockout.register_failure(
+                    auth_tx.user_id, ip_address=get_client_ip(request), audit_records=audit_records
                 )
+                # compliance-critical: written in the same transaction
+                record_audit_many(audit_records, strict=True)
                 
                 return Response(
                     {'error': 'Invalid PIN'},
@@ -225,13 +468,15 @@ def auth_confirm(request):
                 )
             
             # Success - generate auth_code
-            auth_tx.status = 'COMPLETED'
-            auth_tx.auth_code = AuthTransaction.generate_auth_code()
-            auth_tx.save()
+            auth_tx.transition_to(
+                'COMPLETED',
+                auth_code=AuthTransaction.generate_auth_code()
+            )
             
             # Audit log
-            AuditLog.objects.create(
-                user=auth_tx.user,
+            record_audit(
+                strict=True,  # compliance-critical: written in the same transaction
+                user_id=auth_tx.user_id,
                 action='AUTH_COMPLETED',
                 details=f'Transaction {transaction_id} completed successfully',
                 ip_address=get_client_ip(request),
@@ -240,8 +485,8 @@ def auth_confirm(request):
                 status_code=200
             )
             
-            # TODO: Trigger callback to service provider (async task)
-            # For now, service provider needs to poll or we can implement webhook
+            # Callback to the service provider is queued by transition_to()
+            # and delivered by `manage.py dispatch_callbacks`
             
             return Response({
                 'status': 'COMPLETED',
@@ -256,6 +501,7 @@ def auth_confirm(request):
         )
 
 
+@query_budget(5)  # worst path 3: stale If-None-Match + full load + cold SP key cache
 @csrf_exempt
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -265,39 +511,348 @@ def auth_status(request, transaction_id):
     
     Check authentication status
     Called by Service Provider to poll status
+    
+    Responses carry an ETag; send it back in If-None-Match to get
+    304 Not Modified while the status is unchanged.
     """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        etag = _current_status_etag(transaction_id)
+        if etag is None:
+            return Response(
+                {'error': 'Transaction not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if _etag_matches(etag, if_none_match):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+    
+    try:
+        response_data, etag = _load_status(transaction_id)
+    except KeyUnavailable:
+        return Response(
+            {'error': 'Encryption key unavailable for this service provider'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    if response_data is None:
+        return Response(
+            {'error': 'Transaction not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    response = Response(response_data, status=status.HTTP_200_OK)
+    response['ETag'] = etag
+    return response
+
+
+def _status_etag(transaction_id, tx_status, updated_at):
+    """Strong ETag derived from (transaction_id, status, updated_at)"""
+    digest = hashlib.sha256(
+        f'{transaction_id}:{tx_status}:{updated_at.isoformat()}'.encode()
+    ).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _current_status_etag(transaction_id):
+    """
+    ETag of the stored row, or None if it does not exist
+    Served from the COMPLETED memo when possible, otherwise a
+    two-column lookup by primary key (no join, no model instance).
+    """
+    cached = completed_status_cache.get(transaction_id)
+    if cached is not None and cached[1] is not None:
+        return cached[1]
+    row = AuthTransaction.objects.filter(
+        transaction_id=transaction_id
+    ).values_list('status', 'updated_at').first()
+    if row is None:
+        return None
+    return _status_etag(transaction_id, *row)
+
+
+def _etag_matches(etag, if_none_match):
+    if if_none_match.strip() == '*':
+        return True
+    # Weak comparison (RFC 9110 13.1.2): ignore W/ prefixes
+    candidates = {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+    return etag in candidates
+
+
+@csrf_exempt
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def auth_status_batch(request):
+    """
+    API Endpoint: POST /api/v1/auth/status/batch/
+    
+    Status of many transactions owned by the calling Service Provider
+    
+    Request Body:
+    {
+        "transaction_ids": ["a1b2c3d4-...", "..."],
+        "since": "<cursor from the previous response>"   (optional)
+    }
+    
+    Headers:
+    - X-Client-ID / X-Client-Secret
+    
+    Only transactions changed after `since` are returned; pass the returned
+    cursor on the next poll. Changes close to the cursor may be reported
+    twice (at-least-once), never skipped.
+    """
+    client_id = request.headers.get('X-Client-ID')
+    client_secret = request.headers.get('X-Client-Secret')
+    transaction_ids = request.data.get('transaction_ids')
+    since = request.data.get('since')
+    max_size = settings.IDP_SETTINGS.get('AUTH_STATUS_BATCH_MAX_SIZE', 1000)
+    
+    if not all([client_id, client_secret]) or not isinstance(transaction_ids, list) or not transaction_ids:
+        return Response(
+            {'error': 'Missing required fields'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(transaction_ids) > max_size:
+        return Response(
+            {'error': f'Too many transaction ids (max {max_size})'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        transaction_ids = {uuid.UUID(str(value)) for value in transaction_ids}
+        since = datetime.fromisoformat(since) if since else None
+        if since is not None and timezone.is_naive(since):
+            since = timezone.make_aware(since)
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'Invalid transaction_ids or since'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    credential, error_response = _authenticate_service_provider(request, client_id, client_secret)
+    if error_response is not None:
+        return error_response
+    
+    # Rows committed with an updated_at slightly in the past may still be in
+    # flight, so the cursor trails now by a small lag
+    lag = settings.IDP_SETTINGS.get('STATUS_BATCH_CURSOR_LAG_SECONDS', 5)
+    cursor = timezone.now() - timedelta(seconds=lag)
+    if since is not None:
+        cursor = max(cursor, since)
+    
+    # One primary-key IN query, scoped to the caller
+    rows = AuthTransaction.objects.filter(
+        transaction_id__in=transaction_ids,
+        service_provider_id=credential.pk
+    )
+    if since is not None:
+        rows = rows.filter(updated_at__gt=since)
+    rows = rows.values('transaction_id', 'status', 'updated_at', 'expires_at', 'auth_code')
+    
+    changes = []
+    for row in rows:
+        item = {
+            'transaction_id': str(row['transaction_id']),
+            'status': row['status'],
+            'updated_at': row['updated_at'].isoformat(),
+            'expires_at': row['expires_at'].isoformat(),
+        }
+        if row['status'] == 'COMPLETED':
+            item['auth_code'] = row['auth_code']
+        changes.append(item)
+    
+    response_data = {'cursor': cursor.isoformat(), 'changes': changes}
+    if since is None:
+        # First poll: report ids that do not exist or belong to another SP
+        found = {row['transaction_id'] for row in rows}
+        response_data['unknown'] = sorted(str(value) for value in transaction_ids - found)
+    return Response(response_data, status=status.HTTP_200_OK)
+
+
+def _load_status_payload(transaction_id):
+    """Build the auth_status response body, or None if the transaction does not exist"""
+    return _load_status(transaction_id)[0]
+
+
+def _load_status(transaction_id):
+    """
+    (auth_status response body, ETag), or (None, None) if the transaction does not exist
+    COMPLETED bodies are memoized in-process (status_cache.py), so repeat
+    polls skip the join and the CI/DI decryption. Raises KeyUnavailable
+    (nothing memoized) when CI/DI cannot be encrypted for the SP.
+    """
+    cached = completed_status_cache.get(transaction_id)
+    if cached is not None:
+        return cached
+    
     try:
         auth_tx = AuthTransaction.objects.select_related(
             'user', 'service_provider'
         ).get(transaction_id=transaction_id)
+    except AuthTransaction.DoesNotExist:
+        return None, None
+    
+    etag = _status_etag(transaction_id, auth_tx.status, auth_tx.updated_at)
+    response_data = {
+        'transaction_id': str(auth_tx.transaction_id),
+        'status': auth_tx.status,
+        'created_at': auth_tx.created_at.isoformat(),
+        'expires_at': auth_tx.expires_at.isoformat(),
+    }
+    
+    if auth_tx.status == 'COMPLETED':
+        response_data['auth_code'] = auth_tx.auth_code
+        # Include encrypted CI/DI
+        try:
+            ci_decrypted = EncryptionUtil.decrypt_field(auth_tx.user.ci) if auth_tx.user.ci else None
+            di_decrypted = EncryptionUtil.decrypt_field(auth_tx.user.di) if auth_tx.user.di else None
+        except Exception:
+            # If decryption fails, use masked values
+            ci_decrypted = "CI_" + "*" * 80
+            di_decrypted = "DI_" + "*" * 80
         
-        response_data = {
-            'transaction_id': str(auth_tx.transaction_id),
-            'status': auth_tx.status,
-            'created_at': auth_tx.created_at.isoformat(),
-            'expires_at': auth_tx.expires_at.isoformat(),
-        }
-        
-        if auth_tx.status == 'COMPLETED':
-            response_data['auth_code'] = auth_tx.auth_code
-            # Include encrypted CI/DI
+        # Re-encrypt for service provider with its active EncryptionKey
+        # (cached in-process). SPs without any key keep the plaintext fields;
+        # an SP whose keys cannot be used gets no CI/DI at all (fail closed)
+        if auth_tx.service_provider.encryption_algorithm == 'AES-256-GCM':
             try:
-                ci_decrypted = EncryptionUtil.decrypt_field(auth_tx.user.ci) if auth_tx.user.ci else None
-                di_decrypted = EncryptionUtil.decrypt_field(auth_tx.user.di) if auth_tx.user.di else None
-            except Exception:
-                # If decryption fails, use masked values
-                ci_decrypted = "CI_" + "*" * 80
-                di_decrypted = "DI_" + "*" * 80
-            
-            # Re-encrypt for service provider
-            # In production, use service provider's public key
-            response_data['ci'] = ci_decrypted  # Should be encrypted
-            response_data['di'] = di_decrypted  # Should be encrypted
-        
-        return Response(response_data, status=status.HTTP_200_OK)
-        
-    except AuthTransaction.DoesNotExist:
-        return Response(
-            {'error': 'Transaction not found'},
-            status=status.HTTP_404_NOT_FOUND
-        )
+                sp_key = key_cache.get_active_key(auth_tx.service_provider_id)
+                if sp_key is not None:
+                    if sp_key.algorithm != 'AES-256-GCM':
+                        raise KeyUnavailable(f'Unsupported key algorithm {sp_key.algorithm!r}')
+                    response_data['encrypted_data'] = EncryptionUtil.encrypt_with_aes_gcm(
+                        json.dumps({'ci': ci_decrypted, 'di': di_decrypted}), sp_key.key
+                    )
+                    response_data['encryption'] = {
+                        'algorithm': 'AES-256-GCM',
+                        'key_name': sp_key.key_name,
+                    }
+            except Exception as e:
+                logger.exception(
+                    'Cannot encrypt auth_status for service provider %s; withholding CI/DI',
+                    auth_tx.service_provider_id
+                )
+                raise KeyUnavailable(str(e)) from e
+        if 'encrypted_data' not in response_data:
+            response_data['ci'] = ci_decrypted
+            response_data['di'] = di_decrypted
+        completed_status_cache.set(transaction_id, response_data, etag)
+    
+    return response_data, etag
+
+
+# ============================================
+# Long-poll / Server-Sent Events (ASGI)
+# ============================================
+# Plain async Django views: under idp_backend/asgi.py a waiting client is
+# one coroutine on the event loop rather than a blocked worker thread.
+
+def _wait_setting(name, default):
+    return settings.IDP_SETTINGS.get(name, default)
+
+
+async def _wait_for_status_change(transaction_id, known_status, timeout):
+    """
+    Wait until the status differs from known_status or timeout passes
+    Returns the current status, or None if the transaction does not exist.
+    Woken by transaction_status_changed in this process; the row is also
+    re-read every STATUS_WAIT_RECHECK_SECONDS to catch other workers.
+    """
+    recheck_seconds = _wait_setting('STATUS_WAIT_RECHECK_SECONDS', 2)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    waiter = status_hub.subscribe(transaction_id)
+    event = waiter[1]
+    try:
+        while True:
+            # Clear before reading so a change landing in between still wakes us
+            event.clear()
+            current = await AuthTransaction.objects.filter(
+                transaction_id=transaction_id
+            ).values_list('status', flat=True).afirst()
+            remaining = deadline - loop.time()
+            if current is None or current != known_status or remaining <= 0:
+                return current
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(recheck_seconds, remaining))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        status_hub.unsubscribe(transaction_id, waiter)
+
+
+@require_GET
+async def auth_status_wait(request, transaction_id):
+    """
+    API Endpoint: GET /api/v1/auth/status/<transaction_id>/wait/
+    
+    Long-poll variant of auth_status
+    Holds the request until the status differs from ?status= (default PENDING)
+    or ?timeout= seconds pass, then answers with the auth_status body
+    """
+    max_timeout = _wait_setting('STATUS_LONG_POLL_TIMEOUT_SECONDS', 25)
+    known_status = request.GET.get('status', 'PENDING')
+    try:
+        timeout = float(request.GET.get('timeout', max_timeout))
+    except ValueError:
+        timeout = math.nan
+    if not math.isfinite(timeout):
+        return JsonResponse({'error': 'timeout must be a number of seconds'}, status=400)
+    timeout = min(max(timeout, 0), max_timeout)
+    
+    current = await _wait_for_status_change(transaction_id, known_status, timeout)
+    if current is None:
+        return JsonResponse({'error': 'Transaction not found'}, status=404)
+    
+    try:
+        response_data = await sync_to_async(_load_status_payload)(transaction_id)
+    except KeyUnavailable:
+        return JsonResponse({'error': 'Encryption key unavailable for this service provider'}, status=503)
+    if response_data is None:
+        return JsonResponse({'error': 'Transaction not found'}, status=404)
+    return JsonResponse(response_data)
+
+
+@require_GET
+async def auth_status_stream(request, transaction_id):
+    """
+    API Endpoint: GET /api/v1/auth/status/<transaction_id>/stream/
+    
+    Server-Sent Events stream of auth_status bodies
+    Emits a 'status' event immediately and on every change, a keep-alive
+    comment while nothing happens, and closes once the status is terminal
+    """
+    exists = await AuthTransaction.objects.filter(transaction_id=transaction_id).aexists()
+    if not exists:
+        return JsonResponse({'error': 'Transaction not found'}, status=404)
+    
+    keepalive_seconds = _wait_setting('STATUS_STREAM_KEEPALIVE_SECONDS', 15)
+    max_seconds = _wait_setting('STATUS_STREAM_MAX_SECONDS', 600)
+    
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_seconds
+        last_status = None
+        while True:
+            try:
+                response_data = await sync_to_async(_load_status_payload)(transaction_id)
+            except KeyUnavailable:
+                error = {'error': 'Encryption key unavailable for this service provider'}
+                yield f"event: error\ndata: {json.dumps(error)}\n\n"
+                return
+            if response_data is None:
+                return
+            if response_data['status'] != last_status:
+                last_status = response_data['status']
+                yield f"event: status\ndata: {json.dumps(response_data)}\n\n"
+            remaining = deadline - loop.time()
+            if last_status != 'PENDING' or remaining <= 0:
+                return
+            current = await _wait_for_status_change(
+                transaction_id, last_status, min(keepalive_seconds, remaining)
+            )
+            if current == last_status:
+                yield ": keepalive\n\n"
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -6,15 +6,27 @@ from django.views.generic import ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.db.models import Count, Q
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib import messages
 from django.views import View
+from django.db import transaction as db_transaction
 from django.utils import timezone
 from datetime import datetime
+import math
 
-from .models import AuthTransaction, NotificationLog
+from accounts import lockout
+from accounts.pin_verifier import PinVerifierBusy
+from audit_logs.sink import record_audit_many
+from idp_backend.profiling import query_budget
+from idp_backend.routers import ReplicaReadMixin
+from .archive import TransactionHistory, user_history
+from .models import ArchivedAuthTransaction, AuthTransaction, NotificationLog
+from .stats import get_user_stats
+from .views import get_client_ip
 
 
+@query_budget(6)  # worst path 4
 class PendingAuthListView(LoginRequiredMixin, ListView):
     """
     대기 중인 인증 요청 리스트 뷰
@@ -37,10 +49,12 @@ class PendingAuthListView(LoginRequiredMixin, ListView):
         ).select_related('service_provider').order_by('-created_at')
 
 
-class AuthHistoryListView(LoginRequiredMixin, ListView):
+@query_budget(10)  # worst path 8: hot + archived rows on one page
+class AuthHistoryListView(ReplicaReadMixin, LoginRequiredMixin, ListView):
     """
     인증 이력 리스트 뷰
-    - 로그인한 사용자의 인증 이력 표시
+    - 읽기 전용 복제본에서 조회 (쓰기 직후에는 primary)
+    - 로그인한 사용자의 인증 이력 표시 (보관된 트랜잭션 포함)
     - 페이지네이션 적용
     - 필터 기능 (상태, 날짜)
     """
@@ -52,13 +66,16 @@ class AuthHistoryListView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         """
-        현재 사용자의 트랜잭션만 필터링
+        현재 사용자의 트랜잭션만 필터링 (보관 테이블 포함)
         상태 및 날짜 필터 적용
         """
-        queryset = AuthTransaction.objects.filter(
-            user=self.request.user
-        ).select_related('service_provider').order_by('-created_at')
-        
+        history = user_history(self.request.user)
+        return TransactionHistory(
+            self._apply_filters(history.hot),
+            self._apply_filters(history.archived),
+        )
+    
+    def _apply_filters(self, queryset):
         # 상태 필터
         status_filter = self.request.GET.get('status')
         if status_filter:
@@ -90,24 +107,16 @@ class AuthHistoryListView(LoginRequiredMixin, ListView):
         user = self.request.user
         
         # 전체 통계
-        context['stats'] = {
-            'completed': AuthTransaction.objects.filter(
-                user=user, status='COMPLETED'
-            ).count(),
-            'failed': AuthTransaction.objects.filter(
-                user=user, status='FAILED'
-            ).count(),
-            'pending': AuthTransaction.objects.filter(
-                user=user, status='PENDING'
-            ).count(),
-        }
+        context['stats'] = get_user_stats(user)
         
         return context
 
 
-class TransactionDetailView(LoginRequiredMixin, DetailView):
+@query_budget(7)  # worst path 5: archive fallback
+class TransactionDetailView(ReplicaReadMixin, LoginRequiredMixin, DetailView):
     """
     인증 트랜잭션 상세 뷰
+    - 읽기 전용 복제본에서 조회 (쓰기 직후에는 primary)
     - 트랜잭션 상세 정보 표시
     - 관련 알림 로그 포함
     """
@@ -124,13 +133,24 @@ class TransactionDetailView(LoginRequiredMixin, DetailView):
             user=self.request.user
         ).select_related('service_provider', 'user')
     
+    def get_object(self, queryset=None):
+        """보관 테이블로 옮겨진 트랜잭션도 조회"""
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            return super().get_object(
+                ArchivedAuthTransaction.objects.filter(
+                    user=self.request.user
+                ).select_related('service_provider', 'user')
+            )
+    
     def get_context_data(self, **kwargs):
         """관련 알림 로그 추가"""
         context = super().get_context_data(**kwargs)
         
         # 관련 알림
         context['notifications'] = NotificationLog.objects.filter(
-            transaction=self.object
+            transaction_id=self.object.pk
         ).order_by('-sent_at')
         
         return context
@@ -159,9 +179,7 @@ class ConfirmTransactionView(LoginRequiredMixin, View):
         
         # 만료 확인
         if transaction.is_expired:
-            transaction.status = 'EXPIRED'
-            transaction.failure_reason = '요청이 만료되었습니다.'
-            transaction.save()
+            self._expire(transaction_id)
             messages.error(request, '만료된 요청입니다.')
             return redirect('auth_transactions:transaction_detail', transaction_id=transaction_id)
         
@@ -176,32 +194,83 @@ class ConfirmTransactionView(LoginRequiredMixin, View):
                 messages.error(request, 'PIN을 입력해주세요.')
                 return redirect('auth_transactions:transaction_detail', transaction_id=transaction_id)
             
-            # PIN 검증 (User 모델의 check_pin 메서드 사용)
+            # PIN 연속 실패로 잠긴 계정 (캐시 조회 1회)
+            locked_for = lockout.locked_for(request.user.pk)
+            if locked_for:
+                messages.error(request, f'PIN 입력 실패가 많아 계정이 잠겼습니다. {math.ceil(locked_for / 60)}분 후 다시 시도해주세요.')
+                return redirect('auth_transactions:transaction_detail', transaction_id=transaction_id)
+            
+            # PIN 검증 (bcrypt 전용 풀에서 실행, 행 잠금 없이)
             try:
-                if not request.user.check_pin(pin):
+                if not request.user.verify_pin(pin):
+                    self._pin_failed(transaction_id)
                     messages.error(request, f'PIN이 올바르지 않습니다. 입력한 PIN: {pin}')
                     return redirect('auth_transactions:transaction_detail', transaction_id=transaction_id)
+            except PinVerifierBusy:
+                messages.error(request, '요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요.')
+                return redirect('auth_transactions:transaction_detail', transaction_id=transaction_id)
             except Exception as e:
                 messages.error(request, f'PIN 검증 오류: {str(e)}')
                 return redirect('auth_transactions:transaction_detail', transaction_id=transaction_id)
             
-            # 승인 처리
-            transaction.status = 'COMPLETED'
-            transaction.confirmed_at = timezone.now()
-            transaction.save()
-            
-            messages.success(request, f'인증 요청을 승인했습니다. (Transaction: {transaction_id})')
+            # 승인 처리 (최종 상태 전이만 잠금 하에서 수행)
+            if self._transition(transaction_id, 'COMPLETED'):
+                messages.success(request, f'인증 요청을 승인했습니다. (Transaction: {transaction_id})')
             
         elif action == 'reject':
             # 거부 처리
-            transaction.status = 'FAILED'
-            transaction.failure_reason = '사용자가 거부함'
-            transaction.confirmed_at = timezone.now()
-            transaction.save()
-            
-            messages.warning(request, '인증 요청을 거부했습니다.')
+            if self._transition(transaction_id, 'FAILED', failure_reason='사용자가 거부함'):
+                messages.warning(request, '인증 요청을 거부했습니다.')
         
         else:
             messages.error(request, '잘못된 요청입니다.')
         
         return redirect('auth_transactions:transaction_detail', transaction_id=transaction_id)
+    
+    def _pin_failed(self, transaction_id):
+        """PIN 실패 카운터 증가 후 AUTH_FAILED 감사 로그 기록 (트랜잭션은 PENDING 유지)"""
+        ip_address = get_client_ip(self.request)
+        audit_records = [{
+            'user': self.request.user,
+            'action': 'AUTH_FAILED',
+            'details': f'Invalid PIN for transaction {transaction_id}',
+            'ip_address': ip_address,
+            'request_path': self.request.path,
+            'request_method': self.request.method,
+        }]
+        # 잠금이 걸리면 ADMIN_ACTION 감사 로그도 같은 INSERT로 기록
+        lockout.register_failure(self.request.user.pk, ip_address=ip_address, audit_records=audit_records)
+        record_audit_many(audit_records)
+    
+    def _transition(self, transaction_id, new_status, **fields):
+        """
+        SELECT FOR UPDATE로 행을 잠그고 PENDING 상태를 재확인한 뒤 상태 전이
+        잠금 대기 중 다른 요청이 먼저 처리했거나 만료되었으면 False
+        """
+        with db_transaction.atomic():
+            transaction = AuthTransaction.objects.select_for_update().get(
+                transaction_id=transaction_id
+            )
+            if transaction.status != 'PENDING':
+                messages.error(self.request, '이미 처리된 요청입니다.')
+                return False
+            if transaction.is_expired:
+                self._mark_expired(transaction)
+                messages.error(self.request, '만료된 요청입니다.')
+                return False
+            
+            transaction.transition_to(new_status, confirmed_at=timezone.now(), **fields)
+            return True
+    
+    def _expire(self, transaction_id):
+        """만료 상태로 전이 (잠금 하에서)"""
+        with db_transaction.atomic():
+            transaction = AuthTransaction.objects.select_for_update().get(
+                transaction_id=transaction_id
+            )
+            if transaction.status == 'PENDING':
+                self._mark_expired(transaction)
+    
+    @staticmethod
+    def _mark_expired(transaction):
+        transaction.transition_to('EXPIRED', failure_reason='요청이 만료되었습니다.')
@@ -0,0 +1,27 @@
+from django.apps import AppConfig
+
+
+class IdpBackendConfig(AppConfig):
+    name = 'idp_backend'
+    verbose_name = 'IdP Backend'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from auth_transactions.signals import transaction_status_changed
+        from .db import apply_sqlite_pragmas
+        from .metrics import count_transition
+        from .profiling import install_query_recorder
+
+        connection_created.connect(
+            apply_sqlite_pragmas,
+            dispatch_uid='idp_backend.apply_sqlite_pragmas'
+        )
+        connection_created.connect(
+            install_query_recorder,
+            dispatch_uid='idp_backend.profiling.install_query_recorder'
+        )
+        transaction_status_changed.connect(
+            count_transition,
+            dispatch_uid='idp_backend.metrics.count_transition'
+        )
@@ -2,6 +2,8 @@
 ASGI config for idp_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The long-poll and SSE status endpoints are async views and should be served
+through this entry point (e.g. ``uvicorn idp_backend.asgi:application``).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,137 @@
+"""
+Environment-driven database profiles
+
+IDP_DB_PROFILE selects the default database:
+- sqlite (default): BASE_DIR/db.sqlite3 (or IDP_SQLITE_PATH) for
+  development and single-node sites; tuned by apply_sqlite_pragmas
+- postgres: PostgreSQL via psycopg 3 with persistent connections, or
+  Django 5 connection pooling when IDP_DB_POOL=1 (needs psycopg[pool])
+
+SQLite settings:
+    IDP_SQLITE_PATH, IDP_SQLITE_TIMEOUT (seconds a writer waits for the lock)
+    IDP_SQLITE_TRANSACTION_MODE (default IMMEDIATE, see sqlite_profile)
+
+PostgreSQL settings:
+    POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT
+    IDP_DB_CONN_MAX_AGE   persistent connection lifetime without pooling (default 60)
+    IDP_DB_POOL           1 to use the psycopg connection pool
+    IDP_DB_POOL_MIN_SIZE / IDP_DB_POOL_MAX_SIZE / IDP_DB_POOL_TIMEOUT
+
+Read replica (optional, see replica_config and idp_backend/routers.py):
+    IDP_SQLITE_REPLICA_PATH                     second SQLite file (local testing)
+    POSTGRES_REPLICA_HOST / POSTGRES_REPLICA_PORT   streaming replica of the primary
+"""
+import os
+
+from django.conf import settings
+
+
+PROFILES = ('sqlite', 'postgres')
+
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def sqlite_profile(base_dir, env):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': env.get('IDP_SQLITE_PATH') or base_dir / 'db.sqlite3',
+        'OPTIONS': {
+            # Seconds a connection waits for a lock before "database is locked"
+            'timeout': float(env.get('IDP_SQLITE_TIMEOUT', 20)),
+            # Write serialization: atomic() starts with BEGIN IMMEDIATE, so a
+            # writer takes the lock up front and queues on the busy timeout.
+            # With DEFERRED, a read-then-write transaction that loses the
+            # upgrade race fails at once with "database is locked".
+            'transaction_mode': env.get('IDP_SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+        },
+    }
+
+
+def postgres_profile(env):
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env.get('POSTGRES_DB', 'idp_backend'),
+        'USER': env.get('POSTGRES_USER', 'idp'),
+        'PASSWORD': env.get('POSTGRES_PASSWORD', ''),
+        'HOST': env.get('POSTGRES_HOST', 'localhost'),
+        'PORT': env.get('POSTGRES_PORT', '5432'),
+        'OPTIONS': {},
+    }
+    if _flag(env.get('IDP_DB_POOL', '')):
+        # The pool owns connection reuse; CONN_MAX_AGE must stay 0
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': int(env.get('IDP_DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(env.get('IDP_DB_POOL_MAX_SIZE', 20)),
+            'timeout': float(env.get('IDP_DB_POOL_TIMEOUT', 10)),
+        }
+    else:
+        config['CONN_MAX_AGE'] = int(env.get('IDP_DB_CONN_MAX_AGE', 60))
+        config['CONN_HEALTH_CHECKS'] = True
+    return config
+
+
+def database_config(base_dir, env=None):
+    """DATABASES['default'] for the profile named by IDP_DB_PROFILE"""
+    env = os.environ if env is None else env
+    profile = env.get('IDP_DB_PROFILE', 'sqlite').lower()
+    if profile == 'sqlite':
+        return sqlite_profile(base_dir, env)
+    if profile in ('postgres', 'postgresql'):
+        return postgres_profile(env)
+    raise ValueError(f'Unknown IDP_DB_PROFILE {profile!r}; expected one of {PROFILES}')
+
+
+def replica_config(base_dir, env=None):
+    """
+    DATABASES['replica'] when a read replica is configured, else None
+    Same profile and options as the primary, pointed at the replica; under
+    the test runner it mirrors the test default database.
+    """
+    env = os.environ if env is None else env
+    config = database_config(base_dir, env)
+    if config['ENGINE'].endswith('sqlite3'):
+        if not env.get('IDP_SQLITE_REPLICA_PATH'):
+            return None
+        config['NAME'] = env['IDP_SQLITE_REPLICA_PATH']
+    else:
+        if not env.get('POSTGRES_REPLICA_HOST'):
+            return None
+        config['HOST'] = env['POSTGRES_REPLICA_HOST']
+        config['PORT'] = env.get('POSTGRES_REPLICA_PORT', config['PORT'])
+    config['TEST'] = {'MIRROR': 'default'}
+    return config
+
+
+# Applied to every new SQLite connection; override or extend with
+# IDP_SETTINGS['SQLITE_PRAGMAS'] (a value of None skips a pragma)
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',          # readers no longer block the writer (persistent per file)
+    'synchronous': 'NORMAL',        # fsync at checkpoints only; safe with WAL
+    'busy_timeout': 20000,          # ms to wait for a lock instead of failing
+    'cache_size': -64000,           # 64 MB page cache (negative = KiB)
+    'mmap_size': 268435456,         # 256 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_pragmas():
+    overrides = getattr(settings, 'IDP_SETTINGS', {}).get('SQLITE_PRAGMAS') or {}
+    pragmas = {**DEFAULT_SQLITE_PRAGMAS, **overrides}
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """connection_created receiver: tune each new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = sqlite_pragmas()
+    if connection.is_in_memory_db():
+        # WAL and mmap do not apply to in-memory databases (e.g. the test DB)
+        pragmas.pop('journal_mode', None)
+        pragmas.pop('mmap_size', None)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
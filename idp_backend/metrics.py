@@ -0,0 +1,381 @@
+"""
+Runtime metrics in the Prometheus text format
+
+- MetricsMiddleware: latency histogram per resolved view / method / status
+- idp_http_request_queries: queries per request (idp_backend/profiling.py)
+- idp_transaction_transitions_total: transaction_status_changed receiver
+- idp_pin_check_seconds, idp_encryption_seconds: timers around
+  User.check_pin / User.verify_pin and EncryptionUtil
+- idp_transactions_pending, idp_outbox_backlog: gauges read from the
+  database when /metrics is scraped
+
+Recording takes no lock: every thread writes to its own shard and a scrape
+merges the shards. With IDP_SETTINGS['METRICS_DIR'] set (one directory per
+deployment, emptied on deploy), each process also snapshots its shards to
+METRICS_DIR/metrics-<pid>.json every METRICS_FLUSH_SECONDS and /metrics
+sums the snapshots of all worker processes (uvicorn/gunicorn workers, dispatchers).
+
+/metrics answers only clients in METRICS_ALLOWED_IPS (loopback by default);
+opening it to everyone takes an explicit '*'.
+"""
+from bisect import bisect_left
+from functools import wraps
+import atexit
+import glob
+import ipaddress
+import json
+import os
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _setting(name, default):
+    return getattr(settings, 'IDP_SETTINGS', {}).get(name, default)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _key(self, labels):
+        return self.name, tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = self.registry.shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    """Per-bucket counts (not cumulative) followed by sum and count"""
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(registry, name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        shard = self.registry.shard()
+        key = self._key(labels)
+        slots = shard.get(key)
+        if slots is None:
+            slots = shard[key] = [0] * (len(self.buckets) + 3)
+        slots[bisect_left(self.buckets, value)] += 1
+        slots[-2] += value
+        slots[-1] += 1
+
+    def time(self, **labels):
+        """Decorator timing each call of the wrapped function"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, **labels)
+            return wrapper
+        return decorator
+
+
+class Gauge(_Metric):
+    """
+    Value computed at scrape time by collect() -> {label values tuple: value}
+    Gauges describe shared state (database rows), so they are read once per
+    scrape and never summed across processes.
+    """
+    kind = 'gauge'
+
+    def __init__(self, registry, name, documentation, labelnames=(), collect=None):
+        self.collect = collect
+        super().__init__(registry, name, documentation, labelnames)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._local = threading.local()
+        self._shards = []       # (thread, shard) for every thread that recorded
+        self._retired = {}      # merged shards of finished threads
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def shard(self):
+        """This thread's private shard; only the first call per thread locks"""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            self._ensure_flusher()
+            return shard
+
+    def _merge_into(self, target, items):
+        for key, value in items:
+            current = target.get(key)
+            if current is None:
+                target[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                for i, slot in enumerate(value):
+                    current[i] += slot
+            else:
+                target[key] = current + value
+
+    def snapshot(self):
+        """This process's values: retired shards plus every live thread's shard"""
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    self._merge_into(self._retired, list(shard.items()))
+            self._shards = live
+            merged = {}
+            self._merge_into(merged, self._retired.items())
+            for _, shard in live:
+                # list() copies in one step under the GIL; writers may keep going
+                self._merge_into(merged, list(shard.items()))
+        return merged
+
+    # Multi-process aggregation
+
+    def _path(self, directory):
+        return os.path.join(directory, f'metrics-{os.getpid()}.json')
+
+    def flush(self):
+        """Write this process's snapshot for the other workers' scrapes"""
+        directory = _setting('METRICS_DIR', None)
+        if not directory:
+            return
+        data = [[name, list(labels), value] for (name, labels), value in self.snapshot().items()]
+        os.makedirs(directory, exist_ok=True)
+        path = self._path(directory)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def _ensure_flusher(self):
+        if self._flusher is not None or not _setting('METRICS_DIR', None):
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flusher', daemon=True)
+            self._flusher.start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(_setting('METRICS_FLUSH_SECONDS', 5))
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def collect(self):
+        """Values summed over this process and every other process's snapshot"""
+        merged = self.snapshot()
+        directory = _setting('METRICS_DIR', None)
+        if directory:
+            own = self._path(directory)
+            for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+                if path == own:
+                    continue
+                try:
+                    with open(path) as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                self._merge_into(merged, (((name, tuple(labels)), value) for name, labels, value in data))
+        return merged
+
+    def _after_fork(self):
+        """Children start empty; the parent's values stay in the parent's file"""
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def render(self):
+        values = {}
+        for (name, labels), value in self.collect().items():
+            values.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            if metric.kind == 'gauge':
+                samples = metric.collect().items() if metric.collect else ()
+                for labels, value in samples:
+                    lines.append(f'{metric.name}{_labels(metric.labelnames, labels)} {_number(value)}')
+                continue
+            for labels, value in sorted(values.get(metric.name, ())):
+                if metric.kind == 'counter':
+                    lines.append(f'{metric.name}{_labels(metric.labelnames, labels)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip((*metric.buckets, float('inf')), value):
+                    cumulative += count
+                    le = (('le', _number(bound)),)
+                    lines.append(f'{metric.name}_bucket{_labels(metric.labelnames, labels, le)} {cumulative}')
+                lines.append(f'{metric.name}_sum{_labels(metric.labelnames, labels)} {_number(value[-2])}')
+                lines.append(f'{metric.name}_count{_labels(metric.labelnames, labels)} {value[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry._after_fork)
+
+
+def _pending_transactions():
+    from auth_transactions.models import AuthTransaction
+    return {(): AuthTransaction.objects.filter(status='PENDING').count()}
+
+
+def _outbox_backlog():
+    from auth_transactions.models import CallbackDelivery, NotificationLog
+    return {
+        ('callbacks',): CallbackDelivery.objects.filter(status='PENDING').count(),
+        ('notifications',): NotificationLog.objects.filter(status='PENDING').count(),
+    }
+
+
+REQUEST_SECONDS = Histogram(
+    registry, 'idp_http_request_duration_seconds', 'Request latency by resolved view',
+    ('view', 'method', 'status'),
+)
+REQUEST_QUERIES = Histogram(
+    registry, 'idp_http_request_queries', 'SQL queries per request by resolved view', ('view',),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+TRANSITIONS = Counter(
+    registry, 'idp_transaction_transitions_total', 'AuthTransaction status transitions',
+    ('from_status', 'to_status'),
+)
+PIN_CHECK_SECONDS = Histogram(
+    registry, 'idp_pin_check_seconds', 'bcrypt PIN verification time', ('method',),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.5, 5.0),
+)
+ENCRYPTION_SECONDS = Histogram(
+    registry, 'idp_encryption_seconds', 'EncryptionUtil call time', ('operation',),
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01),
+)
+PENDING_TRANSACTIONS = Gauge(
+    registry, 'idp_transactions_pending', 'AuthTransaction rows in PENDING',
+    collect=_pending_transactions,
+)
+OUTBOX_BACKLOG = Gauge(
+    registry, 'idp_outbox_backlog', 'PENDING rows in the delivery outboxes', ('outbox',),
+    collect=_outbox_backlog,
+)
+
+
+def count_transition(sender, old_status, new_status, **kwargs):
+    """transaction_status_changed receiver"""
+    TRANSITIONS.inc(from_status=old_status or 'NEW', to_status=new_status)
+
+
+class MetricsMiddleware:
+    """
+    Times every request; place first so the other middleware is included
+    Sync and async capable like ReplicaRoutingMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, started)
+        return response
+
+    @staticmethod
+    def _record(request, response, started):
+        match = getattr(request, 'resolver_match', None)
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            view=match.view_name if match else 'unmatched',
+            method=request.method,
+            status=response.status_code,
+        )
+
+
+DEFAULT_ALLOWED_IPS = ('127.0.0.1', '::1')
+
+
+def _client_allowed(remote_addr, allowed):
+    """allowed: addresses and/or networks ('10.0.0.0/8'); '*' admits anyone"""
+    if '*' in allowed:
+        return True
+    try:
+        address = ipaddress.ip_address(remote_addr or '')
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(entry, strict=False) for entry in allowed)
+
+
+def metrics_view(request):
+    """GET /metrics - Prometheus text exposition"""
+    allowed = _setting('METRICS_ALLOWED_IPS', None)
+    if allowed is None:
+        allowed = DEFAULT_ALLOWED_IPS
+    if not _client_allowed(request.META.get('REMOTE_ADDR'), allowed):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,228 @@
+"""
+Per-request SQL profile: query count, DB time and duplicate fingerprints
+
+A database execute wrapper (installed on every connection through
+connection_created) feeds every active profile_queries() block. The
+fingerprint of a query is its SQL with literals, placeholders and IN
+lists normalized, so the same statement run once per row of a list (the
+N+1 pattern) shows up as one fingerprint with a high count.
+
+QueryProfilerMiddleware profiles each request: with DEBUG (or
+QUERY_PROFILER['HEADERS']) the figures go into X-DB-* response headers,
+otherwise into one JSON log line per request (INFO) on this module's
+logger. Requests that exceed their view's @query_budget or repeat a
+fingerprint DUPLICATE_THRESHOLD times are logged as warnings either way.
+Under the test runner (or with QUERY_PROFILER['RAISE'] = True) an
+over-budget request raises QueryBudgetExceeded instead. The view has run
+and committed by then, so this is never tied to DEBUG: a development
+server must not answer 500 for a state change it already stored.
+
+idp_backend.testing.QueryBudgetMixin fails a test when an endpoint runs
+more queries than its declared budget.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import REQUEST_QUERIES
+
+
+logger = logging.getLogger(__name__)
+
+_profiles = ContextVar('idp_query_profiles', default=())
+_enforced = None  # set by idp_backend.testing.QueryBudgetTestRunner
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _profiler_setting(name, default):
+    return getattr(settings, 'IDP_SETTINGS', {}).get('QUERY_PROFILER', {}).get(name, default)
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more queries than its view's @query_budget"""
+
+
+def enforce_budgets(enabled=True):
+    """Raise on every over-budget request regardless of DEBUG / RAISE"""
+    global _enforced
+    _enforced = enabled
+
+
+def _raises():
+    if _enforced is not None:
+        return _enforced
+    return bool(_profiler_setting('RAISE', False))
+
+
+def fingerprint(sql):
+    """SQL shape without values: literals/placeholders -> ?, IN lists -> (...)"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryProfile:
+    """Queries seen inside one profile_queries() block"""
+
+    def __init__(self, keep_sql=False):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()  # raw SQL; normalized only when reported
+        self.queries = [] if keep_sql else None
+
+    def record(self, sql, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[sql] += 1
+        if self.queries is not None:
+            self.queries.append(sql)
+
+    @property
+    def fingerprints(self):
+        fingerprints = Counter()
+        for sql, n in self.statements.items():
+            fingerprints[fingerprint(sql)] += n
+        return fingerprints
+
+    def duplicates(self, threshold=2):
+        """[(fingerprint, count)] run at least threshold times, most frequent first"""
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n >= threshold]
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper; a no-op outside profile_queries()"""
+    profiles = _profiles.get()
+    if not profiles:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for profile in profiles:
+            profile.record(sql, elapsed)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextmanager
+def profile_queries(keep_sql=False):
+    """Profile the queries of this block (and of enclosing blocks too)"""
+    profile = QueryProfile(keep_sql=keep_sql)
+    token = _profiles.set(_profiles.get() + (profile,))
+    try:
+        yield profile
+    finally:
+        _profiles.reset(token)
+
+
+def query_budget(max_queries):
+    """
+    Declare the most queries a view may run per request (middleware included)
+    Works on function views and on class-based views. Size it from the worst
+    path (cold caches, failure branches) plus two queries of headroom and
+    name that path in a comment at the decorator.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def declared_budget(view_func):
+    """Budget of a resolved view function (as_view() result included), or None"""
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(view_func, 'view_class', None), 'query_budget', None)
+    return budget
+
+
+class QueryProfilerMiddleware:
+    """
+    Profiles the SQL of each request; place right after MetricsMiddleware
+    Sync and async capable like ReplicaRoutingMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _profiler_setting('ENABLED', True):
+            return self.get_response(request)
+        with profile_queries() as profile:
+            response = self.get_response(request)
+        return self._report(request, response, profile)
+
+    async def __acall__(self, request):
+        if not _profiler_setting('ENABLED', True):
+            return await self.get_response(request)
+        with profile_queries() as profile:
+            response = await self.get_response(request)
+        return self._report(request, response, profile)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = declared_budget(view_func)
+
+    @staticmethod
+    def _report(request, response, profile):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        budget = getattr(request, 'query_budget', None)
+        repeated = profile.duplicates()
+        threshold = _profiler_setting('DUPLICATE_THRESHOLD', 3)
+        duplicates = [(sql, n) for sql, n in repeated if n >= threshold]
+        REQUEST_QUERIES.observe(profile.count, view=view)
+
+        over_budget = budget is not None and profile.count > budget
+        headers = _profiler_setting('HEADERS', None)
+        if settings.DEBUG if headers is None else headers:
+            response['X-DB-Query-Count'] = str(profile.count)
+            response['X-DB-Time-Ms'] = f'{profile.seconds * 1000:.2f}'
+            response['X-DB-Duplicate-Queries'] = str(sum(n - 1 for _, n in repeated))
+            if budget is not None:
+                response['X-DB-Query-Budget'] = str(budget)
+            if not (over_budget or duplicates):
+                return response
+        if over_budget and _raises():
+            lines = [f'{request.method} {request.path} ran {profile.count} queries, budget is {budget}']
+            lines.extend(f'  {n}x {sql}' for sql, n in repeated)
+            raise QueryBudgetExceeded('\n'.join(lines))
+
+        level = logging.WARNING if over_budget or duplicates else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'event': 'request_queries',
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                'queries': profile.count,
+                'db_ms': round(profile.seconds * 1000, 2),
+                'budget': budget,
+                'over_budget': over_budget,
+                'duplicates': [{'sql': sql[:300], 'count': n} for sql, n in duplicates],
+            }))
+        return response
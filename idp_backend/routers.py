@@ -0,0 +1,155 @@
+"""
+Primary / read-replica database routing
+
+Everything reads from and writes to the primary ('default') unless a view
+opted in with @read_from_replica (or ReplicaReadMixin) and the request is a
+GET/HEAD: then ORM reads during that request - including template
+rendering - go to IDP_SETTINGS['READ_REPLICA_ALIAS'].
+
+Read-your-writes:
+- a write during the request pins its remaining reads to the primary
+- reads inside an atomic block on the primary stay on the primary
+- a request that wrote (or any non-GET/HEAD request) sets a short-lived
+  cookie that pins the client's next READ_REPLICA_PIN_SECONDS of requests
+  to the primary, so the page after a POST/redirect never lags behind it
+
+The auth API (auth_request, auth_confirm, auth_status...) never opts in.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+PIN_COOKIE = 'idp_primary_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+
+# Sessions must be read back exactly as written (login, CSRF, messages)
+PRIMARY_ONLY_APPS = frozenset({'sessions'})
+
+
+class _RoutingState:
+    __slots__ = ('replica', 'pinned', 'wrote')
+
+    def __init__(self, replica=False, pinned=False):
+        self.replica = replica
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = ContextVar('idp_db_routing', default=None)
+
+
+def replica_alias():
+    return settings.IDP_SETTINGS.get('READ_REPLICA_ALIAS')
+
+
+def read_from_replica(view_func):
+    """Mark a view whose GET/HEAD reads may be served by the replica"""
+    view_func.use_read_replica = True
+    return view_func
+
+
+class ReplicaReadMixin:
+    """Class-based view counterpart of @read_from_replica"""
+    use_read_replica = True
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return read_from_replica(super().as_view(**initkwargs))
+
+
+@contextmanager
+def replica_reads():
+    """Route reads in this block to the replica outside the request cycle (scripts, reports)"""
+    token = _state.set(_RoutingState(replica=True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """DATABASE_ROUTERS entry; a no-op while no replica alias is configured"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica or state.pinned:
+            return None
+        alias = replica_alias()
+        if not alias or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = True
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Sets up per-request routing state; place after AuthenticationMiddleware
+    Sync and async capable so async views (status long-poll/SSE) keep
+    running on the server's event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(request, response, state)
+
+    async def __acall__(self, request):
+        state, token = self._begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(request, response, state)
+
+    @staticmethod
+    def _begin(request):
+        pinned = request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        state = _RoutingState(pinned=pinned)
+        return state, _state.set(state)
+
+    @staticmethod
+    def _finish(request, response, state):
+        if (state.wrote or request.method not in SAFE_METHODS) and replica_alias():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.IDP_SETTINGS.get('READ_REPLICA_PIN_SECONDS', 5),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in SAFE_METHODS and getattr(view_func, 'use_read_replica', False):
+            _state.get().replica = True
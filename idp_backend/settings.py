@@ -11,6 +11,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import os
+
+from .db import database_config, replica_config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,6 +43,7 @@ INSTALLED_APPS = [
     # Third-party apps
     'rest_framework',
     # Local apps
+    'idp_backend',  # database tuning hooks (idp_backend/db.py)
     'accounts',
     'services',
     'auth_transactions',
@@ -47,11 +51,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'idp_backend.metrics.MetricsMiddleware',  # first, so it times the whole stack
+    'idp_backend.profiling.QueryProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'idp_backend.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,12 +87,16 @@ WSGI_APPLICATION = 'idp_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Selected by IDP_DB_PROFILE (sqlite | postgres), see idp_backend/db.py
+# SQLite connections are tuned by IDP_SETTINGS['SQLITE_PRAGMAS']
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
 }
+# Optional read replica for history/dashboard/admin reads (idp_backend/routers.py)
+if (_replica := replica_config(BASE_DIR)) is not None:
+    DATABASES['replica'] = _replica
+
+DATABASE_ROUTERS = ['idp_backend.routers.PrimaryReplicaRouter']
 
 
 # Password validation
@@ -149,6 +160,122 @@ REST_FRAMEWORK = {
 # IdP Specific Settings
 IDP_SETTINGS = {
     'TRANSACTION_EXPIRY_MINUTES': 3,
+    # Failed-PIN lockout (accounts/lockout.py): MAX_LOGIN_ATTEMPTS wrong PINs
+    # within LOGIN_FAILURE_WINDOW_MINUTES lock PIN confirmation for
+    # ACCOUNT_LOCKOUT_MINUTES; counters live in LOGIN_FAILURE_CACHE_ALIAS
     'MAX_LOGIN_ATTEMPTS': 5,
     'ACCOUNT_LOCKOUT_MINUTES': 10,
+    'LOGIN_FAILURE_WINDOW_MINUTES': 10,
+    'LOGIN_FAILURE_CACHE_ALIAS': 'default',
+    # Sliding-window API rate limits (auth_transactions/ratelimit.py):
+    # scope -> (max requests, window seconds); drop a scope to disable it
+    'RATE_LIMITS': {
+        'auth_request:ip': (3000, 60),
+        'auth_request:client_id': (6000, 60),
+        'auth_request:phone': (10, 60),           # pushes to one user
+        'auth_confirm:ip': (300, 60),
+        'auth_confirm:transaction_id': (5, 60),   # PIN attempts per transaction
+    },
+    'RATE_LIMIT_MAX_KEYS': 100_000,               # per scope, least recently used evicted
+    'RATE_LIMIT_CACHE_ALIAS': None,               # shared Django cache alias; None = per process
+    # Reverse proxies in front of the app that append to X-Forwarded-For;
+    # 0 = ignore the header and use REMOTE_ADDR (client IP for limits/audit)
+    'TRUSTED_PROXY_COUNT': 0,
+    # In-process ServiceProvider credential cache (services/cache.py)
+    'SP_CREDENTIAL_CACHE_SIZE': 256,
+    'SP_CREDENTIAL_CACHE_TTL_SECONDS': 300,
+    # Unwrapped per-SP EncryptionKey cache for auth_status encryption
+    'SP_KEY_CACHE_SIZE': 256,
+    'SP_KEY_CACHE_TTL_SECONDS': 300,
+    # bcrypt PIN verification pool (accounts/pin_verifier.py)
+    'PIN_VERIFIER_WORKERS': None,  # None = os.cpu_count(), 0 = inline
+    'PIN_VERIFIER_MAX_PENDING': None,  # None = 4 x workers
+    'PIN_VERIFIER_ACQUIRE_TIMEOUT_SECONDS': 0.5,
+    # Max phone numbers per POST api/request/batch/
+    'AUTH_REQUEST_BATCH_MAX_SIZE': 500,
+    # POST api/status/batch/: max ids per call, cursor trailing window
+    'AUTH_STATUS_BATCH_MAX_SIZE': 1000,
+    'STATUS_BATCH_CURSOR_LAG_SECONDS': 5,
+    # Long-poll / SSE status endpoints (run under idp_backend/asgi.py)
+    'STATUS_LONG_POLL_TIMEOUT_SECONDS': 25,
+    'STATUS_WAIT_RECHECK_SECONDS': 2,
+    'STATUS_STREAM_KEEPALIVE_SECONDS': 15,
+    'STATUS_STREAM_MAX_SECONDS': 600,
+    # In-process memo of COMPLETED auth_status bodies (auth_transactions/status_cache.py)
+    'STATUS_RESULT_CACHE_SIZE': 1024,
+    'STATUS_RESULT_CACHE_TTL_SECONDS': 30,
+    # archive_transactions: terminal transactions older than this move to
+    # ArchivedAuthTransaction, BATCH_SIZE rows per DB transaction
+    'TRANSACTION_ARCHIVE_AFTER_DAYS': 90,
+    'TRANSACTION_ARCHIVE_BATCH_SIZE': 1000,
+    # Signed callback outbox (auth_transactions/callbacks.py); per-SP
+    # concurrency applies per dispatcher process, and a batch takes at most
+    # LEASE_SECONDS // TIMEOUT_SECONDS rows per SP lane
+    'CALLBACK_MAX_WORKERS': 8,
+    'CALLBACK_PER_SP_CONCURRENCY': 2,
+    'CALLBACK_BATCH_SIZE': 100,
+    'CALLBACK_MAX_ATTEMPTS': 8,
+    'CALLBACK_BACKOFF_BASE_SECONDS': 5,
+    'CALLBACK_BACKOFF_MAX_SECONDS': 3600,
+    'CALLBACK_TIMEOUT_SECONDS': 5,
+    'CALLBACK_LEASE_SECONDS': 60,
+    # Push notification outbox (auth_transactions/notifications.py);
+    # PUSH_PROVIDER is a dotted PushProvider class built with PUSH_PROVIDER_OPTIONS
+    'PUSH_PROVIDER': 'auth_transactions.notifications.FakePushProvider',
+    'PUSH_PROVIDER_OPTIONS': {},
+    'NOTIFICATION_MAX_WORKERS': 16,
+    'NOTIFICATION_BATCH_SIZE': 200,
+    'NOTIFICATION_MAX_ATTEMPTS': 3,
+    'NOTIFICATION_BACKOFF_BASE_SECONDS': 2,
+    'NOTIFICATION_BACKOFF_MAX_SECONDS': 60,
+    'NOTIFICATION_LEASE_SECONDS': 30,
+    # Cached per-user status counters (auth_transactions/stats.py);
+    # None = one aggregate query per page view. Needs a shared cache
+    # backend when several processes serve requests.
+    'USER_STATS_CACHE_SECONDS': None,
+    'USER_STATS_CACHE_ALIAS': 'default',
+    # CI/DI field keys (accounts/utils.py KeyRing): ordered {key_id: fernet_key};
+    # the first key encrypts, all of them decrypt. None = SECRET_KEY-derived
+    # legacy key. Unset = {'legacy': None}.
+    'FIELD_ENCRYPTION_KEYS': None,
+    # Per-connection SQLite pragmas, merged over idp_backend.db.DEFAULT_SQLITE_PRAGMAS
+    'SQLITE_PRAGMAS': {},
+    # Replica alias for views marked @read_from_replica (None = primary only),
+    # and how long a client's reads stay on the primary after it writes
+    'READ_REPLICA_ALIAS': 'replica' if 'replica' in DATABASES else None,
+    'READ_REPLICA_PIN_SECONDS': 5,
+    # Landing page counters (accounts/counters.py)
+    'GLOBAL_COUNTERS_RECONCILE_SECONDS': 300,
+    'GLOBAL_COUNTERS_CACHE_ALIAS': 'default',
+    # Audit sink (audit_logs/sink.py); use 'buffered' to take audit INSERTs
+    # off the request path. SPOOL_DIR makes the buffer crash-safe.
+    'AUDIT_SINK': {
+        'MODE': 'sync',
+        'BATCH_SIZE': 100,
+        'FLUSH_INTERVAL_SECONDS': 1.0,
+        'SPOOL_DIR': None,
+    },
+    # /metrics (idp_backend/metrics.py). METRICS_DIR: per-process snapshot
+    # directory shared by all workers of one deployment (empty it on deploy);
+    # None = this process's metrics only. METRICS_ALLOWED_IPS: addresses or
+    # networks of the scrapers (REMOTE_ADDR), loopback only by default;
+    # ['*'] exposes traffic and PIN timing to anyone, so avoid it.
+    'METRICS_DIR': os.environ.get('IDP_METRICS_DIR') or None,
+    'METRICS_FLUSH_SECONDS': 5,
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+    # Per-request SQL profile (idp_backend/profiling.py). HEADERS: X-DB-*
+    # response headers, None = DEBUG. Without headers every request is one
+    # JSON INFO line on the idp_backend.profiling logger; over-budget and
+    # N+1 requests (a fingerprint repeated DUPLICATE_THRESHOLD times) WARNING.
+    # RAISE: over-budget requests raise QueryBudgetExceeded after the view
+    # has committed (always on under the test runner below); otherwise they
+    # are only logged.
+    'QUERY_PROFILER': {
+        'ENABLED': True,
+        'HEADERS': None,
+        'RAISE': False,
+        'DUPLICATE_THRESHOLD': 3,
+    },
 }
+
+TEST_RUNNER = 'idp_backend.testing.QueryBudgetTestRunner'
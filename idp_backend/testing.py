@@ -0,0 +1,49 @@
+"""
+Test helpers shared by the apps' test suites
+"""
+from urllib.parse import urlsplit
+
+from django.test.runner import DiscoverRunner
+from django.urls import resolve
+
+from .profiling import declared_budget, enforce_budgets, profile_queries
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """
+    TEST_RUNNER: every request in the suite that exceeds its view's
+    @query_budget raises QueryBudgetExceeded, failing the test that sent it
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        enforce_budgets(True)
+
+    def teardown_test_environment(self, **kwargs):
+        enforce_budgets(None)
+        super().teardown_test_environment(**kwargs)
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin: assertQueryBudget() sends a request with self.client and
+    fails when it runs more SQL queries than the view's @query_budget (or an
+    explicit budget), listing the repeated fingerprints and every statement.
+    """
+
+    def assertQueryBudget(self, method, path, *args, budget=None, **kwargs):
+        if budget is None:
+            budget = declared_budget(resolve(urlsplit(path).path).func)
+            if budget is None:
+                self.fail(f'{path} declares no @query_budget')
+
+        with profile_queries(keep_sql=True) as profile:
+            response = getattr(self.client, method.lower())(path, *args, **kwargs)
+
+        if profile.count > budget:
+            lines = [f'{method.upper()} {path} ran {profile.count} queries, budget is {budget}']
+            for sql, n in profile.duplicates():
+                lines.append(f'  {n}x {sql}')
+            lines.extend(f'  {i}. {sql}' for i, sql in enumerate(profile.queries, 1))
+            self.fail('\n'.join(lines))
+        return response
@@ -0,0 +1,426 @@
+"""
+Tests for project-level configuration (database profiles)
+"""
+from datetime import timedelta
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+
+from accounts.models import User
+from auth_transactions.models import AuthTransaction
+from idp_backend import metrics, profiling
+from idp_backend.profiling import QueryBudgetExceeded, fingerprint, profile_queries
+from idp_backend.db import DEFAULT_SQLITE_PRAGMAS, database_config, replica_config
+from idp_backend.routers import PIN_COOKIE, ReplicaRoutingMiddleware, read_from_replica
+from services.models import ServiceProvider
+
+sys.path.insert(0, str(Path(settings.BASE_DIR) / 'scripts'))
+import throwaway_postgres  # noqa: E402
+
+
+class DatabaseProfileTestCase(SimpleTestCase):
+    """IDP_DB_PROFILE 환경 변수에 따른 데이터베이스 설정"""
+
+    base_dir = Path('/srv/idp')
+
+    def test_sqlite_is_default(self):
+        config = database_config(self.base_dir, env={})
+
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(config['NAME'], self.base_dir / 'db.sqlite3')
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+    def test_postgres_persistent_connections(self):
+        config = database_config(self.base_dir, env={
+            'IDP_DB_PROFILE': 'postgres', 'POSTGRES_HOST': 'db', 'IDP_DB_CONN_MAX_AGE': '120',
+        })
+
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(config['HOST'], 'db')
+        self.assertEqual(config['CONN_MAX_AGE'], 120)
+        self.assertNotIn('pool', config['OPTIONS'])
+
+    def test_postgres_pool(self):
+        config = database_config(self.base_dir, env={
+            'IDP_DB_PROFILE': 'postgres', 'IDP_DB_POOL': '1', 'IDP_DB_POOL_MAX_SIZE': '8',
+        })
+
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 8)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            database_config(self.base_dir, env={'IDP_DB_PROFILE': 'oracle'})
+
+
+    def test_replica_is_optional(self):
+        self.assertIsNone(replica_config(self.base_dir, env={}))
+        self.assertIsNone(replica_config(self.base_dir, env={'IDP_DB_PROFILE': 'postgres'}))
+
+    def test_replica_follows_primary_profile(self):
+        sqlite = replica_config(self.base_dir, env={'IDP_SQLITE_REPLICA_PATH': '/tmp/replica.sqlite3'})
+        postgres = replica_config(self.base_dir, env={
+            'IDP_DB_PROFILE': 'postgres', 'POSTGRES_HOST': 'db', 'POSTGRES_REPLICA_HOST': 'db-replica',
+        })
+
+        self.assertEqual(sqlite['NAME'], '/tmp/replica.sqlite3')
+        self.assertEqual(sqlite['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertEqual(postgres['HOST'], 'db-replica')
+        self.assertEqual(postgres['TEST'], {'MIRROR': 'default'})
+
+
+@override_settings(IDP_SETTINGS={**settings.IDP_SETTINGS, 'READ_REPLICA_ALIAS': 'replica'})
+class ReplicaRoutingTestCase(SimpleTestCase):
+    """
+    읽기 복제본 라우팅 (idp_backend/routers.py)
+    QuerySet.db로 라우팅 결과만 확인 (쿼리 실행 없음)
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _dispatch(self, request, view):
+        """미들웨어를 거쳐 view 실행, (response, 라우팅된 alias 목록)"""
+        seen = []
+
+        def handler(request):
+            middleware.process_view(request, view, (), {})
+            return view(request, seen)
+
+        middleware = ReplicaRoutingMiddleware(handler)
+        return middleware(request), seen
+
+    @staticmethod
+    @read_from_replica
+    def history_view(request, seen):
+        seen.append(AuthTransaction.objects.all().db)
+        return HttpResponse()
+
+    @staticmethod
+    def api_view(request, seen):
+        seen.append(AuthTransaction.objects.all().db)
+        return HttpResponse()
+
+    def test_marked_view_reads_from_replica(self):
+        response, seen = self._dispatch(self.factory.get('/auth/history/'), self.history_view)
+
+        self.assertEqual(seen, ['replica'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_unmarked_view_stays_on_primary(self):
+        _, seen = self._dispatch(self.factory.get('/api/'), self.api_view)
+
+        self.assertEqual(seen, ['default'])
+
+    def test_write_pins_rest_of_request_and_sets_cookie(self):
+        @read_from_replica
+        def view(request, seen):
+            seen.append(AuthTransaction.objects.all().db)
+            seen.append(AuthTransaction.objects.select_for_update().db)  # db_for_write
+            seen.append(AuthTransaction.objects.all().db)
+            return HttpResponse()
+
+        response, seen = self._dispatch(self.factory.get('/auth/history/'), view)
+
+        self.assertEqual(seen, ['replica', 'default', 'default'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_post_and_pinned_client_stay_on_primary(self):
+        response, seen = self._dispatch(self.factory.post('/auth/history/'), self.history_view)
+        self.assertEqual(seen, ['default'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = self.factory.get('/auth/history/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        _, seen = self._dispatch(request, self.history_view)
+        self.assertEqual(seen, ['default'])
+
+    def test_sessions_stay_on_primary(self):
+        @read_from_replica
+        def view(request, seen):
+            seen.append(Session.objects.all().db)
+            return HttpResponse()
+
+        _, seen = self._dispatch(self.factory.get('/'), view)
+
+        self.assertEqual(seen, ['default'])
+
+    def test_outside_requests_use_primary(self):
+        self.assertEqual(AuthTransaction.objects.all().db, 'default')
+
+    def test_read_heavy_pages_opt_in(self):
+        for path in ('/auth/history/', '/dashboard/',
+                     '/admin/auth_transactions/authtransaction/', '/admin/audit_logs/auditlog/'):
+            with self.subTest(path=path):
+                self.assertTrue(getattr(resolve(path).func, 'use_read_replica', False))
+
+        self.assertFalse(getattr(resolve('/auth/pending/').func, 'use_read_replica', False))
+
+
+class SQLitePragmaTestCase(TestCase):
+    """connection_created 훅이 SQLite 연결마다 PRAGMA를 적용하는지 확인"""
+
+    def _pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        self.assertEqual(self._pragma('busy_timeout'), DEFAULT_SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self._pragma('cache_size'), DEFAULT_SQLITE_PRAGMAS['cache_size'])
+        self.assertEqual(self._pragma('synchronous'), 1)  # NORMAL
+
+
+class SQLiteWriteConcurrencyTestCase(SimpleTestCase):
+    """
+    파일 기반 SQLite에서 16개 스레드 동시 쓰기
+    - connection_created 훅이 WAL/busy_timeout 등 PRAGMA 적용
+    - BEGIN IMMEDIATE로 쓰기가 실패하지 않고 대기 후 처리
+    scripts/benchmark_sqlite_writes.py를 별도 프로세스로 실행 (테스트 DB는 메모리 DB)
+    """
+
+    def _run(self, *args):
+        result = subprocess.run(
+            [sys.executable, 'scripts/benchmark_sqlite_writes.py', '--json', *args],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_concurrent_writers_queue_instead_of_failing(self):
+        result = self._run('--threads', '16', '--writes', '25')
+
+        print(f"\nSQLite writes: {result['committed']} transactions from {result['threads']} threads "
+              f"in {result['seconds']}s ({result['tx_per_sec']} tx/sec)")
+        self.assertEqual(result['journal_mode'], 'wal')
+        self.assertEqual(result['errors'], 0, result['error_samples'])
+        self.assertEqual(result['committed'], result['attempted'])
+
+
+class MetricsTestCase(TestCase):
+    """
+    /metrics 레지스트리 테스트
+    - 스레드별 shard 기록 후 병합, 히스토그램 누적 버킷
+    - 워커 프로세스 스냅샷 파일 합산
+    - 엔드포인트: 뷰별 지연, 상태 전이, PENDING/outbox 게이지
+    """
+
+    def _sample(self, text, name, **labels):
+        pattern = re.escape(name) + r'\{([^}]*)\} (\S+)'
+        for label_text, value in re.findall(pattern, text):
+            pairs = dict(re.findall(r'(\w+)="([^"]*)"', label_text))
+            if all(pairs.get(key) == str(value) for key, value in labels.items()):
+                return float(value)
+        return 0.0
+
+    def test_threads_record_without_lock(self):
+        registry = metrics.Registry()
+        counter = metrics.Counter(registry, 'test_events_total', 'Events', ('kind',))
+        histogram = metrics.Histogram(registry, 'test_seconds', 'Latency', buckets=(0.1, 1.0))
+
+        def work():
+            for _ in range(1000):
+                counter.inc(kind='a')
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+
+        text = registry.render()
+        self.assertIn('test_events_total{kind="a"} 8000', text)
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('test_seconds_count 3', text)
+
+    def test_sums_other_worker_processes(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(IDP_SETTINGS={**settings.IDP_SETTINGS, 'METRICS_DIR': directory}):
+            before = self._sample(metrics.registry.render(), 'idp_transaction_transitions_total',
+                                  from_status='PENDING', to_status='COMPLETED')
+            for _ in range(2):
+                pid = os.fork()
+                if pid == 0:
+                    # Worker: starts with empty shards, writes its snapshot
+                    code = 1
+                    try:
+                        for _ in range(5):
+                            metrics.TRANSITIONS.inc(from_status='PENDING', to_status='COMPLETED')
+                        metrics.registry.flush()
+                        code = 0
+                    finally:
+                        os._exit(code)
+                self.assertEqual(os.waitpid(pid, 0)[1], 0)
+            metrics.TRANSITIONS.inc(from_status='PENDING', to_status='COMPLETED')
+
+            after = self._sample(metrics.registry.render(), 'idp_transaction_transitions_total',
+                                 from_status='PENDING', to_status='COMPLETED')
+
+        self.assertEqual(after - before, 11)
+
+    def test_endpoint(self):
+        user = User.objects.create_user(username='metrics_user', phone_number='010-4444-0000',
+                                        ci='ci-metrics', di='di-metrics')
+        sp = ServiceProvider.objects.create(
+            service_name='Metrics Service',
+            client_id='metrics_client',
+            client_secret=ServiceProvider.hash_secret('metrics_secret'),
+            callback_url='https://example.com/callback',
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            auth_tx = AuthTransaction.objects.create(
+                user=user, service_provider=sp, expires_at=timezone.now() + timedelta(minutes=3)
+            )
+        self.client.get(f'/api/v1/auth/api/status/{auth_tx.transaction_id}/')
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertGreaterEqual(self._sample(
+            text, 'idp_http_request_duration_seconds_count',
+            view='auth_api:api_auth_status', method='GET', status=200
+        ), 1)
+        self.assertGreaterEqual(self._sample(
+            text, 'idp_transaction_transitions_total', from_status='NEW', to_status='PENDING'
+        ), 1)
+        self.assertIn('idp_transactions_pending 1', text)
+        self.assertIn('idp_outbox_backlog{outbox="notifications"} 0', text)
+
+        with override_settings(IDP_SETTINGS={**settings.IDP_SETTINGS, 'METRICS_ALLOWED_IPS': ['10.0.0.1']}):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    def test_metrics_default_to_loopback(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='::1').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 403)
+        idp_settings = {**settings.IDP_SETTINGS}
+        del idp_settings['METRICS_ALLOWED_IPS']
+        with override_settings(IDP_SETTINGS=idp_settings):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 403)
+
+        with override_settings(IDP_SETTINGS={**settings.IDP_SETTINGS, 'METRICS_ALLOWED_IPS': ['10.0.5.0/24']}):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.5.20').status_code, 200)
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.6.20').status_code, 403)
+        with override_settings(IDP_SETTINGS={**settings.IDP_SETTINGS, 'METRICS_ALLOWED_IPS': ['*']}):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 200)
+
+
+class QueryProfilerTestCase(TestCase):
+    """
+    요청별 SQL 프로파일 테스트
+    - 값이 다른 같은 모양의 쿼리는 하나의 fingerprint (N+1 탐지)
+    - DEBUG: X-DB-* 헤더, 운영: JSON 로그 (예산 초과/N+1은 WARNING)
+    - 테스트 러너/RAISE=True: 예산 초과 요청은 QueryBudgetExceeded (DEBUG와 무관)
+    """
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'profiled{i}', phone_number=f'010-4545-000{i}',
+                                     ci=f'ci-profiled-{i}', di=f'di-profiled-{i}')
+            for i in range(3)
+        ]
+
+    def test_fingerprint_normalizes_values(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x''y' LIMIT 21"),
+            fingerprint('SELECT * FROM t WHERE id IN (%s) AND name = %s  LIMIT 5'),
+        )
+
+    def test_n_plus_one_is_one_fingerprint(self):
+        with profile_queries() as outer:
+            with profile_queries() as profile:
+                for user in self.users:
+                    User.objects.get(pk=user.pk)
+                list(User.objects.filter(pk__in=[user.pk for user in self.users]))
+
+        self.assertEqual(profile.count, 4)
+        self.assertEqual(outer.count, 4)
+        self.assertGreater(profile.seconds, 0)
+        [(sql, count)] = profile.duplicates()
+        self.assertEqual(count, 3)
+        self.assertIn('FROM "accounts_user" WHERE "accounts_user"."id" = ?', sql)
+
+    @override_settings(IDP_SETTINGS={**settings.IDP_SETTINGS, 'QUERY_PROFILER': {'HEADERS': True}})
+    def test_debug_headers(self):
+        response = self.client.get('/')
+
+        self.assertIn('X-DB-Query-Count', response)
+        self.assertIn('X-DB-Time-Ms', response)
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '0')
+
+    def test_structured_log_flags_over_budget(self):
+        auth_tx_id = '00000000-0000-0000-0000-000000000000'
+        with self.assertLogs('idp_backend.profiling', 'INFO') as logs:
+            self.client.get('/')
+            self.client.get(f'/api/v1/auth/api/status/{auth_tx_id}/')
+
+        first, second = (json.loads(record.getMessage()) for record in logs.records)
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual(first['view'], 'home')
+        self.assertEqual(second['view'], 'auth_api:api_auth_status')
+        self.assertEqual(second['budget'], 5)
+        self.assertFalse(second['over_budget'])
+        self.assertEqual(second['status'], 404)
+
+    def test_over_budget_request_raises_under_test_runner(self):
+        from auth_transactions import views
+
+        url = '/api/v1/auth/api/status/00000000-0000-0000-0000-000000000000/'
+        with mock.patch.object(views.auth_status, 'query_budget', 0):
+            with self.assertRaisesRegex(QueryBudgetExceeded, r'ran 1 queries, budget is 0'):
+                self.client.get(url)
+
+            # 테스트 러너 밖: 기본값과 DEBUG=True에서도 WARNING 로그만, RAISE=True일 때만 예외
+            enforced = profiling._enforced
+            profiling.enforce_budgets(None)
+            try:
+                with self.settings(DEBUG=True), self.assertLogs('idp_backend.profiling', 'WARNING'):
+                    self.assertEqual(self.client.get(url).status_code, 404)
+                with self.settings(IDP_SETTINGS={
+                    **settings.IDP_SETTINGS, 'QUERY_PROFILER': {'RAISE': True}
+                }), self.assertRaises(QueryBudgetExceeded):
+                    self.client.get(url)
+            finally:
+                profiling.enforce_budgets(enforced)
+
+
+@unittest.skipUnless(throwaway_postgres.available(), 'PostgreSQL server binaries not installed')
+class ThrowawayPostgresTestCase(SimpleTestCase):
+    """
+    실제 PostgreSQL에서 동시성 테스트 실행 (select_for_update가 실제로 잠금)
+    scripts/throwaway_postgres.py가 임시 클러스터를 띄우고 정리
+    """
+
+    def test_concurrency_suite_on_postgres(self):
+        with throwaway_postgres.throwaway_postgres() as env:
+            result = subprocess.run(
+                [sys.executable, 'manage.py', 'test', 'auth_transactions.tests.ConcurrencyTestCase',
+                 '--noinput'],
+                cwd=settings.BASE_DIR,
+                env={**os.environ, **env},
+                capture_output=True,
+                text=True,
+            )
+
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
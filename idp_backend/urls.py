@@ -8,10 +8,12 @@ MTV 패턴에 따른 URL 구조:
 - /auth/ : 인증 트랜잭션 (웹)
 - /api/v1/auth/ : 인증 API (REST)
 - /admin/ : 관리자 페이지
+- /metrics : Prometheus 메트릭 (idp_backend/metrics.py)
 """
 from django.contrib import admin
 from django.urls import path, include
 from accounts.views import HomeView, DashboardView
+from idp_backend.metrics import metrics_view
 
 urlpatterns = [
     # 웹 페이지
@@ -27,5 +29,8 @@ urlpatterns = [
     
     # 관리자
     path('admin/', admin.site.urls),
+    
+    # 모니터링
+    path('metrics', metrics_view, name='metrics'),
 ]
 
@@ -0,0 +1,346 @@
+"""
+Load-testing / latency benchmark for the three auth API endpoints
+
+Seeds N users, service providers and historical transactions, then drives
+auth_request -> auth_confirm -> auth_status at a fixed concurrency and
+reports p50/p95/p99 latency, throughput and queries-per-request per
+endpoint as JSON (diff the files between releases).
+
+Modes:
+- client (default): Django test client against a throwaway test database.
+  IDP_SETTINGS['RATE_LIMITS'] is disabled for the run (all flows come from
+  one client IP) unless --keep-rate-limits is given.
+- server: HTTP against a running server (--base-url); seeds the configured
+  database, so it requires --seed-configured-db. Query counts are not
+  available in this mode, and the server's own rate limits apply: start it
+  with RATE_LIMITS sized for the run or the report measures 429s.
+
+Usage:
+    python scripts/benchmark_auth_api.py --users 10000 --transactions 100000 \\
+        --flows 500 --concurrency 8 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'idp_backend.settings')
+
+import django
+django.setup()
+
+import bcrypt
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from accounts.models import User
+from accounts.utils import EncryptionUtil
+from auth_transactions.models import AuthTransaction
+from auth_transactions.ratelimit import rate_limiter
+from services.models import ServiceProvider
+
+
+ENDPOINTS = ('auth_request', 'auth_confirm', 'auth_status')
+API_PREFIX = '/api/v1/auth/api'
+PIN = '123456'
+CHUNK = 5000
+
+
+def phone_for(i):
+    return f'010-{(i // 10000) % 10000:04d}-{i % 10000:04d}'
+
+
+def seed(users, sps, transactions, bcrypt_rounds, encrypt_ci_di, log):
+    """Bulk-seed users/SPs/transactions; returns list of (client_id, secret)"""
+    pin_hash = bcrypt.hashpw(PIN.encode(), bcrypt.gensalt(rounds=bcrypt_rounds)).decode()
+    started = time.perf_counter()
+
+    for offset in range(0, users, CHUNK):
+        batch = []
+        for i in range(offset, min(offset + CHUNK, users)):
+            ci, di = f'CI-{uuid.uuid4()}', f'DI-{uuid.uuid4()}'
+            if encrypt_ci_di:
+                ci, di = EncryptionUtil.encrypt_field(ci), EncryptionUtil.encrypt_field(di)
+            batch.append(User(
+                username=f'bench_user_{i}',
+                phone_number=phone_for(i),
+                pin_code=pin_hash,
+                ci=ci,
+                di=di,
+            ))
+        User.objects.bulk_create(batch)
+    log(f'  users: {users} ({time.perf_counter() - started:.1f}s)')
+
+    credentials = []
+    sp_objs = []
+    for i in range(sps):
+        secret = ServiceProvider.hash_secret(f'bench_secret_{i}')
+        client_id = f'bench_client_{i}'
+        credentials.append((client_id, secret))
+        sp_objs.append(ServiceProvider(
+            service_name=f'Bench Service {i}',
+            client_id=client_id,
+            client_secret=secret,
+            callback_url=f'https://bench{i}.example.com/callback',
+        ))
+    ServiceProvider.objects.bulk_create(sp_objs)
+
+    user_ids = list(User.objects.filter(username__startswith='bench_user_').values_list('pk', flat=True))
+    sp_ids = list(ServiceProvider.objects.filter(client_id__startswith='bench_client_').values_list('pk', flat=True))
+    expires_at = timezone.now() + timedelta(minutes=3)
+    statuses = ['COMPLETED', 'COMPLETED', 'COMPLETED', 'FAILED', 'EXPIRED']
+    for offset in range(0, transactions, CHUNK):
+        AuthTransaction.objects.bulk_create([
+            AuthTransaction(
+                user_id=random.choice(user_ids),
+                service_provider_id=random.choice(sp_ids),
+                status=random.choice(statuses),
+                expires_at=expires_at,
+            )
+            for _ in range(offset, min(offset + CHUNK, transactions))
+        ])
+    log(f'  transactions: {transactions} ({time.perf_counter() - started:.1f}s total)')
+    return credentials
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class ClientDriver:
+    """Django test client; captures queries on the worker thread's connection"""
+    measures_queries = True
+
+    def __init__(self):
+        from django.test import Client
+        self._local = threading.local()
+        self._client_class = Client
+
+    def _client(self):
+        if not hasattr(self._local, 'client'):
+            # Server errors become 500 samples instead of aborting the run
+            self._local.client = self._client_class(raise_request_exception=False)
+        return self._local.client
+
+    def call(self, method, path, data=None, headers=None):
+        client = self._client()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            if method == 'POST':
+                response = client.post(path, data=json.dumps(data), content_type='application/json',
+                                       headers=headers or {})
+            else:
+                response = client.get(path, headers=headers or {})
+            elapsed = time.perf_counter() - started
+        body = json.loads(response.content) if response.content else {}
+        return response.status_code, body, elapsed, len(ctx.captured_queries)
+
+
+class ServerDriver:
+    """Plain HTTP against a running server"""
+    measures_queries = False
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def call(self, method, path, data=None, headers=None):
+        started = time.perf_counter()
+        response = self.session.request(method, self.base_url + path, json=data, headers=headers)
+        elapsed = time.perf_counter() - started
+        return response.status_code, response.json(), elapsed, None
+
+
+def run_flow(driver, credentials, users, samples, lock):
+    client_id, secret = random.choice(credentials)
+    sp_headers = {'X-Client-ID': client_id, 'X-Client-Secret': secret}
+    phone = phone_for(random.randrange(users))
+    results = []
+
+    def call(endpoint, *args, **kwargs):
+        code, body, elapsed, queries = driver.call(*args, **kwargs)
+        # (start, end) of the call, for the endpoint's busy time in summarize()
+        finished = time.perf_counter()
+        results.append((endpoint, code, elapsed, queries, (finished - elapsed, finished)))
+        return body
+
+    body = call('auth_request', 'POST', f'{API_PREFIX}/request/', {'user_phone_number': phone}, sp_headers)
+    transaction_id = body.get('transaction_id')
+
+    if transaction_id:
+        call('auth_confirm', 'POST', f'{API_PREFIX}/confirm/',
+             {'transaction_id': transaction_id, 'pin_code': PIN})
+        call('auth_status', 'GET', f'{API_PREFIX}/status/{transaction_id}/', headers=sp_headers)
+
+    with lock:
+        for endpoint, *sample in results:
+            samples[endpoint].append(tuple(sample))
+
+
+def busy_seconds(spans):
+    """Time during which at least one of the (start, end) spans was in flight"""
+    total = 0.0
+    current_start = current_end = None
+    for start, end in sorted(spans):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def summarize(samples):
+    """
+    Per-endpoint statistics
+    throughput_rps is the endpoint's requests divided by its own busy time
+    (while at least one of its requests was in flight), not by the run's
+    wall time, which is shared by all three endpoints.
+    """
+    report = {}
+    for endpoint in ENDPOINTS:
+        rows = samples[endpoint]
+        latencies = sorted(elapsed * 1000 for _, elapsed, _, _ in rows)
+        queries = [q for _, _, q, _ in rows if q is not None]
+        busy = busy_seconds([span for _, _, _, span in rows])
+        report[endpoint] = {
+            'count': len(rows),
+            'errors': sum(1 for code, _, _, _ in rows if code != 200),
+            'status_codes': dict(sorted(Counter(str(code) for code, _, _, _ in rows).items())),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'mean_ms': sum(latencies) / len(latencies) if latencies else None,
+            'max_ms': latencies[-1] if latencies else None,
+            'busy_seconds': busy,
+            'throughput_rps': len(rows) / busy if busy else None,
+            'queries_per_request': sum(queries) / len(queries) if queries else None,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--sps', type=int, default=10)
+    parser.add_argument('--transactions', type=int, default=10000, help='Historical rows seeded before the run')
+    parser.add_argument('--flows', type=int, default=200, help='request -> confirm -> status flows to drive')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=10, help='Flows run (and discarded) before measuring')
+    parser.add_argument('--bcrypt-rounds', type=int, default=12, help='Cost of the seeded PIN hash (set_pin uses 12)')
+    parser.add_argument('--encrypt-ci-di', action='store_true', help='Fernet-encrypt seeded CI/DI (slow at 10M)')
+    parser.add_argument('--test-db-name', default=None,
+                        help='Name/file of the throwaway DB (SQLite default: a temp file)')
+    parser.add_argument('--base-url', default=None, help='Drive a running server instead of the test client')
+    parser.add_argument('--seed-configured-db', action='store_true',
+                        help='Required with --base-url: seed the database from settings')
+    parser.add_argument('--keep-rate-limits', action='store_true',
+                        help='Client mode: leave IDP_SETTINGS[RATE_LIMITS] on (measures the limiter)')
+    parser.add_argument('--seed', type=int, default=1234, help='Random seed')
+    parser.add_argument('--output', default='-', help='JSON output path (- for stdout)')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    old_db_name = None
+    if args.base_url:
+        if not args.seed_configured_db:
+            parser.error('--base-url seeds the configured database; pass --seed-configured-db to confirm')
+        driver = ServerDriver(args.base_url)
+        log('Server mode: the server\'s RATE_LIMITS apply; check status_codes for 429s')
+    else:
+        if not args.keep_rate_limits:
+            settings.IDP_SETTINGS = {**settings.IDP_SETTINGS, 'RATE_LIMITS': {}}
+            rate_limiter.reset()
+        setup_test_environment()
+        test_db_name = args.test_db_name
+        if test_db_name is None and connection.vendor == 'sqlite':
+            # Shared-cache in-memory SQLite fails concurrent writers with
+            # "table is locked" instead of waiting, so use a real file
+            test_db_name = os.path.join(tempfile.mkdtemp(prefix='idp-bench-'), 'bench.sqlite3')
+        if test_db_name:
+            settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = test_db_name
+        old_db_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        driver = ClientDriver()
+
+    try:
+        log(f'Seeding ({connection.vendor})...')
+        credentials = seed(args.users, args.sps, args.transactions,
+                           args.bcrypt_rounds, args.encrypt_ci_di, log)
+
+        lock = threading.Lock()
+        warmup = {endpoint: [] for endpoint in ENDPOINTS}
+        for _ in range(args.warmup):
+            run_flow(driver, credentials, args.users, warmup, lock)
+
+        samples = {endpoint: [] for endpoint in ENDPOINTS}
+        log(f'Running {args.flows} flows at concurrency {args.concurrency}...')
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [
+                pool.submit(run_flow, driver, credentials, args.users, samples, lock)
+                for _ in range(args.flows)
+            ]
+            for future in futures:
+                future.result()
+        wall_seconds = time.perf_counter() - started
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'mode': 'server' if args.base_url else 'client',
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'users': args.users,
+                'service_providers': args.sps,
+                'seeded_transactions': args.transactions,
+                'flows': args.flows,
+                'concurrency': args.concurrency,
+                'bcrypt_rounds': args.bcrypt_rounds,
+                'rate_limits': bool(args.base_url or args.keep_rate_limits),
+            },
+            'wall_seconds': wall_seconds,
+            'flows_per_second': args.flows / wall_seconds if wall_seconds else None,
+            'endpoints': summarize(samples),
+        }
+    finally:
+        if old_db_name is not None:
+            connection.creation.destroy_test_db(old_db_name, verbosity=0)
+            teardown_test_environment()
+
+    output = json.dumps(report, indent=2)
+    if args.output == '-':
+        print(output)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        log(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare the auth flow across database profiles
+
+Runs scripts/benchmark_auth_api.py once per profile (see idp_backend/db.py)
+in a subprocess and prints p50/p95 latency, throughput and errors side by
+side. Rate limits are off in those runs (see benchmark_auth_api.py). The postgres profile uses the POSTGRES_* environment, or a disposable
+cluster with --throwaway-postgres.
+
+Usage:
+    python scripts/benchmark_db_profiles.py --profiles sqlite postgres --throwaway-postgres \\
+        -- --users 2000 --transactions 20000 --flows 300 --concurrency 8
+"""
+import argparse
+from contextlib import nullcontext
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from throwaway_postgres import throwaway_postgres
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_ENV = {
+    'sqlite': {'IDP_DB_PROFILE': 'sqlite'},
+    'postgres': {'IDP_DB_PROFILE': 'postgres'},
+    'postgres-pool': {'IDP_DB_PROFILE': 'postgres', 'IDP_DB_POOL': '1'},
+}
+
+
+def run_profile(profile, extra_env, bench_args):
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        output = f.name
+    try:
+        env = {**os.environ, **extra_env, **PROFILE_ENV[profile]}
+        subprocess.run(
+            [sys.executable, os.path.join(SCRIPT_DIR, 'benchmark_auth_api.py'), '--output', output, *bench_args],
+            env=env, check=True
+        )
+        with open(output) as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=['sqlite', 'postgres'], choices=sorted(PROFILE_ENV))
+    parser.add_argument('--throwaway-postgres', action='store_true',
+                        help='Start a disposable PostgreSQL cluster for the postgres profiles')
+    parser.add_argument('--output', default=None, help='Also write all reports as JSON')
+    parser.add_argument('bench_args', nargs=argparse.REMAINDER, help='Arguments for benchmark_auth_api.py (after --)')
+    args = parser.parse_args()
+    bench_args = args.bench_args[1:] if args.bench_args[:1] == ['--'] else args.bench_args
+
+    needs_postgres = any(profile.startswith('postgres') for profile in args.profiles)
+    reports = {}
+    with (throwaway_postgres() if args.throwaway_postgres and needs_postgres else nullcontext({})) as pg_env:
+        for profile in args.profiles:
+            print(f'== {profile}', file=sys.stderr)
+            reports[profile] = run_profile(profile, pg_env if profile.startswith('postgres') else {}, bench_args)
+
+    print(f'{"profile":<15}{"endpoint":<14}{"p50 ms":>9}{"p95 ms":>9}{"rps":>9}{"errors":>8}')
+    for profile, report in reports.items():
+        for endpoint, stats in report['endpoints'].items():
+            p50 = stats['p50_ms'] or 0
+            p95 = stats['p95_ms'] or 0
+            rps = stats['throughput_rps'] or 0
+            print(f'{profile:<15}{endpoint:<14}{p50:>9.1f}{p95:>9.1f}{rps:>9.1f}{stats["errors"]:>8}')
+        print(f'{profile:<15}{"flows/sec":<14}{report["flows_per_second"]:>36.1f}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark: per-call cost of CI/DI and AES-GCM helpers
+
+Compares the previous behaviour (derive the key and construct a new
+Fernet/AESGCM on every call) with the memoized KeyRing ciphers used by
+EncryptionUtil.
+
+Usage:
+    python scripts/benchmark_encryption.py --iterations 20000
+"""
+import argparse
+import base64
+import os
+import sys
+import timeit
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'idp_backend.settings')
+
+import django
+django.setup()
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from django.conf import settings
+
+from accounts.utils import EncryptionUtil
+
+
+PLAINTEXT = 'CI-0123456789abcdef0123456789abcdef'
+AES_KEY = 'benchmark-service-provider-secret-key'
+
+
+def legacy_encrypt_field(plaintext):
+    key = base64.urlsafe_b64encode(settings.SECRET_KEY.encode()[:32])
+    return Fernet(key).encrypt(plaintext.encode()).decode()
+
+
+def legacy_decrypt_field(token):
+    key = base64.urlsafe_b64encode(settings.SECRET_KEY.encode()[:32])
+    return Fernet(key).decrypt(token.encode()).decode()
+
+
+def legacy_encrypt_aes_gcm(plaintext, key):
+    nonce = os.urandom(12)
+    ciphertext = AESGCM(key.encode()[:32]).encrypt(nonce, plaintext.encode(), None)
+    return base64.b64encode(nonce + ciphertext).decode()
+
+
+def legacy_decrypt_aes_gcm(token, key):
+    combined = base64.b64decode(token.encode())
+    return AESGCM(key.encode()[:32]).decrypt(combined[:12], combined[12:], None).decode()
+
+
+def per_call_us(func, iterations, repeat):
+    best = min(timeit.repeat(func, number=iterations, repeat=repeat))
+    return best / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    field_token = EncryptionUtil.encrypt_field(PLAINTEXT)
+    aes_token = EncryptionUtil.encrypt_with_aes_gcm(PLAINTEXT, AES_KEY)
+    cases = [
+        ('encrypt_field', lambda: legacy_encrypt_field(PLAINTEXT),
+         lambda: EncryptionUtil.encrypt_field(PLAINTEXT)),
+        ('decrypt_field', lambda: legacy_decrypt_field(field_token),
+         lambda: EncryptionUtil.decrypt_field(field_token)),
+        ('encrypt_with_aes_gcm', lambda: legacy_encrypt_aes_gcm(PLAINTEXT, AES_KEY),
+         lambda: EncryptionUtil.encrypt_with_aes_gcm(PLAINTEXT, AES_KEY)),
+        ('decrypt_with_aes_gcm', lambda: legacy_decrypt_aes_gcm(aes_token, AES_KEY),
+         lambda: EncryptionUtil.decrypt_with_aes_gcm(aes_token, AES_KEY)),
+    ]
+
+    print(f'{"operation":<24}{"before (us)":>14}{"after (us)":>14}{"speedup":>10}')
+    for name, before, after in cases:
+        before_us = per_call_us(before, args.iterations, args.repeat)
+        after_us = per_call_us(after, args.iterations, args.repeat)
+        print(f'{name:<24}{before_us:>14.2f}{after_us:>14.2f}{before_us / after_us:>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
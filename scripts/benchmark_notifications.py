@@ -0,0 +1,97 @@
+"""
+Push notification dispatcher throughput
+
+Migrates a throwaway SQLite database, queues N PENDING NotificationLog rows
+and drains them with NotificationDispatcher through FakePushProvider, whose
+latency stands in for the push provider round trip. Compare worker counts to
+see how much concurrency hides provider latency.
+
+Usage:
+    python scripts/benchmark_notifications.py --notifications 2000 --latency 0.05 --workers 1 16 64
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--notifications', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.05, help='Fake provider seconds per send')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 16, 64])
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='idp-notify-bench-')
+    os.environ.update({
+        'DJANGO_SETTINGS_MODULE': 'idp_backend.settings',
+        'IDP_DB_PROFILE': 'sqlite',
+        'IDP_SQLITE_PATH': os.path.join(workdir, 'bench.sqlite3'),
+    })
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connection
+
+    from accounts.models import User
+    from auth_transactions.models import NotificationLog
+    from auth_transactions.notifications import FakePushProvider, NotificationDispatcher
+
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user(username='bench', phone_number='010-0000-0000', ci='ci-bench', di='di-bench')
+
+    results = []
+    for workers in args.workers:
+        NotificationLog.objects.all().delete()
+        NotificationLog.objects.bulk_create([
+            NotificationLog(user=user, notification_type='AUTH_REQUEST', message=f'bench {i}')
+            for i in range(args.notifications)
+        ], batch_size=500)
+
+        provider = FakePushProvider(latency=args.latency, failure_rate=args.failure_rate, seed=1)
+        dispatcher = NotificationDispatcher(
+            provider=provider, max_workers=workers, batch_size=args.batch_size, max_attempts=1
+        )
+        totals = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+        started = time.perf_counter()
+        while True:
+            counts = dispatcher.run_once()
+            if counts['claimed'] == 0:
+                break
+            for key in totals:
+                totals[key] += counts[key]
+        elapsed = time.perf_counter() - started
+        dispatcher.close()
+
+        results.append({
+            'workers': workers,
+            **totals,
+            'seconds': round(elapsed, 3),
+            'per_sec': round(totals['claimed'] / elapsed, 1) if elapsed else None,
+            'pending_left': NotificationLog.objects.filter(status='PENDING').count(),
+        })
+
+    connection.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(f'{args.notifications} notifications, provider latency {args.latency * 1000:.0f} ms')
+    print(f"{'workers':>8} {'sent':>6} {'failed':>6} {'seconds':>8} {'per_sec':>9}")
+    for row in results:
+        print(f"{row['workers']:>8} {row['sent']:>6} {row['failed']:>6} {row['seconds']:>8} {row['per_sec']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Sustained SQLite write throughput under concurrent writers
+
+Creates a throwaway SQLite file configured like the sqlite profile
+(idp_backend/db.py: connection_created pragmas + BEGIN IMMEDIATE) and has N
+threads run read-then-write transactions against it, the pattern that
+made concurrent auth_request calls fail with "database is locked".
+
+Usage:
+    python scripts/benchmark_sqlite_writes.py --threads 16 --writes 50
+    python scripts/benchmark_sqlite_writes.py --transaction-mode DEFERRED   # previous behaviour
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--writes', type=int, default=50, help='Transactions per thread')
+    parser.add_argument('--transaction-mode', default='IMMEDIATE', choices=['IMMEDIATE', 'DEFERRED', 'EXCLUSIVE'])
+    parser.add_argument('--json', action='store_true', help='Print the result as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='idp-sqlite-bench-')
+    os.environ.update({
+        'DJANGO_SETTINGS_MODULE': 'idp_backend.settings',
+        'IDP_DB_PROFILE': 'sqlite',
+        'IDP_SQLITE_PATH': os.path.join(workdir, 'bench.sqlite3'),
+        'IDP_SQLITE_TRANSACTION_MODE': args.transaction_mode,
+    })
+
+    import django
+    django.setup()
+    from django.db import connection, connections, transaction
+
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE TABLE ledger (id INTEGER PRIMARY KEY, thread INTEGER, seq INTEGER, payload TEXT)')
+        cursor.execute('PRAGMA journal_mode')
+        journal_mode = cursor.fetchone()[0]
+
+    errors = []
+
+    def writer(thread_no):
+        try:
+            for _ in range(args.writes):
+                try:
+                    with transaction.atomic():
+                        with connection.cursor() as cursor:
+                            cursor.execute('SELECT COUNT(*) FROM ledger WHERE thread = %s', [thread_no])
+                            seq = cursor.fetchone()[0]
+                            cursor.execute(
+                                'INSERT INTO ledger (thread, seq, payload) VALUES (%s, %s, %s)',
+                                [thread_no, seq, 'x' * 200]
+                            )
+                except Exception as e:
+                    errors.append(str(e))
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM ledger')
+        rows = cursor.fetchone()[0]
+    connection.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        'threads': args.threads,
+        'attempted': args.threads * args.writes,
+        'committed': rows,
+        'errors': len(errors),
+        'error_samples': sorted(set(errors))[:3],
+        'seconds': round(elapsed, 3),
+        'tx_per_sec': round(rows / elapsed, 1) if elapsed else None,
+        'journal_mode': journal_mode,
+        'transaction_mode': args.transaction_mode,
+    }
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for key, value in result.items():
+            print(f'{key:>18}: {value}')
+
+
+if __name__ == '__main__':
+    main()
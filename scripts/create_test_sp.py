@@ -11,7 +11,6 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'idp_backend.settings')
 django.setup()
 
 from services.models import ServiceProvider, EncryptionKey
-from cryptography.fernet import Fernet
 
 def create_test_sp():
     # Check if test SP exists
@@ -38,15 +37,8 @@ def create_test_sp():
         is_active=True
     )
     
-    # Create encryption key
-    key = Fernet.generate_key()
-    EncryptionKey.objects.create(
-        service_provider=sp,
-        key_name='primary',
-        key_value=key.decode(),
-        algorithm='AES-256-GCM',
-        is_active=True
-    )
+    # Create encryption key (stored wrapped; the raw key is shown once)
+    _, raw_key = EncryptionKey.generate(sp, 'primary')
     
     print("=" * 60)
     print("Test Service Provider Created Successfully!")
@@ -55,6 +47,7 @@ def create_test_sp():
     print(f"Client ID: {sp.client_id}")
     print(f"Client Secret (RAW): {client_secret_raw}")
     print(f"Callback URL: {sp.callback_url}")
+    print(f"Encryption Key (AES-256-GCM, base64): {raw_key}")
     print("=" * 60)
     print("\nUse these credentials for API testing:")
     print(f'  -H "X-Client-ID: {sp.client_id}"')
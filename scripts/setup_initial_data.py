@@ -195,21 +195,13 @@ def create_service_providers():
             is_active=True
         )
         
-        # Create encryption key for SP
-        from cryptography.fernet import Fernet
-        key = Fernet.generate_key()
-        
-        EncryptionKey.objects.create(
-            service_provider=sp,
-            key_name='primary',
-            key_value=key.decode(),
-            algorithm='AES-256-GCM',
-            is_active=True
-        )
+        # Create encryption key for SP (stored wrapped; the raw key is shown once)
+        _, raw_key = EncryptionKey.generate(sp, 'primary')
         
         print(f"✓ Created service provider: {sp.service_name}")
         print(f"  Client ID: {sp.client_id}")
         print(f"  Client Secret (save this!): {client_secret_raw}")
+        print(f"  Encryption Key (save this!): {raw_key}")
 
 
 def main():
@@ -0,0 +1,54 @@
+"""
+Local stand-in for streaming replication between two SQLite files
+
+Copies the primary database (IDP_SQLITE_PATH or db.sqlite3) into the replica
+file (IDP_SQLITE_REPLICA_PATH) with the sqlite3 online backup API, once or
+every --interval seconds, so replica routing can be tried locally with a
+visible replication lag.
+
+Usage:
+    export IDP_SQLITE_REPLICA_PATH=/tmp/idp-replica.sqlite3
+    python scripts/sync_sqlite_replica.py                  # one snapshot
+    python scripts/sync_sqlite_replica.py --interval 3     # lag of up to ~3s
+    python manage.py runserver
+"""
+import argparse
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def sync(primary, replica):
+    source = sqlite3.connect(primary)
+    target = sqlite3.connect(replica)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--primary', default=os.environ.get('IDP_SQLITE_PATH') or str(BASE_DIR / 'db.sqlite3'))
+    parser.add_argument('--replica', default=os.environ.get('IDP_SQLITE_REPLICA_PATH'))
+    parser.add_argument('--interval', type=float, default=None, help='Keep syncing every N seconds')
+    args = parser.parse_args()
+
+    if not args.replica:
+        parser.error('set IDP_SQLITE_REPLICA_PATH or pass --replica')
+
+    while True:
+        started = time.perf_counter()
+        sync(args.primary, args.replica)
+        print(f'{args.primary} -> {args.replica} ({(time.perf_counter() - started) * 1000:.1f} ms)')
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
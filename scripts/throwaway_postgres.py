@@ -0,0 +1,84 @@
+"""
+Start a disposable PostgreSQL cluster, run a command against it, tear it down
+
+The cluster lives in a temp directory, listens only on a Unix socket inside
+it and uses trust auth; nothing outside the directory is touched. Needs the
+PostgreSQL server binaries (initdb, pg_ctl, createdb) on PATH or in PG_BIN.
+
+Usage:
+    python scripts/throwaway_postgres.py -- python manage.py test
+    python scripts/throwaway_postgres.py -- python scripts/benchmark_auth_api.py --flows 200
+"""
+import argparse
+from contextlib import contextmanager
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+
+def find_binary(name):
+    pg_bin = os.environ.get('PG_BIN')
+    if pg_bin and os.path.exists(os.path.join(pg_bin, name)):
+        return os.path.join(pg_bin, name)
+    return shutil.which(name)
+
+
+def available():
+    return all(find_binary(name) for name in ('initdb', 'pg_ctl', 'createdb'))
+
+
+@contextmanager
+def throwaway_postgres(db_name='idp_backend', user='idp', port=54329):
+    """Yield the environment variables that point IDP_DB_PROFILE=postgres at a fresh cluster"""
+    if not available():
+        raise RuntimeError('PostgreSQL server binaries not found (set PG_BIN or add them to PATH)')
+
+    workdir = tempfile.mkdtemp(prefix='idp-pg-')
+    data_dir = os.path.join(workdir, 'data')
+    quiet = {'stdout': subprocess.DEVNULL, 'stderr': subprocess.STDOUT}
+    subprocess.run(
+        [find_binary('initdb'), '-D', data_dir, '-U', user, '--auth=trust', '-E', 'UTF8'],
+        check=True, **quiet
+    )
+    options = f"-p {port} -k {workdir} -c listen_addresses='' -c fsync=off"
+    subprocess.run(
+        [find_binary('pg_ctl'), '-D', data_dir, '-o', options, '-l', os.path.join(workdir, 'server.log'),
+         '-w', 'start'],
+        check=True, **quiet
+    )
+    try:
+        subprocess.run(
+            [find_binary('createdb'), '-h', workdir, '-p', str(port), '-U', user, db_name],
+            check=True, **quiet
+        )
+        yield {
+            'IDP_DB_PROFILE': 'postgres',
+            'POSTGRES_DB': db_name,
+            'POSTGRES_USER': user,
+            'POSTGRES_PASSWORD': '',
+            'POSTGRES_HOST': workdir,
+            'POSTGRES_PORT': str(port),
+        }
+    finally:
+        subprocess.run([find_binary('pg_ctl'), '-D', data_dir, '-m', 'immediate', 'stop'], **quiet)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=54329)
+    parser.add_argument('command', nargs=argparse.REMAINDER, help='Command to run (after --)')
+    args = parser.parse_args()
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    if not command:
+        parser.error('no command given')
+
+    with throwaway_postgres(port=args.port) as env:
+        result = subprocess.run(command, env={**os.environ, **env})
+    sys.exit(result.returncode)
+
+
+if __name__ == '__main__':
+    main()
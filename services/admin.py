@@ -2,7 +2,7 @@
 Admin configuration for services app
 """
 from django.contrib import admin
-from .models import ServiceProvider, EncryptionKey, ServiceProviderStatistics
+from .models import ServiceProvider, EncryptionKey, ServiceProviderStatistics, AggregationWatermark
 
 
 @admin.register(ServiceProvider)
@@ -94,3 +94,14 @@ class ServiceProviderStatisticsAdmin(admin.ModelAdmin):
         """Prevent deletion of statistics"""
         return False
 
+
+@admin.register(AggregationWatermark)
+class AggregationWatermarkAdmin(admin.ModelAdmin):
+    """AggregationWatermark admin configuration (Read-only)"""
+    
+    list_display = ('name', 'value', 'updated_at')
+    readonly_fields = ('name', 'value', 'updated_at')
+    
+    def has_add_permission(self, request):
+        """Watermarks are advanced by the aggregation jobs"""
+        return False
@@ -0,0 +1,218 @@
+"""
+In-process caches for ServiceProvider lookups
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+import hmac
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+class KeyUnavailable(Exception):
+    """A service provider has active keys but none of them can be used"""
+
+
+class TTLCache:
+    """
+    Bounded, thread-safe LRU cache with per-entry time-to-live
+    - Oldest entries are evicted once max_size is reached
+    - Expired entries are dropped lazily on access
+    """
+
+    def __init__(self, max_size=256, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return a live entry, or default if missing/expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store an entry, evicting the least recently used one if full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove an entry if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+@dataclass(frozen=True)
+class ServiceProviderCredential:
+    """Snapshot of the ServiceProvider columns needed to authenticate a request"""
+    pk: int
+    client_id: str
+    client_secret: str
+    service_name: str
+    is_active: bool
+
+    def check_secret(self, raw_secret):
+        """Verify client secret (same semantics as ServiceProvider.check_secret)"""
+        return hmac.compare_digest(
+            self.client_secret.encode(),
+            (raw_secret or '').encode()
+        )
+
+
+class ServiceProviderCredentialCache:
+    """
+    Credential cache keyed by client_id
+
+    Entries are invalidated by post_save/post_delete on ServiceProvider
+    (see services/signals.py). Other worker processes only see a change
+    once their own entry expires, so the TTL bounds cross-process staleness.
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        idp_settings = getattr(settings, 'IDP_SETTINGS', {})
+        self._cache = TTLCache(
+            max_size=max_size or idp_settings.get('SP_CREDENTIAL_CACHE_SIZE', 256),
+            ttl=ttl or idp_settings.get('SP_CREDENTIAL_CACHE_TTL_SECONDS', 300),
+        )
+
+    def get(self, client_id):
+        """
+        Return the credential for client_id, loading it on a cache miss
+        Returns None if no ServiceProvider has this client_id
+        """
+        credential = self._cache.get(client_id)
+        if credential is not None:
+            return credential
+
+        from .models import ServiceProvider
+        row = ServiceProvider.objects.filter(client_id=client_id).values(
+            'pk', 'client_id', 'client_secret', 'service_name', 'is_active'
+        ).first()
+        if row is None:
+            return None
+
+        credential = ServiceProviderCredential(**row)
+        self._cache.set(client_id, credential)
+        return credential
+
+    def invalidate(self, client_id):
+        """Drop the cached credential for client_id"""
+        self._cache.delete(client_id)
+
+    def clear(self):
+        """Drop all cached credentials"""
+        self._cache.clear()
+
+
+credential_cache = ServiceProviderCredentialCache()
+
+
+@dataclass(frozen=True)
+class ServiceProviderKey:
+    """Unwrapped EncryptionKey ready for AES-GCM (key is None if it failed to unwrap)"""
+    key_name: str
+    algorithm: str
+    key: bytes
+    expires_at: object = None
+
+    def is_usable(self, now):
+        return self.key is not None and (self.expires_at is None or self.expires_at > now)
+
+
+class ServiceProviderKeyCache:
+    """
+    Active EncryptionKey rows per service provider, unwrapped once
+
+    Keyed by service_provider_id; SPs without keys are cached as an empty
+    tuple so they do not cost a query either. Entries are invalidated by
+    post_save/post_delete on EncryptionKey (see services/signals.py). Keys
+    that fail to unwrap are logged and kept with key=None, so an SP whose
+    keys are all broken is told apart from an SP without keys.
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        idp_settings = getattr(settings, 'IDP_SETTINGS', {})
+        self._cache = TTLCache(
+            max_size=max_size or idp_settings.get('SP_KEY_CACHE_SIZE', 256),
+            ttl=ttl or idp_settings.get('SP_KEY_CACHE_TTL_SECONDS', 300),
+        )
+
+    def get_keys(self, service_provider_id):
+        """Active keys for service_provider_id, newest first"""
+        keys = self._cache.get(service_provider_id)
+        if keys is not None:
+            return keys
+
+        from .models import EncryptionKey
+        rows = EncryptionKey.objects.filter(
+            service_provider_id=service_provider_id, is_active=True
+        ).order_by('-created_at').values('key_name', 'algorithm', 'key_value', 'expires_at')
+        keys = []
+        for row in rows:
+            try:
+                key = EncryptionKey.unwrap(row['key_value'])
+            except Exception:
+                # e.g. a raw key written before 0003_wrap_raw_encryption_keys
+                logger.exception(
+                    'EncryptionKey %r of service provider %s cannot be unwrapped',
+                    row['key_name'], service_provider_id
+                )
+                key = None
+            keys.append(ServiceProviderKey(
+                key_name=row['key_name'],
+                algorithm=row['algorithm'],
+                key=key,
+                expires_at=row['expires_at'],
+            ))
+        keys = tuple(keys)
+        self._cache.set(service_provider_id, keys)
+        return keys
+
+    def get_active_key(self, service_provider_id):
+        """
+        Newest usable key, or None if the SP has no active keys
+        Raises KeyUnavailable when it has keys but all are broken or expired.
+        """
+        now = timezone.now()
+        keys = self.get_keys(service_provider_id)
+        for key in keys:
+            if key.is_usable(now):
+                return key
+        if keys:
+            raise KeyUnavailable(f'No usable encryption key for service provider {service_provider_id}')
+        return None
+
+    def invalidate(self, service_provider_id):
+        self._cache.delete(service_provider_id)
+
+    def clear(self):
+        self._cache.clear()
+
+
+key_cache = ServiceProviderKeyCache()
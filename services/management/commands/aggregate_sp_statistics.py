@@ -0,0 +1,64 @@
+"""
+Roll AuthTransaction rows up into ServiceProviderStatistics
+
+Usage:
+    python manage.py aggregate_sp_statistics
+    python manage.py aggregate_sp_statistics --loop --interval 60
+    python manage.py aggregate_sp_statistics --backfill-from 2025-01-01 --backfill-to 2025-03-31
+"""
+from datetime import date
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from services.statistics import backfill, run_incremental
+
+
+class Command(BaseCommand):
+    help = 'Update per-(SP, date) statistics incrementally or backfill a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill-from', type=date.fromisoformat, default=None,
+                            help='Recompute every day from this date (YYYY-MM-DD)')
+        parser.add_argument('--backfill-to', type=date.fromisoformat, default=None,
+                            help='Last day to recompute (default: today)')
+        parser.add_argument('--chunk-days', type=int, default=7, help='Days per backfill chunk')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='(SP, date) buckets per incremental query')
+        parser.add_argument('--loop', action='store_true', help='Run incremental updates as a daemon loop')
+        parser.add_argument('--interval', type=float, default=60.0, help='Sleep between runs in --loop mode (seconds)')
+
+    def handle(self, *args, **options):
+        if options['backfill_from'] is not None:
+            self._backfill(options)
+            return
+
+        try:
+            while True:
+                started = time.perf_counter()
+                buckets, watermark = run_incremental(chunk_size=options['chunk_size'])
+                if buckets or not options['loop']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Recomputed {buckets} (SP, date) buckets in '
+                        f'{(time.perf_counter() - started) * 1000:.1f} ms (watermark {watermark.isoformat()})'
+                    ))
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def _backfill(self, options):
+        start = options['backfill_from']
+        end = options['backfill_to'] or timezone.localdate()
+        if end < start:
+            raise CommandError('--backfill-to must not be before --backfill-from')
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+
+        def on_chunk(chunk_start, chunk_end, rows):
+            self.stdout.write(f'  {chunk_start} .. {chunk_end}: {rows} rows')
+
+        written = backfill(start, end, chunk_days=options['chunk_days'], on_chunk=on_chunk)
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {written} statistics rows ({start} .. {end})'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AggregationWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('value', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Aggregation Watermark',
+                'verbose_name_plural': 'Aggregation Watermarks',
+                'db_table': 'services_aggregationwatermark',
+            },
+        ),
+    ]
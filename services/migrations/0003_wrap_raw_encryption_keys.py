@@ -0,0 +1,54 @@
+import base64
+import binascii
+
+from cryptography.fernet import InvalidToken
+from django.db import migrations
+
+
+AES_KEY_SIZES = (16, 24, 32)
+
+
+def _raw_key_bytes(key_value):
+    """Key bytes of an unwrapped key_value (Fernet urlsafe or plain base64), or None"""
+    for decode in (base64.urlsafe_b64decode, base64.b64decode):
+        try:
+            raw = decode(key_value.encode())
+        except (binascii.Error, ValueError):
+            continue
+        if len(raw) in AES_KEY_SIZES:
+            return raw
+    return None
+
+
+def wrap_raw_keys(apps, schema_editor):
+    """
+    Wrap key_values stored in the clear (scripts/create_test_sp.py and
+    setup_initial_data.py used to write Fernet.generate_key() as is) the way
+    EncryptionKey.generate() does; the key bytes handed to the SP are kept
+    """
+    from accounts.utils import EncryptionUtil
+
+    EncryptionKey = apps.get_model('services', 'EncryptionKey')
+    for key in EncryptionKey.objects.only('pk', 'key_value').iterator():
+        try:
+            EncryptionUtil.decrypt_field(key.key_value)
+            continue  # already wrapped
+        except (InvalidToken, ValueError):
+            pass
+        raw = _raw_key_bytes(key.key_value)
+        if raw is None:
+            continue  # not a key we recognise; auth_status logs and skips it
+        EncryptionKey.objects.filter(pk=key.pk).update(
+            key_value=EncryptionUtil.encrypt_field(base64.b64encode(raw).decode())
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_aggregationwatermark'),
+    ]
+
+    operations = [
+        migrations.RunPython(wrap_raw_keys, migrations.RunPython.noop),
+    ]
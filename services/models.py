@@ -3,6 +3,7 @@ ServiceProvider and related models for IdP Backend System
 """
 from django.db import models
 from django.core.validators import URLValidator
+import base64
 import secrets
 import hashlib
 
@@ -122,6 +123,28 @@ class EncryptionKey(models.Model):
             ),
         ]
     
+    @classmethod
+    def generate(cls, service_provider, key_name):
+        """
+        Create a random 256-bit AES key for service_provider
+        key_value holds the key wrapped with the CI/DI field keys; the
+        base64 raw key is returned once so it can be handed to the SP.
+        """
+        from accounts.utils import EncryptionUtil
+        raw_key = base64.b64encode(secrets.token_bytes(32)).decode()
+        key = cls.objects.create(
+            service_provider=service_provider,
+            key_name=key_name,
+            key_value=EncryptionUtil.encrypt_field(raw_key),
+        )
+        return key, raw_key
+    
+    @staticmethod
+    def unwrap(key_value):
+        """Raw key bytes from a stored key_value"""
+        from accounts.utils import EncryptionUtil
+        return base64.b64decode(EncryptionUtil.decrypt_field(key_value))
+    
     def __str__(self):
         return f"{self.service_provider.service_name} - {self.key_name}"
 
@@ -170,3 +193,22 @@ class ServiceProviderStatistics(models.Model):
     
     def __str__(self):
         return f"{self.service_provider.service_name} - {self.date}"
+
+
+class AggregationWatermark(models.Model):
+    """
+    High-water mark of an incremental aggregation job
+    e.g. 'sp_statistics': last AuthTransaction.updated_at folded into
+    ServiceProviderStatistics
+    """
+    name = models.CharField(max_length=100, unique=True)
+    value = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'services_aggregationwatermark'
+        verbose_name = 'Aggregation Watermark'
+        verbose_name_plural = 'Aggregation Watermarks'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
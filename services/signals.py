@@ -0,0 +1,27 @@
+"""
+Signal handlers for services app
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import credential_cache, key_cache
+from .models import EncryptionKey, ServiceProvider
+
+
+@receiver(post_save, sender=ServiceProvider)
+@receiver(post_delete, sender=ServiceProvider)
+def invalidate_credential_cache(sender, instance, **kwargs):
+    """
+    Drop cached credentials whenever a ServiceProvider changes
+    The whole cache is cleared because client_id itself may have changed,
+    leaving the old key behind; SP edits are rare so this is cheap.
+    """
+    credential_cache.clear()
+    key_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=EncryptionKey)
+@receiver(post_delete, sender=EncryptionKey)
+def invalidate_key_cache(sender, instance, **kwargs):
+    """Reload the owning SP's keys on next use"""
+    key_cache.invalidate(instance.service_provider_id)
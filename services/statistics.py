@@ -0,0 +1,187 @@
+"""
+Incremental ServiceProviderStatistics rollup
+
+Python counterpart of sp_aggregate_daily_statistics (docs/sql_procedures.sql).
+Incremental runs read AuthTransaction rows whose updated_at moved past the
+stored watermark, find the (service provider, day) buckets they belong to
+and recompute only those buckets with one conditional-aggregation query per
+chunk and table (archived transactions still count). Backfills recompute
+arbitrary date ranges chunk by chunk. Either way SP dashboards read one
+pre-aggregated row per day.
+"""
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from auth_transactions.models import ArchivedAuthTransaction, AuthTransaction
+from .models import AggregationWatermark, ServiceProviderStatistics
+
+
+WATERMARK_NAME = 'sp_statistics'
+
+# Rows updated within this window may belong to transactions that have not
+# committed yet, so the watermark never advances past now - SAFETY_LAG.
+SAFETY_LAG = timedelta(seconds=5)
+
+STAT_FIELDS = (
+    'total_requests', 'completed_requests', 'failed_requests', 'expired_requests',
+    'success_rate', 'avg_processing_time',
+)
+
+
+def _day_bounds(start_date, end_date):
+    """Aware datetimes covering [start_date, end_date] in the current time zone"""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_date, dt_time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), dt_time.min), tz)
+    return start, end
+
+
+def _aggregate_table(model, start, end, service_provider_ids):
+    queryset = model.objects.filter(created_at__gte=start, created_at__lt=end)
+    if service_provider_ids is not None:
+        queryset = queryset.filter(service_provider_id__in=service_provider_ids)
+
+    processing_time = ExpressionWrapper(
+        Coalesce('confirmed_at', 'updated_at') - F('created_at'),
+        output_field=DurationField()
+    )
+    return queryset.annotate(day=TruncDate('created_at')).values(
+        'service_provider_id', 'day'
+    ).annotate(
+        total=Count('pk'),
+        completed=Count('pk', filter=Q(status='COMPLETED')),
+        failed=Count('pk', filter=Q(status='FAILED')),
+        expired=Count('pk', filter=Q(status='EXPIRED')),
+        avg_time=Avg(processing_time, filter=Q(status='COMPLETED')),
+    ).order_by()
+
+
+def _merge(row, other):
+    """Combine the hot and archived rows of one bucket"""
+    completed = row['completed'] + other['completed']
+    avg_time = row['avg_time']
+    if other['avg_time'] is not None:
+        avg_time = other['avg_time'] if avg_time is None else (
+            avg_time * row['completed'] + other['avg_time'] * other['completed']
+        ) / completed
+    return {
+        **row,
+        'total': row['total'] + other['total'],
+        'completed': completed,
+        'failed': row['failed'] + other['failed'],
+        'expired': row['expired'] + other['expired'],
+        'avg_time': avg_time,
+    }
+
+
+def _aggregate(start_date, end_date, service_provider_ids=None):
+    """
+    GROUP BY (service_provider, day) over [start_date, end_date]
+    One query per table: archived transactions still count towards their day.
+    """
+    start, end = _day_bounds(start_date, end_date)
+    buckets = {}
+    for model in (AuthTransaction, ArchivedAuthTransaction):
+        for row in _aggregate_table(model, start, end, service_provider_ids):
+            key = (row['service_provider_id'], row['day'])
+            buckets[key] = _merge(buckets[key], row) if key in buckets else row
+    return list(buckets.values())
+
+
+def _to_statistics(row):
+    total = row['total']
+    success_rate = Decimal(row['completed'] * 100) / total if total else Decimal(0)
+    avg_time = row['avg_time'].total_seconds() if row['avg_time'] is not None else 0
+    return ServiceProviderStatistics(
+        service_provider_id=row['service_provider_id'],
+        date=row['day'],
+        total_requests=total,
+        completed_requests=row['completed'],
+        failed_requests=row['failed'],
+        expired_requests=row['expired'],
+        success_rate=success_rate.quantize(Decimal('0.01')),
+        avg_processing_time=Decimal(avg_time).quantize(Decimal('0.01')),
+    )
+
+
+def _upsert(rows):
+    """Insert or overwrite ServiceProviderStatistics rows by (service_provider, date)"""
+    objs = [_to_statistics(row) for row in rows]
+    now = timezone.now()
+    for obj in objs:
+        obj.updated_at = now
+    ServiceProviderStatistics.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=['service_provider', 'date'],
+        update_fields=[*STAT_FIELDS, 'updated_at'],
+    )
+    return len(objs)
+
+
+def recompute_buckets(buckets):
+    """Recompute the given {(service_provider_id, date)} buckets"""
+    if not buckets:
+        return 0
+    days = sorted({day for _, day in buckets})
+    sp_ids = sorted({sp_id for sp_id, _ in buckets})
+    rows = [
+        row for row in _aggregate(days[0], days[-1], sp_ids)
+        if (row['service_provider_id'], row['day']) in buckets
+    ]
+    return _upsert(rows)
+
+
+def backfill(start_date, end_date, chunk_days=7, on_chunk=None):
+    """
+    Recompute every bucket in [start_date, end_date], chunk_days at a time
+    on_chunk(chunk_start, chunk_end, rows) is called after each chunk.
+    Returns the number of statistics rows written.
+    """
+    written = 0
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        with transaction.atomic():
+            rows = _upsert(_aggregate(chunk_start, chunk_end))
+        written += rows
+        if on_chunk is not None:
+            on_chunk(chunk_start, chunk_end, rows)
+        chunk_start = chunk_end + timedelta(days=1)
+    return written
+
+
+def run_incremental(chunk_size=500, now=None):
+    """
+    Fold transactions changed since the watermark into the daily rows
+    Returns (buckets_recomputed, new_watermark).
+    """
+    upper = (now or timezone.now()) - SAFETY_LAG
+    with transaction.atomic():
+        watermark, _ = AggregationWatermark.objects.select_for_update().get_or_create(
+            name=WATERMARK_NAME
+        )
+        changed = AuthTransaction.objects.filter(updated_at__lte=upper)
+        if watermark.value is not None:
+            if watermark.value >= upper:
+                return 0, watermark.value
+            changed = changed.filter(updated_at__gt=watermark.value)
+
+        buckets = sorted(set(
+            changed.annotate(day=TruncDate('created_at'))
+            .values_list('service_provider_id', 'day')
+            .order_by()
+            .distinct()
+        ), key=lambda bucket: (bucket[1], bucket[0]))
+
+        for i in range(0, len(buckets), chunk_size):
+            recompute_buckets(set(buckets[i:i + chunk_size]))
+
+        watermark.value = upper
+        watermark.save(update_fields=['value', 'updated_at'])
+    return len(buckets), upper
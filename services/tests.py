@@ -1,3 +1,335 @@
+"""
+Tests for services app
+"""
+from datetime import timedelta
+import base64
+from decimal import Decimal
+import importlib
+import json
+import time
+
+from cryptography.fernet import Fernet
+from django.apps import apps
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from accounts.utils import EncryptionUtil
+from auth_transactions.models import AuthTransaction
+from auth_transactions.status_cache import completed_status_cache
+from services import statistics
+from services.cache import TTLCache, credential_cache, key_cache
+from services.models import (
+    AggregationWatermark, EncryptionKey, ServiceProvider, ServiceProviderStatistics
+)
+
+
+class TTLCacheTestCase(TestCase):
+    """TTLCache 단위 테스트 - 용량 제한 및 TTL 만료"""
+
+    def test_evicts_least_recently_used_entry(self):
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_expired_entry_is_dropped(self):
+        cache = TTLCache(max_size=2, ttl=0.05)
+        cache.set('a', 1)
+        time.sleep(0.1)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+
+class CredentialCacheTestCase(TestCase):
+    """
+    ServiceProvider 자격증명 캐시 테스트
+    - 캐시 히트 시 DB 조회 없음
+    - post_save/post_delete 시 무효화
+    """
+
+    def setUp(self):
+        credential_cache.clear()
+        self.sp = ServiceProvider.objects.create(
+            service_name='Cache Service',
+            client_id='cache_client',
+            client_secret=ServiceProvider.hash_secret('cache_secret'),
+            callback_url='https://example.com/callback',
+            is_active=True
+        )
+
+    def test_cache_hit_skips_database(self):
+        credential_cache.get('cache_client')
+
+        with self.assertNumQueries(0):
+            credential = credential_cache.get('cache_client')
+
+        self.assertEqual(credential.pk, self.sp.pk)
+        self.assertTrue(credential.check_secret(self.sp.client_secret))
+        self.assertFalse(credential.check_secret('wrong'))
+
+    def test_unknown_client_id_returns_none(self):
+        self.assertIsNone(credential_cache.get('missing_client'))
+
+    def test_save_invalidates_cache(self):
+        """Admin 수정(save_model → save)도 post_save로 캐시를 무효화해야 함"""
+        self.assertTrue(credential_cache.get('cache_client').is_active)
+
+        self.sp.is_active = False
+        self.sp.save()
+
+        self.assertFalse(credential_cache.get('cache_client').is_active)
+
+    def test_delete_invalidates_cache(self):
+        credential_cache.get('cache_client')
+
+        self.sp.delete()
+
+        self.assertIsNone(credential_cache.get('cache_client'))
+
+    def test_auth_request_uses_cached_credential(self):
+        """비활성화된 SP는 캐시 무효화 후 즉시 거부되어야 함"""
+        self.sp.is_active = False
+        self.sp.save()
+
+        response = self.client.post(
+            '/api/v1/auth/api/request/',
+            data=json.dumps({'user_phone_number': '010-1234-5678'}),
+            content_type='application/json',
+            HTTP_X_CLIENT_ID='cache_client',
+            HTTP_X_CLIENT_SECRET=self.sp.client_secret
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+
+class ServiceProviderKeyTestCase(TestCase):
+    """
+    SP별 AES-256-GCM 응답 암호화 테스트
+    - 활성 키는 한 번만 로드, 키 변경 시 무효화
+    """
+
+    def setUp(self):
+        key_cache.clear()
+        completed_status_cache.clear()
+        self.sp = ServiceProvider.objects.create(
+            service_name='Key Service',
+            client_id='key_client',
+            client_secret=ServiceProvider.hash_secret('key_secret'),
+            callback_url='https://example.com/callback',
+        )
+        self.user = User.objects.create_user(
+            username='key_user',
+            phone_number='010-8888-0000',
+            ci=EncryptionUtil.encrypt_field('CI-key'),
+            di=EncryptionUtil.encrypt_field('DI-key'),
+        )
+        self.auth_tx = AuthTransaction.objects.create(
+            user=self.user,
+            service_provider=self.sp,
+            status='COMPLETED',
+            auth_code='key-code',
+            expires_at=timezone.now() + timedelta(minutes=3),
+        )
+        self.url = f'/api/v1/auth/api/status/{self.auth_tx.transaction_id}/'
+
+    def test_key_loaded_once(self):
+        EncryptionKey.generate(self.sp, 'k1')
+        key_cache.get_active_key(self.sp.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(key_cache.get_active_key(self.sp.pk).key_name, 'k1')
+
+    def test_key_change_invalidates_cache(self):
+        self.assertIsNone(key_cache.get_active_key(self.sp.pk))
+
+        EncryptionKey.generate(self.sp, 'k1')
+
+        self.assertEqual(key_cache.get_active_key(self.sp.pk).key_name, 'k1')
+
+    def test_status_payload_encrypted_for_sp(self):
+        _, raw_key = EncryptionKey.generate(self.sp, 'k1')
+
+        body = self.client.get(self.url).json()
+
+        self.assertNotIn('ci', body)
+        self.assertEqual(body['encryption'], {'algorithm': 'AES-256-GCM', 'key_name': 'k1'})
+        decrypted = EncryptionUtil.decrypt_with_aes_gcm(body['encrypted_data'], base64.b64decode(raw_key))
+        self.assertEqual(json.loads(decrypted), {'ci': 'CI-key', 'di': 'DI-key'})
+
+        # A fresh render needs only the transaction query, not a key query
+        completed_status_cache.clear()
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_sp_without_key_keeps_plaintext(self):
+        body = self.client.get(self.url).json()
+
+        self.assertEqual(body['ci'], 'CI-key')
+        self.assertNotIn('encrypted_data', body)
+
+    def _create_raw_key(self):
+        # 예전 setup 스크립트처럼 Fernet 키를 감싸지 않고 저장
+        raw = Fernet.generate_key()
+        EncryptionKey.objects.create(service_provider=self.sp, key_name='legacy', key_value=raw.decode())
+        return base64.urlsafe_b64decode(raw)
+
+    def test_unwrappable_key_withholds_ci_di(self):
+        self._create_raw_key()
+
+        with self.assertLogs('services.cache', 'ERROR'), self.assertLogs('auth_transactions.views', 'ERROR'):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertNotIn('ci', response.json())
+        self.assertIsNone(completed_status_cache.get(self.auth_tx.transaction_id))
+
+        # Once the key is replaced the SP gets the encrypted body
+        EncryptionKey.objects.filter(service_provider=self.sp).delete()
+        EncryptionKey.generate(self.sp, 'k1')
+        body = self.client.get(self.url).json()
+        self.assertNotIn('ci', body)
+        self.assertIn('encrypted_data', body)
+
+    def test_expired_key_withholds_ci_di(self):
+        EncryptionKey.generate(self.sp, 'k1')
+        EncryptionKey.objects.filter(service_provider=self.sp).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        key_cache.clear()
+
+        with self.assertLogs('auth_transactions.views', 'ERROR'):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertNotIn('ci', response.json())
+
+    def test_migration_wraps_raw_keys(self):
+        migration = importlib.import_module('services.migrations.0003_wrap_raw_encryption_keys')
+        key_bytes = self._create_raw_key()
+        EncryptionKey.generate(self.sp, 'k1')
+        wrapped = EncryptionKey.objects.get(key_name='k1').key_value
+
+        migration.wrap_raw_keys(apps, None)
+
+        self.assertEqual(EncryptionKey.unwrap(EncryptionKey.objects.get(key_name='legacy').key_value), key_bytes)
+        self.assertEqual(EncryptionKey.objects.get(key_name='k1').key_value, wrapped)
+
+
+class StatisticsAggregatorTestCase(TestCase):
+    """
+    ServiceProviderStatistics 증분 집계 테스트
+    - 워터마크 이후 변경된 (SP, 날짜) 버킷만 재계산
+    - 기간 백필
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='stats_user', phone_number='010-5555-0000')
+        self.sp = ServiceProvider.objects.create(
+            service_name='Stats Service',
+            client_id='stats_client',
+            client_secret=ServiceProvider.hash_secret('stats_secret'),
+            callback_url='https://example.com/callback',
+        )
+
+    def _create(self, status, created_at, processing_seconds=10):
+        tx = AuthTransaction.objects.create(
+            user=self.user,
+            service_provider=self.sp,
+            status=status,
+            expires_at=timezone.now() + timedelta(minutes=3),
+        )
+        confirmed_at = created_at + timedelta(seconds=processing_seconds) if status == 'COMPLETED' else None
+        # created_at / updated_at are auto fields; set them explicitly
+        AuthTransaction.objects.filter(pk=tx.pk).update(
+            created_at=created_at, confirmed_at=confirmed_at, updated_at=created_at,
+            expires_at=created_at + timedelta(minutes=3)
+        )
+        return tx
+
+    def test_incremental_run_builds_daily_row(self):
+        day = timezone.now() - timedelta(days=1)
+        self._create('COMPLETED', day, processing_seconds=10)
+        self._create('COMPLETED', day, processing_seconds=20)
+        self._create('FAILED', day)
+        self._create('EXPIRED', day)
+
+        buckets, _ = statistics.run_incremental()
+
+        self.assertEqual(buckets, 1)
+        row = ServiceProviderStatistics.objects.get(service_provider=self.sp)
+        self.assertEqual(row.date, timezone.localdate(day))
+        self.assertEqual(row.total_requests, 4)
+        self.assertEqual(row.completed_requests, 2)
+        self.assertEqual(row.failed_requests, 1)
+        self.assertEqual(row.expired_requests, 1)
+        self.assertEqual(row.success_rate, Decimal('50.00'))
+        self.assertEqual(row.avg_processing_time, Decimal('15.00'))
+
+    def test_only_changed_buckets_are_recomputed(self):
+        old_day = timezone.now() - timedelta(days=3)
+        new_day = timezone.now() - timedelta(days=1)
+        self._create('COMPLETED', old_day)
+        statistics.run_incremental(now=timezone.now() - timedelta(days=2))
+        old_row = ServiceProviderStatistics.objects.get(date=timezone.localdate(old_day))
+
+        tx = self._create('PENDING', new_day)
+        self.assertEqual(statistics.run_incremental(now=timezone.now() - timedelta(hours=12))[0], 1)
+
+        # A later transition moves updated_at past the watermark again
+        AuthTransaction.objects.filter(pk=tx.pk).update(
+            status='FAILED', updated_at=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(statistics.run_incremental()[0], 1)
+
+        new_row = ServiceProviderStatistics.objects.get(date=timezone.localdate(new_day))
+        self.assertEqual(new_row.failed_requests, 1)
+        self.assertEqual(
+            ServiceProviderStatistics.objects.get(pk=old_row.pk).updated_at, old_row.updated_at
+        )
+        self.assertIsNotNone(AggregationWatermark.objects.get(name=statistics.WATERMARK_NAME).value)
+
+    def test_backfill_date_range_in_chunks(self):
+        today = timezone.now()
+        for days_ago in range(5):
+            self._create('COMPLETED', today - timedelta(days=days_ago + 1))
+
+        chunks = []
+        written = statistics.backfill(
+            timezone.localdate(today - timedelta(days=5)),
+            timezone.localdate(today),
+            chunk_days=2,
+            on_chunk=lambda start, end, rows: chunks.append(rows)
+        )
+
+        self.assertEqual(written, 5)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(ServiceProviderStatistics.objects.count(), 5)
+        # Re-running overwrites instead of duplicating
+        statistics.backfill(timezone.localdate(today - timedelta(days=5)), timezone.localdate(today))
+        self.assertEqual(ServiceProviderStatistics.objects.count(), 5)
+
+    def test_archived_transactions_still_count(self):
+        from auth_transactions.archive import archive
+
+        day = timezone.now() - timedelta(days=100)
+        self._create('COMPLETED', day, processing_seconds=10)
+        self._create('FAILED', day)
+        archive(days=90)
+        tx = self._create('COMPLETED', day, processing_seconds=30)
+
+        statistics.backfill(timezone.localdate(day), timezone.localdate(day))
 
-# Create your tests here.
+        self.assertFalse(AuthTransaction.objects.exclude(pk=tx.pk).exists())
+        row = ServiceProviderStatistics.objects.get(service_provider=self.sp)
+        self.assertEqual(row.total_requests, 3)
+        self.assertEqual(row.completed_requests, 2)
+        self.assertEqual(row.failed_requests, 1)
+        self.assertEqual(row.avg_processing_time, Decimal('20.00'))